@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+
+from collections import deque
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import shutil
+import tarfile
+import uuid
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import Iterable, Iterator, Union
+
+import jsonschema
+
+ARCHIVE_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'tar': 'application/x-tar',
+    'tar.gz': 'application/gzip',
+    'zip': 'application/zip',
+}
+SKIP_CHUNK_SIZE = 64 * 1024
+
+
+class ArchiveError(Exception):
+    pass
+
+
+class ChunkSink:
+    # Write-only file object handed to tarfile/zipfile, the written bytes are drained after each member
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iterExport(items: Iterable, archive_format: str) -> Iterator[bytes]:
+    # items: (filename, content) pairs, produced lazily so only one scenario is held at a time
+    if archive_format == 'ndjson':
+        for _, content in items:
+            yield content + b'\n'
+        return
+
+    sink = ChunkSink()
+    if archive_format == 'zip':
+        archive = zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_DEFLATED)
+        for filename, content in items:
+            archive.writestr(filename, content)
+            yield sink.drain()
+    else:
+        archive = tarfile.open(fileobj=sink, mode='w|gz' if archive_format == 'tar.gz' else 'w|')
+        for filename, content in items:
+            info = tarfile.TarInfo(name=filename)
+            info.size = len(content)
+            info.mode = 0o644
+            archive.addfile(info, _BytesReader(content))
+            yield sink.drain()
+    archive.close()
+    yield sink.drain()
+
+
+class _BytesReader:
+    def __init__(self, content: bytes):
+        self._content = content
+        self._position = 0
+
+    def read(self, size: int = -1) -> bytes:
+        end = len(self._content) if size is None or size < 0 else self._position + size
+        data = self._content[self._position:end]
+        self._position += len(data)
+        return data
+
+
+def iterArchiveMembers(fileobj, archive_format: str, max_file_size: int) -> Iterator[tuple]:
+    # Yields (name, content, error) for each JSON document of the uploaded archive, one member at a time
+    if archive_format == 'ndjson':
+        i = 0
+        while line := fileobj.readline(max_file_size + 1):  # Bounded, a single huge line is never held in memory
+            i += 1
+            if len(line) > max_file_size:
+                while not line.endswith(b'\n'):  # The rest of the line is skipped in chunks
+                    line = fileobj.readline(SKIP_CHUNK_SIZE)
+                    if not line:
+                        break
+                yield (f'line {i}', None, f'Larger than {max_file_size} bytes')
+            elif len(line.strip()) > 0:
+                yield (f'line {i}', line, None)
+        return
+
+    if archive_format == 'zip':
+        try:
+            archive = zipfile.ZipFile(fileobj)
+        except zipfile.BadZipFile as e:
+            raise ArchiveError(f'Invalid zip archive: {e}')
+        with archive:
+            for info in archive.infolist():
+                if info.is_dir() or not info.filename.endswith('.json'):
+                    continue
+                if info.file_size > max_file_size:
+                    yield (info.filename, None, f'Larger than {max_file_size} bytes')
+                    continue
+                with archive.open(info) as member:
+                    content = member.read(max_file_size + 1)
+                if len(content) > max_file_size:  # The declared size cannot be trusted
+                    yield (info.filename, None, f'Larger than {max_file_size} bytes')
+                    continue
+                yield (info.filename, content, None)
+        return
+
+    try:
+        archive = tarfile.open(fileobj=fileobj, mode='r|*')
+    except tarfile.TarError as e:
+        raise ArchiveError(f'Invalid tar archive: {e}')
+    with archive:
+        for info in archive:
+            if not info.isfile() or not info.name.endswith('.json'):
+                continue
+            if info.size > max_file_size:
+                yield (info.name, None, f'Larger than {max_file_size} bytes')
+                continue
+            yield (info.name, archive.extractfile(info).read(), None)
+
+
+def checkScenario(content: bytes, validator) -> dict:
+    # Parses and validates one scenario, only the fields needed to place it are returned to the caller
+    try:
+        scenario = json.loads(content)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        return {'error': f'json.JSONDecodeError: {e}'}
+    if type(scenario) is not dict or type(scenario.get('exercise', None)) is not dict or not scenario['exercise'].get('uuid', None):
+        return {'error': 'Not a scenario: missing exercise.uuid'}
+    errors = [
+        {
+            'path': err.json_path,
+            'message': err.message,
+            'validator': err.validator,
+        } for err in sorted(validator.iter_errors(scenario), key=lambda err: err.json_path)
+    ]
+    return {
+        'error': None,
+        'uuid': scenario['exercise']['uuid'],
+        'name': scenario['exercise'].get('name', None),
+        'validation_errors': errors,
+    }
+
+
+_validator = None
+
+
+def _initValidationWorker(schema: dict):
+    global _validator
+    validator_class = jsonschema.validators.validator_for(schema)
+    _validator = validator_class(schema, format_checker=validator_class.FORMAT_CHECKER)
+
+
+def _checkScenarioInWorker(content: bytes) -> dict:
+    return checkScenario(content, _validator)
+
+
+class ScenarioValidationPool:
+    # Validates imported scenarios in separate processes, jsonschema validation is CPU bound
+    def __init__(self, schema: dict, validator, workers: int = 2):
+        self.schema = schema
+        self.validator = validator
+        self.workers = workers
+        self._executor = None
+
+    def _getExecutor(self) -> Union[concurrent.futures.ProcessPoolExecutor, None]:
+        if self.workers <= 0:
+            return None
+        if self._executor is None:
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_initValidationWorker,
+                initargs=(self.schema,),
+            )
+        return self._executor
+
+    def checkAll(self, members: Iterable) -> Iterator[tuple]:
+        # Yields (name, content, result) in order, with at most 2 * workers members in flight
+        executor = self._getExecutor()
+        if executor is None:
+            for name, content, error in members:
+                yield (name, content, {'error': error} if error is not None else checkScenario(content, self.validator))
+            return
+        window = deque()
+        for name, content, error in members:
+            window.append((name, content, error, executor.submit(_checkScenarioInWorker, content) if error is None else None,))
+            if len(window) >= 2 * self.workers:
+                yield self._resolve(window.popleft())
+        while window:
+            yield self._resolve(window.popleft())
+
+    def _resolve(self, pending: tuple) -> tuple:
+        name, content, error, future = pending
+        if future is None:
+            return (name, content, {'error': error})
+        return (name, content, future.result())
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def sanitizeFilename(name: str, fallback: str) -> str:
+    # `fallback` (the scenario UUID) is used when no letter or digit is left of the name
+    filename = "".join(x for x in name if (x.isalnum() or x in "._- "))
+    if not any(x.isalnum() for x in filename.removesuffix('.json')):
+        filename = "".join(x for x in fallback if (x.isalnum() or x in "._- "))
+    if not filename.endswith('.json'):
+        filename = f'{filename}.json'
+    return filename
+
+
+class ImportStaging:
+    # Accepted files are written to a hidden directory next to the exercises and moved in place all together
+    def __init__(self, exercise_dir: Path):
+        self.exercise_dir = Path(exercise_dir)
+        self.directory = self.exercise_dir / f'.import-{uuid.uuid4().hex}'
+        self.directory.mkdir()
+        self.staged = []
+
+    def stage(self, filename: str, content: bytes):
+        staging_path = self.directory / f'{len(self.staged)}.json'
+        with open(staging_path, 'wb') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        self.staged.append((staging_path, self.exercise_dir / filename,))
+
+    def commit(self):
+        # Replaced files are kept aside until every file is in place, any failure restores the previous state
+        backups = []
+        committed = []
+        try:
+            for i, (staging_path, target_path) in enumerate(self.staged):
+                if target_path.exists():
+                    backup_path = self.directory / f'{i}.backup'
+                    os.replace(target_path, backup_path)
+                    backups.append((backup_path, target_path,))
+                os.replace(staging_path, target_path)
+                committed.append(target_path)
+        except OSError:
+            for target_path in committed:
+                try:
+                    os.remove(target_path)
+                except OSError:
+                    pass
+            for backup_path, target_path in backups:
+                os.replace(backup_path, target_path)
+            raise
+
+    def cleanup(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def memberFilename(name: str, fallback: str) -> str:
+    return sanitizeFilename(PurePosixPath(name).name, fallback)
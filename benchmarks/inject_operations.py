@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+# Micro-benchmark of inject save/remove/reorder with linear scans (before) and the per-scenario index (after)
+# Usage: python3 benchmarks/inject_operations.py [--sizes 10 100 1000]
+
+import argparse
+import copy
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from scenario_index import ScenarioIndex
+
+
+def make_scenario(inject_count: int) -> dict:
+    inject_uuids = [str(uuid.uuid4()) for _ in range(inject_count)]
+    return {
+        'exercise': {'uuid': str(uuid.uuid4())},
+        'injects': [{'uuid': inject_uuid, 'name': f'Inject {i}'} for i, inject_uuid in enumerate(inject_uuids)],
+        'inject_flow': [
+            {'inject_uuid': inject_uuid, 'requirements': {'inject_uuid': inject_uuids[i - 1]} if i > 0 else {}}
+            for i, inject_uuid in enumerate(inject_uuids)
+        ],
+    }
+
+
+def linear_save(scenario: dict, inject: dict, injectF: dict):
+    for i, existing in enumerate(scenario['injects']):
+        if existing['uuid'] == inject['uuid']:
+            scenario['injects'][i] = inject
+    for i, existing in enumerate(scenario['inject_flow']):
+        if existing['inject_uuid'] == injectF['inject_uuid']:
+            scenario['inject_flow'][i] = injectF
+
+
+def linear_remove(scenario: dict, inject_uuid: str):
+    scenario['injects'] = [inject for inject in scenario['injects'] if inject['uuid'] != inject_uuid]
+    scenario['inject_flow'] = [injectF for injectF in scenario['inject_flow'] if injectF['inject_uuid'] != inject_uuid]
+    for injectF in scenario['inject_flow']:
+        if injectF['requirements'].get('inject_uuid', None) == inject_uuid:
+            injectF['requirements'] = {}
+
+
+def linear_reorder(scenario: dict, inject_uuids: list):
+    scenario['injects'] = [[i for i in scenario['injects'] if i['uuid'] == inject_uuid][0] for inject_uuid in inject_uuids]
+    scenario['inject_flow'] = [[i for i in scenario['inject_flow'] if i['inject_uuid'] == inject_uuid][0] for inject_uuid in inject_uuids]
+
+
+def indexed_save(index: ScenarioIndex, inject: dict, injectF: dict):
+    index.upsertInject(inject)
+    index.upsertInjectFlow(injectF)
+
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def run_size(inject_count: int) -> dict:
+    template = make_scenario(inject_count)
+    inject_uuids = [inject['uuid'] for inject in template['injects']]
+    reversed_uuids = list(reversed(inject_uuids))
+    updates = [(dict(inject, name='Updated'), dict(injectF)) for inject, injectF in zip(template['injects'], template['inject_flow'])]
+
+    results = {}
+    scenario = copy.deepcopy(template)
+    index = ScenarioIndex(copy.deepcopy(template))
+    results['save'] = (
+        timed(lambda: [linear_save(scenario, inject, injectF) for inject, injectF in updates]),
+        timed(lambda: [indexed_save(index, inject, injectF) for inject, injectF in updates]),
+    )
+    scenario = copy.deepcopy(template)
+    index = ScenarioIndex(copy.deepcopy(template))
+    results['reorder'] = (
+        timed(lambda: linear_reorder(scenario, reversed_uuids)),
+        timed(lambda: index.reorder(reversed_uuids)),
+    )
+    scenario = copy.deepcopy(template)
+    index = ScenarioIndex(copy.deepcopy(template))
+    results['remove'] = (
+        timed(lambda: [linear_remove(scenario, inject_uuid) for inject_uuid in inject_uuids]),
+        timed(lambda: [index.removeInject(inject_uuid) for inject_uuid in inject_uuids]),
+    )
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark inject operations')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000])
+    args = parser.parse_args()
+    print(f'{"injects":>8} {"operation":<10} {"linear":>12} {"indexed":>12}')
+    for size in args.sizes:
+        for operation, (linear, indexed) in run_size(size).items():
+            print(f'{size:>8} {operation:<10} {linear * 1000:>10.2f}ms {indexed * 1000:>10.2f}ms')
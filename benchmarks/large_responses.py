@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+# Peak memory (RSS) of fetching a large MISP restSearch response, buffered then parsed with json.loads (before)
+# and parsed while it is received with ijson (after), each in a fresh process. The response is served from a file by a mock transport.
+# --shape attributes serves the {"response": {"Attribute": [...]}} of /attributes/restSearch instead of the events of /events/restSearch.
+# Usage: python3 benchmarks/large_responses.py [--events 200] [--attributes 2000] [--shape events|attributes]
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+CHUNK_SIZE = 64 * 1024
+
+
+def make_attributes(i: int, attribute_count: int) -> list:
+    return [{'id': str(j), 'event_id': str(i), 'type': 'ip-dst', 'category': 'Network activity', 'value': f'10.{i % 256}.{j // 256 % 256}.{j % 256}', 'comment': 'x' * 40} for j in range(attribute_count)]
+
+
+def make_response(path: str, event_count: int, attribute_count: int, shape: str):
+    # Written event by event, the generating process does not hold the whole export either
+    with open(path, 'w') as f:
+        f.write('{"response": [' if shape == 'events' else '{"response": {"Attribute": [')
+        for i in range(event_count):
+            if shape == 'events':
+                items = [{'Event': {'id': str(i), 'info': f'Event {i}', 'Attribute': make_attributes(i, attribute_count)}}]
+            else:
+                items = make_attributes(i, attribute_count)
+            f.write(('' if i == 0 else ',') + ','.join([json.dumps(item) for item in items]))
+        f.write(']}' if shape == 'events' else ']}}')
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # kB on Linux
+
+
+def measure(mode: str, path: str):
+    import httpx
+    from misp_client import MISPClientPool
+    from payloads import parseContent
+
+    async def body():
+        with open(path, 'rb') as f:
+            while chunk := f.read(CHUNK_SIZE):
+                yield chunk
+
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, headers={'content-type': 'application/json'}, content=body()))
+    pool = MISPClientPool(transport=transport)
+
+    async def run():
+        if mode == 'buffered':
+            content, content_type, _ = await pool.fetch('http://misp.local', 'key', 'POST', '/events/restSearch', {})
+            data = parseContent(content, content_type)
+            del content
+        else:
+            data, _, _ = await pool.fetchParsed('http://misp.local', 'key', 'POST', '/events/restSearch', {})
+        await pool.close()
+        return data
+
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    data = asyncio.run(run())
+    duration = time.perf_counter() - start
+    assert isinstance(data, dict) and 'response' in data, 'the response was not parsed'
+    print(json.dumps({'baseline_mb': baseline, 'peak_mb': peak_rss_mb(), 'duration_s': duration}))
+
+
+def run_mode(mode: str, path: str) -> dict:
+    output = subprocess.run([sys.executable, __file__, '--measure', mode, '--file', path], capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the memory used to fetch large MISP responses')
+    parser.add_argument('--events', type=int, default=200)
+    parser.add_argument('--attributes', type=int, default=2000)
+    parser.add_argument('--shape', choices=['events', 'attributes'], default='events')
+    parser.add_argument('--measure', choices=['buffered', 'incremental'], help=argparse.SUPPRESS)
+    parser.add_argument('--file', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.measure:
+        measure(args.measure, args.file)
+        sys.exit(0)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'response.json')
+        make_response(path, args.events, args.attributes, args.shape)
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        print(f'{args.events} events x {args.attributes} attributes as {args.shape}, {size_mb:.1f} MB response')
+        for mode in ('buffered', 'incremental'):
+            result = run_mode(mode, path)
+            print(f'  {mode:<12} peak RSS {result["peak_mb"]:8.1f} MB (+{result["peak_mb"] - result["baseline_mb"]:.1f} MB)  {result["duration_s"] * 1000:9.2f} ms')
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+# Start-up time of the back-end (import of main.py, which loads the exercise directory) without the scenario
+# catalog, with an empty catalog (first start) and with an up-to-date catalog (restart)
+# Usage: python3 benchmarks/startup.py [--scenarios 500] [--injects 20]
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from validation import make_scenario
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+MEASURE = '''
+import time
+start = time.perf_counter()
+import main
+print(time.perf_counter() - start)
+'''
+
+
+def start_duration(exercise_dir: str, catalog_path: str) -> float:
+    env = dict(os.environ, EXERCISE_FOLDER=exercise_dir, SCENARIO_CATALOG=catalog_path)
+    env['PYTHONPATH'] = os.pathsep.join([str(ROOT_DIR)] + ([env['PYTHONPATH']] if env.get('PYTHONPATH') else []))
+    output = subprocess.run([sys.executable, '-W', 'ignore', '-c', MEASURE], cwd=ROOT_DIR, env=env, capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def run(scenario_count: int, inject_count: int):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        exercise_dir = Path(tmp_dir) / 'scenarios'
+        exercise_dir.mkdir()
+        for i in range(scenario_count):
+            with open(exercise_dir / f'scenario_{i}.json', 'w') as f:
+                json.dump(make_scenario(i, inject_count), f, indent=4)
+        catalog_path = str(Path(tmp_dir) / 'catalog.sqlite')
+
+        results = {
+            'without catalog': start_duration(str(exercise_dir), ''),
+            'empty catalog (first start)': start_duration(str(exercise_dir), catalog_path),
+            'up-to-date catalog (restart)': start_duration(str(exercise_dir), catalog_path),
+        }
+
+    print(f'{scenario_count} scenarios, {inject_count} injects each')
+    for name, duration in results.items():
+        print(f'  {name:<36} {duration * 1000:10.2f} ms')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the start-up of the back-end')
+    parser.add_argument('--scenarios', type=int, default=500)
+    parser.add_argument('--injects', type=int, default=20)
+    args = parser.parse_args()
+    run(args.scenarios, args.injects)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+# Validation time of synthetic scenarios with jsonschema.validate (before) and the compiled CEXF validator (after)
+# Usage: python3 benchmarks/validation.py [--scenarios 500] [--injects 20]
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import jsonschema
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+
+def make_scenario(index: int, inject_count: int) -> dict:
+    injects = []
+    inject_flow = []
+    for i in range(inject_count):
+        inject_uuid = str(uuid.uuid4())
+        injects.append({
+            'name': f'Inject {i}',
+            'action': f'action_{i}',
+            'target_tool': 'MISP',
+            'uuid': inject_uuid,
+            'inject_evaluation': [{
+                'parameters': [{'.Event.info': {'comparison': 'contains', 'values': ['test']}}],
+                'result': 'Event created',
+                'evaluation_strategy': 'data_filtering',
+                'evaluation_context': {},
+                'score_range': [0, 10],
+            }],
+        })
+        inject_flow.append({
+            'inject_uuid': inject_uuid,
+            'description': '',
+            'requirements': {'inject_uuid': injects[i - 1]['uuid']} if i > 0 else {},
+            'sequence': {'completion_trigger': ['time_expiration'], 'followed_by': [], 'trigger': []},
+            'timing': {'triggered_at': None, 'periodic_run_every': None},
+        })
+    return {
+        'exercise': {
+            'name': f'Synthetic scenario {index}',
+            'namespace': 'benchmark',
+            'description': 'Synthetic scenario',
+            'meta': {'author': 'benchmark', 'level': 'beginner', 'priority': 1},
+            'uuid': str(uuid.uuid4()),
+            'version': '1',
+        },
+        'inject_flow': inject_flow,
+        'inject_payloads': [],
+        'injects': injects,
+    }
+
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def run(scenario_count: int, inject_count: int):
+    with tempfile.TemporaryDirectory() as exercise_dir:
+        for i in range(scenario_count):
+            with open(Path(exercise_dir) / f'scenario_{i}.json', 'w') as f:
+                json.dump(make_scenario(i, inject_count), f, indent=4)
+
+        os.environ['EXERCISE_FOLDER'] = exercise_dir
+        # The catalog and shared state of the temporary scenarios must not replace the ones of the real exercise directory
+        os.environ['SCENARIO_CATALOG'] = ''
+        os.environ['SHARED_STATE'] = ''
+        os.chdir(ROOT_DIR)
+        sys.path.insert(0, str(ROOT_DIR))
+        import main as editor
+
+        scenarios = list(editor.scenarios)
+        hashes = [editor.hash_json(scenario) for scenario in scenarios]
+        # Invalid fixtures would only measure how fast the first error is found
+        assert editor.validation_errors(make_scenario(0, inject_count)) == [], 'the synthetic scenarios do not match the CEXF schema'
+
+        def validate_before():
+            for scenario in scenarios:
+                try:
+                    jsonschema.validate(instance=scenario, schema=editor.CEXF_SCHEMA)
+                except jsonschema.exceptions.ValidationError:
+                    pass
+
+        def validate_after():
+            for scenario, content_hash in zip(scenarios, hashes):
+                editor.validation_errors(scenario, content_hash)
+
+        editor.validationCache.clear()
+        results = {
+            'jsonschema.validate': timed(validate_before),
+            'compiled validator (cold cache)': timed(validate_after),
+            'compiled validator (warm cache)': timed(validate_after),
+            'directory reload (unchanged files)': timed(editor.reloadJsonFiles),
+        }
+
+    print(f'{scenario_count} scenarios, {inject_count} injects each')
+    for name, duration in results.items():
+        print(f'  {name:<36} {duration * 1000:10.2f} ms')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark CEXF validation')
+    parser.add_argument('--scenarios', type=int, default=500)
+    parser.add_argument('--injects', type=int, default=20)
+    args = parser.parse_args()
+    run(args.scenarios, args.injects)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+CATALOG_VERSION = 1
+
+
+class ScenarioCatalog:
+    # On-disk record of each exercise file's fingerprint, content hash, summary and validation result.
+    # Rows are only trusted while the file fingerprint, the exercise directory and the CEXF schema are unchanged.
+    def __init__(self, path: Path, exercise_dir: Path | None = None, schema_hash: str | None = None):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute('''CREATE TABLE IF NOT EXISTS files (
+            filename TEXT PRIMARY KEY,
+            mtime_ns INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            hash TEXT NOT NULL,
+            uuid TEXT,
+            summary TEXT,
+            validation TEXT,
+            validation_errors TEXT,
+            updated_at REAL
+        )''')
+        self._connection.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        if exercise_dir is None or schema_hash is None:  # Opened by the command line, rows are used as they are
+            return
+        expected = {
+            'version': str(CATALOG_VERSION),
+            'exercise_dir': str(Path(exercise_dir).resolve()),
+            'schema_hash': schema_hash,
+        }
+        if self._meta() != expected:
+            with self._lock:
+                self._connection.execute('BEGIN')
+                self._connection.execute('DELETE FROM files')
+                self._connection.execute('DELETE FROM meta')
+                self._connection.executemany('INSERT INTO meta (key, value) VALUES (?, ?)', list(expected.items()))
+                self._connection.execute('COMMIT')
+
+    def _meta(self) -> dict:
+        with self._lock:
+            return dict(self._connection.execute('SELECT key, value FROM meta').fetchall())
+
+    def load(self) -> dict:
+        with self._lock:
+            rows = self._connection.execute('SELECT filename, mtime_ns, size, hash, validation, validation_errors FROM files').fetchall()
+        return {
+            filename: {
+                'fingerprint': (mtime_ns, size,),
+                'hash': content_hash,
+                'validation': json.loads(validation),
+                'validation_errors': json.loads(validation_errors),
+            } for filename, mtime_ns, size, content_hash, validation, validation_errors in rows
+        }
+
+    def upsert(self, rows: list):
+        # rows: (filename, fingerprint, hash, summary, validation, validation_errors)
+        if len(rows) == 0:
+            return
+        now = time.time()
+        values = [
+            (filename, fingerprint[0], fingerprint[1], content_hash, summary.get('uuid', None), json.dumps(summary), json.dumps(validation), json.dumps(errors), now,)
+            for filename, fingerprint, content_hash, summary, validation, errors in rows
+        ]
+        with self._lock:
+            self._connection.execute('BEGIN')
+            self._connection.executemany('''INSERT OR REPLACE INTO files
+                (filename, mtime_ns, size, hash, uuid, summary, validation, validation_errors, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''', values)
+            self._connection.execute('COMMIT')
+
+    def retain(self, filenames: set):
+        with self._lock:
+            existing = [row[0] for row in self._connection.execute('SELECT filename FROM files').fetchall()]
+            removed = [(filename,) for filename in existing if filename not in filenames]
+            if len(removed) > 0:
+                self._connection.execute('BEGIN')
+                self._connection.executemany('DELETE FROM files WHERE filename = ?', removed)
+                self._connection.execute('COMMIT')
+
+    def clear(self):
+        with self._lock:
+            self._connection.execute('DELETE FROM files')
+
+    def summaries(self) -> list:
+        with self._lock:
+            rows = self._connection.execute('SELECT filename, summary, validation FROM files ORDER BY filename').fetchall()
+        return [{'filename': filename, 'summary': json.loads(summary), 'validated': json.loads(validation) is True} for filename, summary, validation in rows]
+
+    def stats(self) -> dict:
+        with self._lock:
+            count = self._connection.execute('SELECT COUNT(*) FROM files').fetchone()[0]
+        return {
+            'path': str(self.path),
+            'files': count,
+            'bytes': self.path.stat().st_size if self.path.exists() else 0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Manage the scenario catalog used to speed up the start of the editor')
+    parser.add_argument('--rebuild', action='store_true', help='Re-read and re-validate every exercise file')
+    parser.add_argument('--list', action='store_true', help='List the cataloged scenarios')
+    args = parser.parse_args()
+
+    # Resolved like main.py does, importing main loads the exercise directory so it is only imported to rebuild
+    import config
+    catalog_path = os.getenv("SCENARIO_CATALOG", getattr(config, 'scenario_catalog', 'scenario_catalog.sqlite'))
+    if not catalog_path:
+        parser.error('The scenario catalog is disabled (scenario_catalog = None)')
+    catalog = ScenarioCatalog(Path(__file__).parent / catalog_path)
+    if args.rebuild:
+        # Emptied first, the load done by importing main then reads, validates and catalogs every file once
+        catalog.clear()
+        catalog.close()
+        start = time.perf_counter()
+        import main as editor
+        catalog = editor.scenarioCatalog
+        print(f'Catalog rebuilt in {(time.perf_counter() - start) * 1000:.2f} ms')
+    if args.list:
+        for entry in catalog.summaries():
+            summary = entry['summary']
+            print(f"{entry['filename']}\t{summary.get('uuid', '')}\t{summary.get('name', '')}\t{'valid' if entry['validated'] else 'invalid'}")
+    print(json.dumps(catalog.stats()))
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+import asyncio
+import datetime
+import hashlib
+import json
+from pathlib import Path
+from typing import Callable, Union
+
+from payloads import parseContent
+from persistence import atomicWrite
+
+FIXTURE_MODES = ('record', 'replay')
+
+
+class FixtureMissing(Exception):
+    pass
+
+
+class FixtureStore:
+    # Recorded MISP responses, one body file and one metadata file per (method, url, payload).
+    # The MISP base URL and the authkey are not part of the key so recordings can be replayed against any instance.
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+
+    @staticmethod
+    def key(method: str, url: str, payload) -> str:
+        method = 'POST' if method == 'POST' else 'GET'  # As sent by MISPClientPool
+        return hashlib.sha256(json.dumps([method, url, payload], sort_keys=True).encode()).hexdigest()
+
+    def load(self, method: str, url: str, payload) -> Union[tuple, None]:
+        key = self.key(method, url, payload)
+        try:
+            with open(self.directory / f'{key}.json', 'r') as f:
+                meta = json.load(f)
+            with open(self.directory / f'{key}.body', 'rb') as f:
+                content = f.read()
+        except FileNotFoundError:
+            return None
+        return (content, meta['content_type'], meta['is_success'],)
+
+    def save(self, method: str, url: str, payload, content: bytes, content_type: str, is_success: bool):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        key = self.key(method, url, payload)
+        meta = {
+            'method': 'POST' if method == 'POST' else 'GET',
+            'url': url,
+            'payload': payload,
+            'content_type': content_type,
+            'is_success': is_success,
+            'size': len(content),
+            'recorded_at': datetime.datetime.now().isoformat(),
+        }
+        # Body first: a metadata file is only present once its body is complete
+        atomicWrite(self.directory / f'{key}.body', content)
+        atomicWrite(self.directory / f'{key}.json', json.dumps(meta, indent=4).encode())
+
+    def stats(self) -> dict:
+        bodies = list(self.directory.glob('*.body')) if self.directory.exists() else []
+        return {
+            'directory': str(self.directory),
+            'fixtures': len(list(self.directory.glob('*.json'))) if self.directory.exists() else 0,
+            'bytes': sum([body.stat().st_size for body in bodies]),
+        }
+
+
+class FixtureClientPool:
+    # Stands in for MISPClientPool: `record` queries MISP and stores every response, `replay` never leaves the fixture store
+    def __init__(self, pool, store: FixtureStore, mode: str):
+        if mode not in FIXTURE_MODES:
+            raise ValueError(f'Unknown fixture mode {mode}, expected one of {", ".join(FIXTURE_MODES)}')
+        self.pool = pool
+        self.store = store
+        self.mode = mode
+        self.recorded = 0
+        self.replayed = 0
+        self.missing = []
+
+    async def fetch(self, misp_url: str, authkey: str, method: str, url: str, payload, on_progress: Callable[[int, int | None], None] | None = None) -> tuple:
+        if self.mode == 'replay':
+            fixture = await asyncio.to_thread(self.store.load, method, url, payload)
+            if fixture is None:
+                self.missing.append({'method': method, 'url': url, 'payload': payload})
+                raise FixtureMissing(f'No recorded response for {method} {url}, record it with misp_fixture_mode = "record"')
+            self.replayed += 1
+            if on_progress is not None:
+                on_progress(len(fixture[0]), len(fixture[0]))
+            return fixture
+
+        fetched = await self.pool.fetch(misp_url, authkey, method, url, payload, on_progress)
+        await asyncio.to_thread(self.store.save, method, url, payload, *fetched)
+        self.recorded += 1
+        return fetched
+
+    async def fetchParsed(self, misp_url: str, authkey: str, method: str, url: str, payload, on_progress: Callable[[int, int | None], None] | None = None) -> tuple:
+        # The body is needed as a whole to be recorded
+        content, content_type, is_success = await self.fetch(misp_url, authkey, method, url, payload, on_progress)
+        return (parseContent(content, content_type), content_type, is_success,)
+
+    def stats(self) -> dict:
+        return {
+            'mode': self.mode,
+            'recorded': self.recorded,
+            'replayed': self.replayed,
+            'missing': len(self.missing),
+            **self.store.stats(),
+        }
+
+    async def close(self):
+        await self.pool.close()
@@ -0,0 +1,611 @@
+#!/usr/bin/env python3
+
+# Semantic checks of scenarios that the CEXF schema cannot express (references between injects and inject flows,
+# duplicates, dependency cycles, timings). Usable as a CLI, e.g. in the CI of an exercise repository:
+# Usage: python3 linter.py [<file or directory> ...] [--workers 4] [--cache lint_cache.json] [--disable <rule>] [--rules <module>] [--json]
+
+from collections import OrderedDict, defaultdict, deque
+import argparse
+import concurrent.futures
+import hashlib
+import importlib
+import importlib.util
+import json
+import math
+import multiprocessing
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Iterable, Iterator, Union
+
+from persistence import atomicWrite
+from scenario_graph import ScenarioGraph
+
+LINT_VERSION = 1
+SEVERITIES = ('error', 'warning')
+LINT_RULES = OrderedDict()
+
+
+def lintRule(rule_class):
+    # Class decorator registering a rule, rule modules listed in lint_rule_modules use it to add their own rules
+    if not rule_class.code:
+        raise ValueError(f'{rule_class.__name__} has no code')
+    if rule_class.code in LINT_RULES and LINT_RULES[rule_class.code] is not rule_class:
+        raise ValueError(f'A lint rule named {rule_class.code} is already registered')
+    if rule_class.severity not in SEVERITIES:
+        raise ValueError(f'Unknown severity {rule_class.severity} for {rule_class.code}, expected one of {", ".join(SEVERITIES)}')
+    LINT_RULES[rule_class.code] = rule_class
+    return rule_class
+
+
+def loadRuleModules(rule_modules: Iterable):
+    # Module names or paths of .py files, importing them registers their rules
+    for rule_module in rule_modules:
+        if str(rule_module).endswith('.py'):
+            name = f'lint_rules_{hashlib.sha256(str(Path(rule_module).resolve()).encode()).hexdigest()[:12]}'
+            if name in sys.modules:
+                continue
+            spec = importlib.util.spec_from_file_location(name, rule_module)
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[name] = module
+            spec.loader.exec_module(module)
+        else:
+            importlib.import_module(rule_module)
+
+
+def enabledRules(disabled_rules: Iterable = ()) -> list:
+    disabled = set(disabled_rules)
+    unknown = disabled - set(LINT_RULES)
+    if len(unknown) > 0:
+        raise ValueError(f'Unknown lint rule(s): {", ".join(sorted(unknown))}')
+    return [rule_class for code, rule_class in LINT_RULES.items() if code not in disabled]
+
+
+def rulesetHash(rules: list) -> str:
+    # Cached results are only reused by a linter running the same rules
+    return hashlib.sha256(json.dumps([LINT_VERSION, [(rule_class.code, rule_class.version) for rule_class in rules]]).encode()).hexdigest()
+
+
+class LintContext:
+    # State of the walk of one scenario, filled before the rules visit each item: while visiting the inject flows,
+    # every inject is already known
+    def __init__(self, scenario):
+        self.scenario = scenario
+        self.findings = []
+        self.injectUUIDs = []  # By position, None for injects without a usable UUID
+        self.injectPositions = defaultdict(list)
+        self.injectFlowUUIDs = []
+        self.injectFlowPositions = defaultdict(list)
+
+    def addInject(self, position: int, inject: dict):
+        inject_uuid = inject.get('uuid', None)
+        inject_uuid = inject_uuid if type(inject_uuid) is str else None
+        self.injectUUIDs.append(inject_uuid)
+        if inject_uuid is not None:
+            self.injectPositions[inject_uuid].append(position)
+
+    def addInjectFlow(self, position: int, injectF: dict):
+        inject_uuid = injectF.get('inject_uuid', None)
+        inject_uuid = inject_uuid if type(inject_uuid) is str else None
+        self.injectFlowUUIDs.append(inject_uuid)
+        if inject_uuid is not None:
+            self.injectFlowPositions[inject_uuid].append(position)
+
+    def report(self, rule_class, path: str, message: str, inject_uuid: Union[str, None] = None):
+        self.findings.append({
+            'rule': rule_class.code,
+            'severity': rule_class.severity,
+            'path': path,
+            'message': message,
+            'inject_uuid': inject_uuid,
+        })
+
+
+class LintRule:
+    # One instance per linted scenario. Hooks are called during the single walk of the scenario: exercise, then each
+    # inject, then each inject flow, then finish. Only the overridden hooks are called.
+    code = None
+    severity = 'error'
+    description = ''
+    version = 1  # Bump when the rule changes to invalidate the cached results
+
+    def __init__(self, context: LintContext):
+        self.context = context
+
+    def report(self, path: str, message: str, inject_uuid: Union[str, None] = None):
+        self.context.report(type(self), path, message, inject_uuid)
+
+    def exercise(self, exercise: dict):
+        pass
+
+    def inject(self, position: int, inject: dict):
+        pass
+
+    def injectFlow(self, position: int, injectF: dict):
+        pass
+
+    def finish(self):
+        pass
+
+
+# Reported by the linter itself, they can be disabled like any other rule
+
+@lintRule
+class InvalidJSON(LintRule):
+    code = 'invalid-json'
+    description = 'The file cannot be read or is not valid JSON'
+
+
+@lintRule
+class InvalidStructure(LintRule):
+    code = 'invalid-structure'
+    description = 'The scenario, its injects or its inject flows do not have the expected types, they are not linted further'
+
+
+@lintRule
+class DuplicateScenarioUUID(LintRule):
+    code = 'duplicate-scenario-uuid'
+    description = 'Several files of the library hold scenarios with the same UUID, only one of them is loaded'
+
+
+@lintRule
+class DuplicateInjectUUID(LintRule):
+    code = 'duplicate-inject-uuid'
+    description = 'Several injects share the same UUID'
+
+    def inject(self, position: int, inject: dict):
+        positions = self.context.injectPositions.get(self.context.injectUUIDs[position], [])
+        if len(positions) > 1:
+            self.report(f'$.injects[{position}].uuid', f'UUID already used by injects[{positions[0]}]', inject['uuid'])
+
+
+@lintRule
+class DuplicateInjectFlow(LintRule):
+    code = 'duplicate-inject-flow'
+    description = 'Several inject_flow entries are for the same inject'
+
+    def injectFlow(self, position: int, injectF: dict):
+        positions = self.context.injectFlowPositions.get(self.context.injectFlowUUIDs[position], [])
+        if len(positions) > 1:
+            self.report(f'$.inject_flow[{position}].inject_uuid', f'inject_flow[{positions[0]}] is already for this inject', injectF['inject_uuid'])
+
+
+@lintRule
+class UnknownFlowInject(LintRule):
+    code = 'inject-flow-unknown-inject'
+    description = 'An inject_flow entry is for an inject that does not exist'
+
+    def injectFlow(self, position: int, injectF: dict):
+        inject_uuid = self.context.injectFlowUUIDs[position]
+        if inject_uuid is not None and inject_uuid not in self.context.injectPositions:
+            self.report(f'$.inject_flow[{position}].inject_uuid', f'No inject has the UUID {inject_uuid}', inject_uuid)
+
+
+@lintRule
+class InjectWithoutFlow(LintRule):
+    code = 'inject-without-flow'
+    description = 'An inject has no inject_flow entry, the injects of the scenario cannot be reordered'
+
+    def finish(self):
+        for inject_uuid, positions in self.context.injectPositions.items():
+            if inject_uuid not in self.context.injectFlowPositions:
+                self.report(f'$.injects[{positions[0]}]', 'No inject_flow entry for this inject', inject_uuid)
+
+
+@lintRule
+class InjectFlowOrder(LintRule):
+    code = 'inject-flow-order'
+    severity = 'warning'
+    description = 'injects and inject_flow do not list the injects in the same order'
+
+    def __init__(self, context: LintContext):
+        super().__init__(context)
+        self.mismatches = []
+
+    def injectFlow(self, position: int, injectF: dict):
+        injectUUIDs = self.context.injectUUIDs
+        if position < len(injectUUIDs) and injectUUIDs[position] != self.context.injectFlowUUIDs[position]:
+            self.mismatches.append(position)
+
+    def finish(self):
+        # Reported once, a single moved inject shifts every following position
+        if len(self.mismatches) > 0:
+            position = self.mismatches[0]
+            self.report(
+                f'$.inject_flow[{position}].inject_uuid',
+                f'inject_flow[{position}] is for {self.context.injectFlowUUIDs[position]} but injects[{position}] is {self.context.injectUUIDs[position]} ({len(self.mismatches)} positions differ)',
+                self.context.injectFlowUUIDs[position],
+            )
+
+
+@lintRule
+class UnknownRequirement(LintRule):
+    code = 'unknown-requirement'
+    description = 'An inject requires the completion of an inject that does not exist, it can never run'
+
+    def injectFlow(self, position: int, injectF: dict):
+        requirements = injectF.get('requirements', None)
+        required_uuid = requirements.get('inject_uuid', None) if type(requirements) is dict else None
+        if required_uuid and (type(required_uuid) is not str or required_uuid not in self.context.injectPositions):
+            self.report(f'$.inject_flow[{position}].requirements.inject_uuid', f'No inject has the UUID {required_uuid}', self.context.injectFlowUUIDs[position])
+
+
+@lintRule
+class UnknownFollowedBy(LintRule):
+    code = 'unknown-followed-by'
+    severity = 'warning'
+    description = 'An inject is followed by an inject that does not exist'
+
+    def injectFlow(self, position: int, injectF: dict):
+        sequence = injectF.get('sequence', None)
+        followed_by = sequence.get('followed_by', None) if type(sequence) is dict else None
+        if type(followed_by) is not list:
+            return
+        for i, next_uuid in enumerate(followed_by):
+            if type(next_uuid) is not str or next_uuid not in self.context.injectPositions:
+                self.report(f'$.inject_flow[{position}].sequence.followed_by[{i}]', f'No inject has the UUID {next_uuid}', self.context.injectFlowUUIDs[position])
+
+
+@lintRule
+class DependencyCycle(LintRule):
+    code = 'inject-dependency-cycle'
+    description = 'Injects require (or are followed by) each other, none of them can run'
+
+    def __init__(self, context: LintContext):
+        super().__init__(context)
+        self.injectFlows = []
+
+    def injectFlow(self, position: int, injectF: dict):
+        # Only the well-formed references are kept for the graph, the other rules report the rest.
+        # Injects without requirement nor follower cannot be part of a cycle and are left out of it.
+        inject_uuid = self.context.injectFlowUUIDs[position]
+        if inject_uuid is None:
+            return
+        requirements = injectF.get('requirements', None)
+        required_uuid = requirements.get('inject_uuid', None) if type(requirements) is dict else None
+        sequence = injectF.get('sequence', None)
+        followed_by = sequence.get('followed_by', None) if type(sequence) is dict else None
+        followed_by = [next_uuid for next_uuid in followed_by if type(next_uuid) is str] if type(followed_by) is list else []
+        if type(required_uuid) is not str and len(followed_by) == 0:
+            return
+        self.injectFlows.append({
+            'inject_uuid': inject_uuid,
+            'requirements': {'inject_uuid': required_uuid} if type(required_uuid) is str else {},
+            'sequence': {'followed_by': followed_by},
+        })
+
+    def finish(self):
+        if len(self.injectFlows) == 0:
+            return
+        linked = {}  # Ordered, cycles are reported the same way on every run
+        for injectF in self.injectFlows:
+            linked[injectF['inject_uuid']] = True
+            linked[injectF['requirements'].get('inject_uuid', None)] = True
+            linked.update(dict.fromkeys(injectF['sequence']['followed_by'], True))
+        injects = [{'uuid': inject_uuid} for inject_uuid in linked if inject_uuid in self.context.injectPositions]
+        for cycle in ScenarioGraph({'injects': injects, 'inject_flow': self.injectFlows}).cycles():
+            # Edges come from inject flows, at least one inject of the cycle has one
+            inject_uuid = [member for member in cycle if member in self.context.injectFlowPositions][0]
+            position = self.context.injectFlowPositions[inject_uuid][0]
+            self.report(f'$.inject_flow[{position}]', f'Dependency cycle: {" -> ".join(cycle + [cycle[0]])}', inject_uuid)
+
+
+@lintRule
+class InvalidTiming(LintRule):
+    code = 'invalid-timing'
+    description = 'timing.periodic_run_every must be a positive number of seconds (or null), timing.triggered_at a non-negative one'
+
+    def injectFlow(self, position: int, injectF: dict):
+        timing = injectF.get('timing', None)
+        if type(timing) is not dict:
+            return
+        inject_uuid = self.context.injectFlowUUIDs[position]
+        for field, minimum in (('periodic_run_every', 'positive'), ('triggered_at', 'non-negative')):
+            value = timing.get(field, None)
+            if value is None:
+                continue
+            path = f'$.inject_flow[{position}].timing.{field}'
+            if type(value) not in (int, float) or not math.isfinite(value):
+                self.report(path, f'{value!r} is not a number of seconds', inject_uuid)
+            elif value < 0 or (value == 0 and minimum == 'positive'):
+                self.report(path, f'{value} must be {minimum}', inject_uuid)
+
+
+@lintRule
+class InvalidScoreRange(LintRule):
+    code = 'invalid-score-range'
+    description = 'The lower bound of an evaluation score_range is above its upper bound'
+
+    def inject(self, position: int, inject: dict):
+        evaluations = inject.get('inject_evaluation', None)
+        if type(evaluations) is not list:
+            return
+        for i, evaluation in enumerate(evaluations):
+            score_range = evaluation.get('score_range', None) if type(evaluation) is dict else None
+            if type(score_range) is list and len(score_range) == 2 and all([type(bound) in (int, float) for bound in score_range]) and score_range[0] > score_range[1]:
+                self.report(f'$.injects[{position}].inject_evaluation[{i}].score_range', f'{score_range[0]} is above {score_range[1]}', self.context.injectUUIDs[position])
+
+
+def lintScenario(scenario, rules: list) -> list:
+    # Single walk of the scenario, every rule visits the items while they are walked
+    context = LintContext(scenario)
+    active = [rule_class(context) for rule_class in rules]
+    hooks = {
+        name: [getattr(rule, name) for rule in active if getattr(type(rule), name) is not getattr(LintRule, name)]
+        for name in ('exercise', 'inject', 'injectFlow', 'finish')
+    }
+    if type(scenario) is not dict:
+        context.report(InvalidStructure, '$', 'The scenario is not a JSON object')
+        return context.findings
+
+    exercise = scenario.get('exercise', None)
+    if type(exercise) is dict:
+        for hook in hooks['exercise']:
+            hook(exercise)
+    else:
+        context.report(InvalidStructure, '$.exercise', 'exercise is not an object')
+
+    for key, add, hookName in (('injects', context.addInject, 'inject'), ('inject_flow', context.addInjectFlow, 'injectFlow')):
+        items = scenario.get(key, [])
+        if type(items) is not list:
+            context.report(InvalidStructure, f'$.{key}', f'{key} is not a list')
+            continue
+        for position, item in enumerate(items):
+            if type(item) is not dict:
+                context.report(InvalidStructure, f'$.{key}[{position}]', 'Not an object')
+                item = {}
+            add(position, item)
+            for hook in hooks[hookName]:
+                hook(position, item)
+
+    for hook in hooks['finish']:
+        hook()
+    return context.findings
+
+
+def lintContent(content: bytes, rules: list) -> dict:
+    codes = {rule_class.code for rule_class in rules}
+    try:
+        scenario = json.loads(content)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        findings = [{'rule': InvalidJSON.code, 'severity': InvalidJSON.severity, 'path': '$', 'message': f'json.JSONDecodeError: {e}', 'inject_uuid': None}]
+        return {'uuid': None, 'findings': [finding for finding in findings if finding['rule'] in codes]}
+    exercise = scenario.get('exercise', None) if type(scenario) is dict else None
+    scenario_uuid = exercise.get('uuid', None) if type(exercise) is dict else None
+    return {
+        'uuid': scenario_uuid if type(scenario_uuid) is str else None,
+        'findings': [finding for finding in lintScenario(scenario, rules) if finding['rule'] in codes],
+    }
+
+
+_rules = None
+
+
+def _initLintWorker(disabled_rules: list, rule_modules: list):
+    global _rules
+    loadRuleModules(rule_modules)
+    _rules = enabledRules(disabled_rules)
+
+
+def _lintInWorker(content: bytes) -> dict:
+    return lintContent(content, _rules)
+
+
+class ScenarioLinter:
+    # Lints exercise files in a pool of processes, results are cached by content hash so only new or modified
+    # files are linted again. Small batches are linted in the calling thread, starting the pool would cost more.
+    def __init__(self, workers: int = 2, disabled_rules: Iterable = (), rule_modules: Iterable = (), cache_size: int = 4096, parallel_threshold: int = 64):
+        self.workers = workers
+        self.disabled_rules = list(disabled_rules)
+        self.rule_modules = list(rule_modules)
+        self.cache_size = cache_size
+        self.parallel_threshold = parallel_threshold
+        loadRuleModules(self.rule_modules)
+        self.rules = enabledRules(self.disabled_rules)
+        self.ruleset = rulesetHash(self.rules)
+        self._cache = OrderedDict()
+        self._executor = None
+        self.hits = 0
+        self.misses = 0
+
+    def _getExecutor(self) -> Union[concurrent.futures.ProcessPoolExecutor, None]:
+        if self.workers <= 0:
+            return None
+        if self._executor is None:
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_initLintWorker,
+                initargs=(self.disabled_rules, self.rule_modules,),
+            )
+        return self._executor
+
+    def _cached(self, content_hash: Union[str, None]) -> Union[dict, None]:
+        if content_hash is None or content_hash not in self._cache:
+            return None
+        self._cache.move_to_end(content_hash)
+        return self._cache[content_hash]
+
+    def _store(self, content_hash: str, result: dict):
+        self._cache[content_hash] = result
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def lintFiles(self, files: Iterable) -> Iterator[tuple]:
+        # files: (name, path, content_hash) with content_hash None when not known. Yields (name, content_hash, result, cached)
+        # in order, with at most 2 * workers files in flight
+        files = list(files)
+        uncached = len([content_hash for _, _, content_hash in files if self._cached(content_hash) is None])
+        executor = self._getExecutor() if uncached >= self.parallel_threshold else None
+        window = deque()
+        for name, path, content_hash in files:
+            result = self._cached(content_hash)
+            if result is None:
+                try:
+                    with open(path, 'rb') as f:
+                        content = f.read()
+                except OSError as e:
+                    window.append((name, None, {'uuid': None, 'findings': [{'rule': InvalidJSON.code, 'severity': InvalidJSON.severity, 'path': '$', 'message': f'Could not read the file: {e}', 'inject_uuid': None}]}, False,))
+                    continue
+                content_hash = hashlib.sha256(content).hexdigest()
+                result = self._cached(content_hash)  # The given hash may be outdated
+            if result is not None:
+                self.hits += 1
+                window.append((name, content_hash, result, True,))
+            else:
+                self.misses += 1
+                window.append((name, content_hash, executor.submit(_lintInWorker, content) if executor is not None else lintContent(content, self.rules), False,))
+            if len(window) >= 2 * max(self.workers, 1):
+                yield self._resolve(window.popleft())
+        while window:
+            yield self._resolve(window.popleft())
+
+    def _resolve(self, pending: tuple) -> tuple:
+        name, content_hash, result, cached = pending
+        if isinstance(result, concurrent.futures.Future):
+            result = result.result()
+        if content_hash is not None and not cached:
+            self._store(content_hash, result)
+        return (name, content_hash, result, cached,)
+
+    def lintLibrary(self, files: Iterable) -> dict:
+        start = time.perf_counter()
+        results = OrderedDict()
+        filesByUUID = defaultdict(list)
+        cached = 0
+        for name, _, result, from_cache in self.lintFiles(files):
+            # Copied, the library-wide findings must not end up in the cached results
+            results[name] = {'uuid': result['uuid'], 'findings': list(result['findings'])}
+            cached += 1 if from_cache else 0
+            if result['uuid'] is not None:
+                filesByUUID[result['uuid']].append(name)
+
+        if DuplicateScenarioUUID in self.rules:
+            for scenario_uuid, names in filesByUUID.items():
+                for name in names[1:] if len(names) > 1 else []:
+                    results[name]['findings'].insert(0, {
+                        'rule': DuplicateScenarioUUID.code,
+                        'severity': DuplicateScenarioUUID.severity,
+                        'path': '$.exercise.uuid',
+                        'message': f'{names[0]} already holds the scenario {scenario_uuid}',
+                        'inject_uuid': None,
+                    })
+
+        counts = {severity: 0 for severity in SEVERITIES}
+        countsByRule = defaultdict(int)
+        for result in results.values():
+            for finding in result['findings']:
+                counts[finding['severity']] += 1
+                countsByRule[finding['rule']] += 1
+        return {
+            'ruleset': self.ruleset,
+            'files': results,
+            'summary': {
+                'files': len(results),
+                'files_with_findings': len([result for result in results.values() if len(result['findings']) > 0]),
+                'errors': counts['error'],
+                'warnings': counts['warning'],
+                'by_rule': dict(countsByRule),
+                'cached': cached,
+                'linted': len(results) - cached,
+                'duration_ms': (time.perf_counter() - start) * 1000,
+            },
+        }
+
+    def describeRules(self) -> list:
+        return [{'code': rule_class.code, 'severity': rule_class.severity, 'description': rule_class.description} for rule_class in self.rules]
+
+    def loadCache(self, path: Path):
+        # Results saved by saveCache, ignored when they were produced by other rules
+        try:
+            with open(path, 'r') as f:
+                saved = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        if saved.get('ruleset', None) == self.ruleset:
+            for content_hash, result in saved.get('results', {}).items():
+                self._store(content_hash, result)
+
+    def saveCache(self, path: Path):
+        atomicWrite(Path(path), json.dumps({'ruleset': self.ruleset, 'results': self._cache}).encode())
+
+    def stats(self) -> dict:
+        return {
+            'rules': len(self.rules),
+            'ruleset': self.ruleset,
+            'entries': len(self._cache),
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def collectFiles(paths: list) -> list:
+    files = []
+    for path in paths:
+        path = Path(path)
+        if path.is_dir():
+            files.extend([(str(json_file), json_file, None,) for json_file in sorted(path.glob('*.json'))])
+        else:
+            files.append((str(path), path, None,))
+    return files
+
+
+def commandLine():
+    parser = argparse.ArgumentParser(description='Lint scenarios: references between injects and inject flows, duplicates, dependency cycles and timings')
+    parser.add_argument('paths', nargs='*', help='Exercise files or directories, the configured exercise directory by default')
+    parser.add_argument('--workers', type=int, default=4, help='Processes linting the files, 0 lints them in this process')
+    parser.add_argument('--cache', default=None, help='JSON file keeping the results between runs, by content hash')
+    parser.add_argument('--disable', action='append', default=[], help='Rule to disable, can be repeated')
+    parser.add_argument('--rules', action='append', default=[], help='Module name or .py file registering additional rules, can be repeated')
+    parser.add_argument('--fail-on', choices=SEVERITIES, default='error', help='Lowest severity making the exit code 1')
+    parser.add_argument('--list-rules', action='store_true', help='List the rules and exit')
+    parser.add_argument('--json', action='store_true', help='Print the full report as JSON')
+    args = parser.parse_args()
+
+    try:
+        linter = ScenarioLinter(workers=args.workers, disabled_rules=args.disable, rule_modules=args.rules, parallel_threshold=2 * max(args.workers, 1))
+    except (ImportError, ValueError) as e:
+        parser.error(str(e))
+    if args.list_rules:
+        for rule in linter.describeRules():
+            print(f"{rule['code']:<28} {rule['severity']:<8} {rule['description']}")
+        sys.exit(0)
+
+    paths = args.paths
+    if len(paths) == 0:
+        try:
+            import config
+            paths = [Path(os.getenv("EXERCISE_FOLDER", config.exercise_directory))]
+        except (ImportError, AttributeError):
+            parser.error('No path given and no exercise_directory configured')
+    if args.cache:
+        linter.loadCache(args.cache)
+    try:
+        report = linter.lintLibrary(collectFiles(paths))
+    finally:
+        linter.shutdown()
+    if args.cache:
+        linter.saveCache(args.cache)
+
+    summary = report['summary']
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for name, result in report['files'].items():
+            for finding in result['findings']:
+                print(f"{name}: {finding['severity']} {finding['path']} {finding['message']} [{finding['rule']}]")
+        print(f"{summary['files']} files, {summary['errors']} errors, {summary['warnings']} warnings ({summary['cached']} cached, {summary['linted']} linted in {summary['duration_ms']:.2f} ms)")
+    failing = summary['errors'] + (summary['warnings'] if args.fail_on == 'warning' else 0)
+    sys.exit(1 if failing > 0 else 0)
+
+
+if __name__ == '__main__':
+    # Rule modules and the pool workers import `linter`, the command line runs in that module so they share its rule registry
+    import linter
+    linter.commandLine()
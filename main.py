@@ -1,35 +1,147 @@
 #!/usr/bin/env python3
 
+import asyncio
+import atexit
+from contextlib import ExitStack, asynccontextmanager, contextmanager, nullcontext
+from collections import OrderedDict
+import copy
 import datetime
+import functools
+import hashlib
 import os
 import sys
-from typing import Any, Dict, Union
+from typing import Any, Callable, Dict, Union
 from pathlib import Path
 import json
-from urllib.parse import urljoin
 import uuid
 import importlib.util
 import sys
-import requests
+import tempfile
+import threading
+import time
+import jq
+import jsonpatch
+import jsonpointer
 import jsonschema
-from jsonschema import validate
 
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 import config
-
-from fastapi import FastAPI, Request, status
+from archive import ARCHIVE_FORMATS, ArchiveError, ImportStaging, ScenarioValidationPool, iterArchiveMembers, iterExport, memberFilename, sanitizeFilename
+from catalog import ScenarioCatalog
+from fixtures import FixtureClientPool, FixtureStore
+from linter import ScenarioLinter
+from metrics import MetricsMiddleware, MetricsRegistry
+from misp_client import MISPClientPool, ResponseCache
+from payloads import BodySizeLimitMiddleware, parseContent, truncateValue
+from persistence import ScenarioWriter, encodeScenario
+from sandbox import PythonEvaluationPool, SandboxTimeout
+from shared_state import SharedState
+from scenario_graph import ScenarioGraph
+from scenario_index import ScenarioIndex
+from scenario_search import FIELD_WEIGHTS as SEARCH_FIELDS, ScenarioSearchIndex
+from watcher import ExerciseDirWatcher
+
+from fastapi import Depends, FastAPI, Query, Request, Response, status
+from pydantic import ValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
 
 EXERCISE_DIR = Path(os.getenv("EXERCISE_FOLDER", config.exercise_directory))
 CEXF_SCHEMA_PATH = Path(__file__).parent / 'schema_cexf.json'
+INJECT_EVALUATOR_PATH = Path(__file__).parent / 'tools/SkillAegis-Dashboard/backend/target_tools/misp/inject_eval.py'
+EXERCISE_MODEL_PATH = Path(__file__).parent / 'tools/SkillAegis-Dashboard/backend/target_tools/misp/exercise.py'
 CEXF_SCHEMA = {}
+VALIDATION_CACHE_SIZE = getattr(config, 'validation_cache_size', 2048)
+JQ_CACHE_SIZE = getattr(config, 'jq_cache_size', 512)
+SCENARIO_SUMMARY_FIELDS = ['uuid', 'name', 'namespace', 'description', 'version', 'level', 'priority', 'author', 'filename', 'inject_count', 'validated', 'validation_error_count']
 INJECT_EVAL_SUCCESS = 1
 INJECT_EVAL_FAIL = 2
-
-app = FastAPI()
+BATCH_TEST_CONCURRENCY = getattr(config, 'batch_test_concurrency', 8)
+PYTHON_EVAL_SANDBOX = getattr(config, 'python_eval_sandbox', True)
+WATCH_EXERCISE_DIR = getattr(config, 'watch_exercise_directory', True)
+WATCH_POLLING_INTERVAL = getattr(config, 'watch_polling_interval', 2.0)
+WATCH_FORCE_POLLING = getattr(config, 'watch_force_polling', False)
+IMPORT_MAX_FILE_SIZE = getattr(config, 'import_max_file_size', 64 * 1024 * 1024)
+REQUEST_MAX_BYTES = getattr(config, 'request_max_bytes', 64 * 1024 * 1024)
+IMPORT_MAX_BYTES = getattr(config, 'import_max_bytes', 1024 * 1024 * 1024)
+INJECT_DEBUG_MAX_BYTES = getattr(config, 'inject_debug_max_bytes', 64 * 1024)
+METRICS_SERVER_TIMING = getattr(config, 'metrics_server_timing', True)
+SCENARIO_CATALOG_PATH = os.getenv("SCENARIO_CATALOG", getattr(config, 'scenario_catalog', 'scenario_catalog.sqlite'))
+MISP_FIXTURE_MODE = os.getenv("MISP_FIXTURE_MODE", getattr(config, 'misp_fixture_mode', None))
+MISP_FIXTURE_DIR = Path(__file__).parent / os.getenv("MISP_FIXTURE_DIR", getattr(config, 'misp_fixture_directory', 'fixtures'))
+SHARED_STATE_PATH = os.getenv("SHARED_STATE", getattr(config, 'shared_state', None))
+
+mispClientPool = MISPClientPool(
+    timeout=getattr(config, 'misp_timeout', 30.0),
+    connect_timeout=getattr(config, 'misp_connect_timeout', 10.0),
+    max_connections=getattr(config, 'misp_max_connections', 20),
+    max_keepalive_connections=getattr(config, 'misp_max_keepalive_connections', 10),
+    retries=getattr(config, 'misp_retries', 2),
+    verify=getattr(config, 'misp_verify_ssl', False),
+    max_response_bytes=getattr(config, 'misp_response_max_bytes', 512 * 1024 * 1024),
+)
+if MISP_FIXTURE_MODE:
+    # Responses are recorded to, or replayed from, the fixture directory instead of only coming from MISP
+    mispClientPool = FixtureClientPool(mispClientPool, FixtureStore(MISP_FIXTURE_DIR), MISP_FIXTURE_MODE)
+pythonEvaluationPool = PythonEvaluationPool(
+    INJECT_EVALUATOR_PATH,
+    workers=getattr(config, 'python_eval_workers', 2),
+    timeout=getattr(config, 'python_eval_timeout', 10.0),
+    cpu_time_limit=getattr(config, 'python_eval_cpu_time_limit', 10),
+    memory_limit=getattr(config, 'python_eval_memory_limit', 512 * 1024 * 1024),
+    debug_max_bytes=INJECT_DEBUG_MAX_BYTES,
+)
+mispResponseCache = ResponseCache(
+    ttl=getattr(config, 'misp_response_cache_ttl', 300.0),
+    max_bytes=getattr(config, 'misp_response_cache_max_bytes', 256 * 1024 * 1024),
+    max_entries=getattr(config, 'misp_response_cache_max_entries', 256),
+)
+metricsRegistry = MetricsRegistry()
+scenarioWriter = ScenarioWriter(
+    # Other workers read the files, writes cannot be deferred when the state is shared
+    delay=0 if SHARED_STATE_PATH else getattr(config, 'persistence_write_delay', 0.5),
+    indent=getattr(config, 'scenario_json_indent', 4),
+    on_written=lambda path, scenario, content: onScenarioWritten(path, scenario, content),
+    lock_for=lambda path, scenario: getScenarioLock(scenario['exercise']['uuid']),
+    span=metricsRegistry.span,
+)
+atexit.register(scenarioWriter.close)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    exerciseDirWatcher = None
+    if PYTHON_EVAL_SANDBOX and INJECT_EVALUATOR_PATH.exists():
+        await run_in_threadpool(pythonEvaluationPool.start)
+    scenarioWriter.start()
+    if WATCH_EXERCISE_DIR:
+        exerciseDirWatcher = ExerciseDirWatcher(EXERCISE_DIR, onExerciseDirChanged, WATCH_POLLING_INTERVAL, WATCH_FORCE_POLLING)
+        exerciseDirWatcher.start()
+    yield
+    if exerciseDirWatcher is not None:
+        exerciseDirWatcher.stop()
+    await mispClientPool.close()
+    pythonEvaluationPool.shutdown()
+    scenarioValidationPool.shutdown()
+    scenarioLinter.shutdown()
+    # Pending scenario writes must reach the disk before exiting
+    await run_in_threadpool(scenarioWriter.close)
+    if scenarioCatalog is not None:
+        scenarioCatalog.close()
+    if sharedState is not None:
+        sharedState.close()
+
+
+async def sharedStateDependency():
+    # Changes made by the other workers are loaded before handling the request so reads are never stale
+    if sharedState is not None and sharedState.generation() != sharedGeneration:
+        await run_in_threadpool(syncSharedState)
+
+
+app = FastAPI(lifespan=lifespan, dependencies=[Depends(sharedStateDependency)])
 
 app.add_middleware(
     CORSMiddleware,
@@ -37,13 +149,61 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Server-Timing"],
 )
+# Only the endpoints receiving files or test data take large bodies, the archive of an import is spooled to disk
+app.add_middleware(BodySizeLimitMiddleware, limits={
+    '/scenarios/import': IMPORT_MAX_BYTES,
+    '/scenarios/save-json': REQUEST_MAX_BYTES,
+    '/injects/test': REQUEST_MAX_BYTES,
+})
+# Added last so it wraps every other middleware
+app.add_middleware(MetricsMiddleware, registry=metricsRegistry, server_timing=METRICS_SERVER_TIMING)
+
+
+class RevisionConflict(Exception):
+    def __init__(self, scenario_uuid: str):
+        super().__init__(scenario_uuid)
+        self.scenario_uuid = scenario_uuid
+
+
+@app.exception_handler(RevisionConflict)
+async def revision_conflict_handler(request: Request, exc: RevisionConflict):
+    etag = scenarioETag(exc.scenario_uuid)
+    content = error('Scenario was modified', 'The scenario was changed since it was loaded, reload it and apply the changes again', {
+        'uuid': exc.scenario_uuid,
+        'revision': scenarioRevisionByUUID.get(exc.scenario_uuid, None),
+        'etag': etag,
+    })
+    return JSONResponse(content=content, status_code=status.HTTP_412_PRECONDITION_FAILED, headers={'ETag': etag} if etag is not None else {})
 
 scenarios = []
 scenarioByUUID = {}
 scenarioValidatedByUUID = {}
+scenarioValidationErrorsByUUID = {}
 scenarioFilenameByUUID = {}
 readErrors = {}
+exerciseFileCache = {}
+scenarioCatalog = None
+catalogEntries = {}
+sharedState = None
+sharedGeneration = None
+sharedStateLock = threading.Lock()
+scenarioIndexByUUID = {}
+scenarioRevisionByUUID = {}
+scenarioGraphByUUID = {}
+scenarioSearchIndex = ScenarioSearchIndex()
+searchIndexLock = threading.Lock()
+scenarioLocks = {}
+scenarioLocksLock = threading.Lock()
+revisionLock = threading.Lock()
+REVISION_EPOCH = uuid.uuid4().hex[:8]  # ETags of a previous run never match
+summaryGeneration = 0  # Bumped on every change of the listed scenarios, the ETags of /scenarios/summary derive from it
+SUMMARY_EPOCH = uuid.uuid4().hex[:8]  # Not shared between workers, unlike REVISION_EPOCH, as each one counts its own changes
+reloadLock = threading.Lock()
+moduleRegistry = {}
+moduleRegistryLock = threading.Lock()
+eventSubscribers = set()
 
 
 def load_schema(schema_path):
@@ -51,7 +211,21 @@ def load_schema(schema_path):
         schema = json.load(schema_file)
     return schema
 
+def compile_validator(schema) -> jsonschema.protocols.Validator:
+    validator_class = jsonschema.validators.validator_for(schema)
+    validator_class.check_schema(schema)
+    return validator_class(schema, format_checker=validator_class.FORMAT_CHECKER)
+
 CEXF_SCHEMA = load_schema(CEXF_SCHEMA_PATH)
+CEXF_VALIDATOR = compile_validator(CEXF_SCHEMA)
+validationCache = OrderedDict()
+scenarioValidationPool = ScenarioValidationPool(CEXF_SCHEMA, CEXF_VALIDATOR, workers=getattr(config, 'import_validation_workers', 2))
+scenarioLinter = ScenarioLinter(
+    workers=getattr(config, 'lint_workers', 2),
+    disabled_rules=getattr(config, 'lint_disabled_rules', []),
+    rule_modules=getattr(config, 'lint_rule_modules', []),
+    cache_size=getattr(config, 'lint_cache_size', 4096),
+)
 
 
 def register_exception(app: FastAPI):
@@ -63,75 +237,474 @@ def register_exception(app: FastAPI):
         return JSONResponse(content=content, status_code=status.HTTP_422_UNPROCESSABLE_ENTITY)
 
 
+def loadModule(name: str, module_path: Path):
+    # Modules are executed once and kept in the registry until their source file changes
+    mtime = module_path.stat().st_mtime_ns
+    with moduleRegistryLock:
+        entry = moduleRegistry.get(name, None)
+        if entry is not None and entry['mtime_ns'] == mtime:
+            return entry['module']
+
+        start = time.perf_counter()
+        spec = importlib.util.spec_from_file_location(name, module_path)
+        mod = importlib.util.module_from_spec(spec)
+        sys.modules[name] = mod
+        # Include backend to allow import from other files
+        backend_path = os.path.abspath(os.path.join(os.path.dirname(module_path), '../../..'))
+        if backend_path not in sys.path:
+            sys.path.insert(0, backend_path)
+        with metricsRegistry.span('module_load'):
+            spec.loader.exec_module(mod)
+        moduleRegistry[name] = {
+            'module': mod,
+            'path': str(module_path),
+            'mtime_ns': mtime,
+            'loaded_at': datetime.datetime.now().isoformat(),
+            'load_count': entry['load_count'] + 1 if entry is not None else 1,
+            'load_duration_ms': (time.perf_counter() - start) * 1000,
+        }
+        return mod
+
+
+@functools.lru_cache(maxsize=JQ_CACHE_SIZE)
+def compileJq(path: str):
+    return jq.compile(path)
+
+
+class CachedJqModule:
+    # Stands in for the `jq` module of the evaluator so its jq.compile() calls go through the compiled program cache
+    def compile(self, program, *args, **kwargs):
+        if args or kwargs:
+            return jq.compile(program, *args, **kwargs)
+        return compileJq(program)
+
+    def __getattr__(self, name):
+        return getattr(jq, name)
+
+
 def loadInjectEvaluator():
-    current_dir = os.path.dirname(os.path.realpath(__file__))
-    subdir = "/tools/SkillAegis-Dashboard/backend/target_tools/misp/inject_eval.py"
-    spec = importlib.util.spec_from_file_location("inject_eval", current_dir + subdir)
-    mod = importlib.util.module_from_spec(spec)
-    sys.modules["inject_eval"] = mod
-    # Include backend to allow import from other files
-    backend_path = os.path.abspath(os.path.join(os.path.dirname(current_dir + subdir), '../../..'))
-    sys.path.insert(0, backend_path)
-    spec.loader.exec_module(mod)
+    mod = loadModule('inject_eval', INJECT_EVALUATOR_PATH)
+    if getattr(mod, 'jq', None) is jq:
+        mod.jq = CachedJqModule()
     return mod
 
 
 def loadExerciseModel():
-    current_dir = os.path.dirname(os.path.realpath(__file__))
-    subdir = "/tools/SkillAegis-Dashboard/backend/target_tools/misp/exercise.py"
-    spec = importlib.util.spec_from_file_location("exercise", current_dir + subdir)
-    mod = importlib.util.module_from_spec(spec)
-    # Include backend to allow import from other files
-    backend_path = os.path.abspath(os.path.join(os.path.dirname(current_dir + subdir), '../../..'))
-    sys.path.insert(0, backend_path)
-    sys.modules["exercise"] = mod
-    spec.loader.exec_module(mod)
-    return mod
+    return loadModule('exercise', EXERCISE_MODEL_PATH)
+
+
+def jqCacheDiagnostics() -> dict:
+    cache_info = compileJq.cache_info()
+    return {
+        'hits': cache_info.hits,
+        'misses': cache_info.misses,
+        'size': cache_info.currsize,
+        'max_size': cache_info.maxsize,
+    }
+
+
+def moduleDiagnostics() -> dict:
+    with moduleRegistryLock:
+        modules = {
+            name: {key: value for key, value in entry.items() if key != 'module'} for name, entry in moduleRegistry.items()
+        }
+    return {
+        'modules': modules,
+        'sys_path_length': len(sys.path),
+    }
+
+
+def cacheRequests() -> dict:
+    # (hits, misses) of every cache of the back-end
+    validationRequests = metricsRegistry.counterValues('validation_cache_requests_total')
+    jqCache = compileJq.cache_info()
+    responseCache = mispResponseCache.stats()
+    return {
+        'validation': (validationRequests.get((('result', 'hit'),), 0), validationRequests.get((('result', 'miss'),), 0),),
+        'jq': (jqCache.hits, jqCache.misses,),
+        'misp_response': (responseCache['hits'], responseCache['misses'],),
+        'lint': (scenarioLinter.hits, scenarioLinter.misses,),
+    }
+
+
+def registerMetricGauges():
+    # Read at scrape time, nothing is maintained on the hot paths for these
+    metricsRegistry.gauge('scenarios', lambda: len(scenarios), 'Number of loaded scenarios')
+    metricsRegistry.gauge('scenarios_invalid', lambda: len([v for v in scenarioValidatedByUUID.values() if v is not True]), 'Number of scenarios failing the CEXF schema validation')
+    metricsRegistry.gauge('read_errors', lambda: len(readErrors), 'Number of exercise files that could not be read')
+    metricsRegistry.gauge('cache_hits_total', lambda: {(('cache', name),): hits for name, (hits, _) in cacheRequests().items()}, 'Cache hits', 'counter')
+    metricsRegistry.gauge('cache_misses_total', lambda: {(('cache', name),): misses for name, (_, misses) in cacheRequests().items()}, 'Cache misses', 'counter')
+    metricsRegistry.gauge('cache_hit_ratio', lambda: {(('cache', name),): hits / (hits + misses) if hits + misses > 0 else 0.0 for name, (hits, misses) in cacheRequests().items()}, 'Cache hits over lookups since start')
+    metricsRegistry.gauge('cache_entries', lambda: {
+        (('cache', 'validation'),): len(validationCache),
+        (('cache', 'jq'),): compileJq.cache_info().currsize,
+        (('cache', 'misp_response'),): mispResponseCache.stats()['entries'],
+        (('cache', 'scenario_index'),): len(scenarioIndexByUUID),
+        (('cache', 'scenario_graph'),): len(scenarioGraphByUUID),
+        (('cache', 'lint'),): scenarioLinter.stats()['entries'],
+    }, 'Number of cached entries')
+    metricsRegistry.gauge('misp_response_cache_bytes', lambda: mispResponseCache.stats()['bytes'], 'Size of the cached MISP responses')
+    metricsRegistry.gauge('search_index_scenarios', lambda: scenarioSearchIndex.stats()['scenarios'], 'Number of scenarios in the search index')
+    metricsRegistry.gauge('search_index_tokens', lambda: scenarioSearchIndex.stats()['tokens'], 'Number of distinct tokens in the search index')
+    metricsRegistry.gauge('scenario_writes_total', lambda: scenarioWriter.stats()['writes'], 'Scenario files written', 'counter')
+    metricsRegistry.gauge('scenario_write_errors_total', lambda: scenarioWriter.stats()['errors'], 'Failed scenario file writes', 'counter')
+    metricsRegistry.gauge('scenario_writes_coalesced_total', lambda: scenarioWriter.stats()['coalesced'], 'Scenario saves merged into a pending write', 'counter')
+    metricsRegistry.gauge('scenario_written_bytes_total', lambda: scenarioWriter.stats()['bytes_written'], 'Bytes of scenario files written', 'counter')
+    metricsRegistry.gauge('scenario_writes_pending', lambda: scenarioWriter.stats()['pending'], 'Scenario saves waiting to be written')
+    metricsRegistry.gauge('module_loads_total', lambda: {(('module', name),): entry['load_count'] for name, entry in moduleDiagnostics()['modules'].items()}, 'Executions of the evaluator modules', 'counter')
+
+
+def fingerprint_file(json_file: Path) -> tuple:
+    stat = json_file.stat()
+    return (stat.st_mtime_ns, stat.st_size,)
+
+
+def parse_exercise_file(relative_file: str, content: bytes, fingerprint: tuple, content_hash: str) -> dict:
+    entry = {
+        'fingerprint': fingerprint,
+        'hash': content_hash,
+        'exercise': None,
+        'error': None,
+        'validation': None,
+        'validation_errors': [],
+    }
+    try:
+        entry['exercise'] = json.loads(content)
+    except json.JSONDecodeError as e:
+        errorStr = f"json.JSONDecodeError: {e.msg}"
+        entry['error'] = {
+            'error': errorStr,
+            'text': content.decode('utf-8', errors='replace'),
+        }
+        print(relative_file + ' - ' + errorStr)
+    return entry
 
 
 def read_exercise_dir():
-    global scenarioFilenameByUUID, readErrors
+    # Only re-parse files whose (mtime, size) changed and whose content hash differs from the cached one
+    global scenarioFilenameByUUID, readErrors, exerciseFileCache
     scenarioFilenameByUUID = {}
     readErrors = {}
 
     target_dir = EXERCISE_DIR
     json_files = target_dir.glob("*.json")
     exercises = []
+    fileCache = {}
+    changes = {
+        'added': [],
+        'modified': [],
+        'removed': [],
+    }
     for json_file in list(json_files):
-        with open(json_file) as f:
-            try:
-                parsed_exercise = json.load(f)
-                exercises.append(parsed_exercise)
-                uuid = parsed_exercise['exercise']['uuid']
-                scenarioFilenameByUUID[uuid] = json_file.relative_to(EXERCISE_DIR)
-            except json.JSONDecodeError as e:
-                relative_file = str(json_file.relative_to(EXERCISE_DIR))
-                errorStr = f"json.JSONDecodeError: {e.msg}"
-                f.seek(0)
-                text = f.read()
-                readErrors[relative_file] = {
-                    'error': errorStr,
-                    'text': text,
-                }
-                print(relative_file + ' - ' + errorStr)
-    return exercises
-
-
-def validate_json(data, schema) -> Union[bool, str]:
-    try:
-        validate(instance=data, schema=schema)
+        relative_file = str(json_file.relative_to(EXERCISE_DIR))
+        cached = exerciseFileCache.get(relative_file, None)
+        cataloged = catalogEntries.get(relative_file, None)
+        try:
+            fingerprint = fingerprint_file(json_file)
+            if cached is not None and cached['fingerprint'] == fingerprint:
+                entry = cached
+            elif cached is None and cataloged is not None and cataloged['fingerprint'] == fingerprint:
+                # Unchanged since it was cataloged, the content hash and the validation result are reused
+                with open(json_file, 'rb') as f:
+                    content = f.read()
+                entry = parse_exercise_file(relative_file, content, fingerprint, cataloged['hash'])
+                if entry['error'] is None:
+                    entry['validation'] = cataloged['validation']
+                    entry['validation_errors'] = cataloged['validation_errors']
+                changes['added'].append(relative_file)
+            else:
+                with open(json_file, 'rb') as f:
+                    content = f.read()
+                content_hash = hashlib.sha256(content).hexdigest()
+                if cached is not None and cached['hash'] == content_hash:
+                    cached['fingerprint'] = fingerprint
+                    entry = cached
+                else:
+                    entry = parse_exercise_file(relative_file, content, fingerprint, content_hash)
+                    changes['modified' if cached is not None else 'added'].append(relative_file)
+        except FileNotFoundError:  # Removed while scanning
+            continue
+
+        fileCache[relative_file] = entry
+        if entry['error'] is not None:
+            readErrors[relative_file] = entry['error']
+        else:
+            exercises.append(entry['exercise'])
+            uuid = entry['exercise']['exercise']['uuid']
+            scenarioFilenameByUUID[uuid] = json_file.relative_to(EXERCISE_DIR)
+
+    changes['removed'] = [relative_file for relative_file in exerciseFileCache if relative_file not in fileCache]
+    exerciseFileCache = fileCache
+    catalogEntries.clear()  # Only used for the first read
+    return exercises, changes
+
+
+def hash_json(data) -> str:
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+
+def validation_errors(data, content_hash: Union[str, None] = None) -> list:
+    if content_hash is None:
+        content_hash = hash_json(data)
+    if content_hash in validationCache:
+        validationCache.move_to_end(content_hash)
+        metricsRegistry.inc('validation_cache_requests_total', {'result': 'hit'}, help='Lookups of the schema validation cache')
+        return validationCache[content_hash]
+
+    metricsRegistry.inc('validation_cache_requests_total', {'result': 'miss'}, help='Lookups of the schema validation cache')
+    with metricsRegistry.span('validation'):
+        errors = [
+            {
+                'path': err.json_path,
+                'message': err.message,
+                'validator': err.validator,
+            } for err in sorted(CEXF_VALIDATOR.iter_errors(data), key=lambda err: err.json_path)
+        ]
+    cacheValidationErrors(content_hash, errors)
+    return errors
+
+
+def cacheValidationErrors(content_hash: str, errors: list):
+    validationCache[content_hash] = errors
+    if len(validationCache) > VALIDATION_CACHE_SIZE:
+        validationCache.popitem(last=False)
+
+
+def format_validation_errors(errors: list) -> Union[bool, str]:
+    if len(errors) == 0:
         return True
-    except jsonschema.exceptions.ValidationError as err:
-        return str(err)
+    return '\n'.join([f"{err['path']}: {err['message']}" for err in errors])
+
+
+def reloadJsonFiles() -> dict:
+    global scenarios, scenarioByUUID, scenarioValidatedByUUID, scenarioValidationErrorsByUUID
+    with reloadLock, metricsRegistry.span('scenario_reload'):
+        scenarios, changes = read_exercise_dir()
+        for filename in changes['modified'] + changes['removed']:
+            # Changed on disk by someone else, a pending save of the replaced scenario would overwrite that change
+            if scenarioWriter.cancel(EXERCISE_DIR / filename):
+                print(f'{filename} was changed on disk, its pending save was discarded')
+        scenarioByUUID = { e['exercise']['uuid']: e for e in scenarios }
+        scenarioValidatedByUUID = {}
+        scenarioValidationErrorsByUUID = {}
+        catalogRows = []
+        for filename, entry in exerciseFileCache.items():
+            if entry['exercise'] is None:
+                continue
+            if entry['validation'] is None:  # Only new or modified files need to be validated again
+                entry['validation_errors'] = validation_errors(entry['exercise'], entry['hash'])
+                entry['validation'] = format_validation_errors(entry['validation_errors'])
+                catalogRows.append(catalogRow(filename, entry))
+            scenario_uuid = entry['exercise']['exercise']['uuid']
+            scenarioValidatedByUUID[scenario_uuid] = entry['validation']
+            scenarioValidationErrorsByUUID[scenario_uuid] = entry['validation_errors']
+        changedContents = []
+        for filename in changes['added'] + changes['modified']:
+            entry = exerciseFileCache[filename]
+            if entry['exercise'] is not None:
+                changedContents.append((entry['exercise']['exercise']['uuid'], entry['hash'],))
+        if sharedState is not None:
+            observeScenarioContents(changedContents)
+        else:
+            for scenario_uuid, _ in changedContents:
+                bumpScenarioRevision(scenario_uuid)
+        if scenarioCatalog is not None:
+            scenarioCatalog.upsert(catalogRows)
+            if len(changes['added']) > 0 or len(changes['removed']) > 0:
+                scenarioCatalog.retain(set(exerciseFileCache.keys()))
+        if len(changes['added']) > 0 or len(changes['modified']) > 0 or len(changes['removed']) > 0:
+            bumpSummaryGeneration()
+    return changes
+
+
+def catalogRow(filename: str, entry: dict) -> tuple:
+    scenario = entry['exercise']
+    exercise = scenario.get('exercise', {}) or {}
+    summary = {
+        'uuid': exercise.get('uuid', None),
+        'name': exercise.get('name', ''),
+        'namespace': exercise.get('namespace', ''),
+        'version': exercise.get('version', ''),
+        'inject_count': len(scenario.get('injects', []) or []),
+    }
+    return (filename, entry['fingerprint'], entry['hash'], summary, entry['validation'], entry['validation_errors'],)
+
+
+def openCatalog():
+    global scenarioCatalog, catalogEntries
+    if not SCENARIO_CATALOG_PATH:
+        return
+    try:
+        scenarioCatalog = ScenarioCatalog(Path(__file__).parent / SCENARIO_CATALOG_PATH, EXERCISE_DIR, hash_json(CEXF_SCHEMA))
+        catalogEntries = scenarioCatalog.load()
+    except Exception as e:  # The editor still works without the catalog, only slower to start
+        print(f'Could not open the scenario catalog: {e}')
+        scenarioCatalog = None
+        catalogEntries = {}
+
+
+def openSharedState():
+    global sharedState, sharedGeneration, REVISION_EPOCH
+    if not SHARED_STATE_PATH:
+        return
+    sharedState = SharedState(Path(__file__).parent / SHARED_STATE_PATH, EXERCISE_DIR)
+    sharedGeneration = sharedState.generation()
+    REVISION_EPOCH = sharedState.epoch  # Every worker hands out the same ETags
+
+
+def syncSharedState():
+    global sharedGeneration
+    with sharedStateLock:
+        generation = sharedState.generation()
+        if generation == sharedGeneration:
+            return
+        # Read before reloading, a change made during the reload triggers another one
+        sharedGeneration = generation
+        onExerciseDirChanged()
+
 
+def observeScenarioContents(contents: list):
+    # Shared state: the revision follows the file content, the first worker seeing a new content hash bumps it
+    revisions = sharedState.observe(contents)
+    with revisionLock:
+        scenarioRevisionByUUID.update(revisions)
+    bumpSummaryGeneration()
 
-def reloadJsonFiles():
-    global scenarios, scenarioByUUID, scenarioValidatedByUUID
-    scenarios = read_exercise_dir()
-    scenarioByUUID = { e['exercise']['uuid']: e for e in scenarios }
-    scenarioValidatedByUUID = { e['exercise']['uuid']: validate_json(e, CEXF_SCHEMA) for e in scenarios }
 
+def sharedScenarioLock(scenario_uuid: str):
+    return sharedState.lock(f'scenario-{scenario_uuid}') if sharedState is not None else nullcontext()
+
+
+def onExerciseDirChanged():
+    previousUUIDByFilename = {
+        filename: entry['exercise']['exercise']['uuid'] for filename, entry in exerciseFileCache.items() if entry['exercise'] is not None
+    }
+    changes = reloadJsonFiles()
+    events = []
+    for filename in changes['added'] + changes['modified']:
+        entry = exerciseFileCache.get(filename, None)
+        if entry is None:
+            continue
+        if entry['error'] is not None:
+            events.append({'type': 'read_error', 'filename': filename, 'error': entry['error']})
+            continue
+        scenario_uuid = entry['exercise']['exercise']['uuid']
+        events.append({
+            'type': 'scenario_updated',
+            'filename': filename,
+            'uuid': scenario_uuid,
+            'scenario': entry['exercise'],
+            'validation': entry['validation'],
+            'validation_errors': entry['validation_errors'],
+            'etag': scenarioETag(scenario_uuid),
+            'summary': summarizeScenario(entry['exercise']),  # Patched into the scenario list without re-fetching the index
+        })
+    for filename in changes['removed']:
+        events.append({'type': 'scenario_removed', 'filename': filename, 'uuid': previousUUIDByFilename.get(filename, None)})
+    publishScenarioEvents(events)
+
+
+def onScenarioWritten(path: Path, scenario: Union[dict, None], content: bytes):
+    # Our own writes are recorded in the file cache so the watcher does not re-parse them and replace the in-memory scenario
+    if scenario is None:
+        return
+    relative_file = str(path.relative_to(EXERCISE_DIR))
+    try:
+        fingerprint = fingerprint_file(path)
+    except FileNotFoundError:  # Deleted in the meantime
+        return
+    # Hashed like the files read from disk so a later reload finds the validation in the cache
+    content_hash = hashlib.sha256(content).hexdigest()
+    errors = validation_errors(scenario, content_hash)
+    validation = format_validation_errors(errors)
+    with reloadLock:
+        entry = exerciseFileCache.get(relative_file, None)
+        if entry is not None and entry['exercise'] is not scenario:
+            # Reloaded from disk since the save was queued, the watcher picks this write up as a change of the file
+            return
+        if entry is None:
+            entry = {
+                'fingerprint': fingerprint,
+                'hash': None,
+                'exercise': scenario,
+                'error': None,
+                'validation': None,
+                'validation_errors': [],
+            }
+            exerciseFileCache[relative_file] = entry
+        entry['fingerprint'] = fingerprint
+        entry['hash'] = content_hash
+        entry['validation_errors'] = errors
+        entry['validation'] = validation
+        scenario_uuid = scenario['exercise']['uuid']
+        scenarioValidatedByUUID[scenario_uuid] = validation
+        scenarioValidationErrorsByUUID[scenario_uuid] = errors
+        bumpSummaryGeneration()
+        if scenarioCatalog is not None:
+            scenarioCatalog.upsert([catalogRow(relative_file, entry)])
+        if sharedState is not None:
+            observeScenarioContents([(scenario_uuid, entry['hash'],)])
+
+
+def getScenarioLock(scenario_uuid: str) -> threading.RLock:
+    with scenarioLocksLock:
+        return scenarioLocks.setdefault(scenario_uuid, threading.RLock())
+
+
+def bumpScenarioRevision(scenario_uuid: str) -> int:
+    with revisionLock:
+        revision = scenarioRevisionByUUID.get(scenario_uuid, 0) + 1
+        scenarioRevisionByUUID[scenario_uuid] = revision
+    bumpSummaryGeneration()
+    return revision
+
+
+def bumpSummaryGeneration():
+    global summaryGeneration
+    with revisionLock:
+        summaryGeneration += 1
+
+
+def scenarioETag(scenario_uuid: str) -> Union[str, None]:
+    revision = scenarioRevisionByUUID.get(scenario_uuid, None)
+    if revision is None:
+        return None
+    return f'"{REVISION_EPOCH}-{revision}"'
+
+
+def etagMatches(scenario_uuid: str, if_match: str) -> bool:
+    etag = scenarioETag(scenario_uuid)
+    if etag is None:
+        return False
+    candidates = [candidate.strip() for candidate in if_match.split(',')]
+    return '*' in candidates or etag in candidates
+
+
+@contextmanager
+def scenarioRevision(scenario_uuid: str, request: Request, response: Response):
+    # Serialises the mutations of one scenario and rejects those made against an outdated revision (If-Match)
+    with getScenarioLock(scenario_uuid), sharedScenarioLock(scenario_uuid):
+        if sharedState is not None:
+            syncSharedState()  # Another worker may have changed the scenario since the request started
+        if_match = request.headers.get('if-match', None)
+        if if_match is not None and not etagMatches(scenario_uuid, if_match):
+            raise RevisionConflict(scenario_uuid)
+        yield
+        etag = scenarioETag(scenario_uuid)
+        if etag is not None:
+            response.headers['ETag'] = etag
+
+
+def publishScenarioEvents(events: list):
+    # Called from the watcher thread, events are handed over to each subscriber's event loop
+    for loop, queue in list(eventSubscribers):
+        for event in events:
+            loop.call_soon_threadsafe(queue.put_nowait, event)
+
+openCatalog()
+openSharedState()
 reloadJsonFiles()
+registerMetricGauges()
 
 
 def success(title: str, message: str = '', payload: dict = {}) -> dict:
@@ -151,6 +724,93 @@ def error(title: str, errorMessage: str, payload: dict = {}) -> dict:
     }
 
 
+def summarizeScenario(scenario: dict) -> dict:
+    exercise = scenario['exercise']
+    meta = exercise.get('meta', {}) or {}
+    scenario_uuid = exercise['uuid']
+    filename = scenarioFilenameByUUID.get(scenario_uuid, None)
+    return {
+        'uuid': scenario_uuid,
+        'name': exercise.get('name', ''),
+        'namespace': exercise.get('namespace', ''),
+        'description': exercise.get('description', ''),
+        'version': exercise.get('version', ''),
+        'level': meta.get('level', None),
+        'priority': meta.get('priority', None),
+        'author': meta.get('author', None),
+        'filename': str(filename) if filename is not None else None,
+        'inject_count': len(scenario.get('injects', [])),
+        'validated': scenarioValidatedByUUID.get(scenario_uuid, None) is True,
+        'validation_error_count': len(scenarioValidationErrorsByUUID.get(scenario_uuid, [])),
+    }
+
+
+def scenarioSummaryIndex(page: int, limit: int, namespace: Union[str, None], level: Union[str, None], validated: Union[bool, None], fields: Union[list, None]) -> dict:
+    summaries = []
+    for scenario in scenarios:
+        summary = summarizeScenario(scenario)
+        if namespace is not None and summary['namespace'] != namespace:
+            continue
+        if level is not None and summary['level'] != level:
+            continue
+        if validated is not None and summary['validated'] != validated:
+            continue
+        summaries.append(summary)
+
+    start = (page - 1) * limit
+    pageSummaries = summaries[start:start + limit]
+    if fields is not None:
+        fields = ['uuid'] + [field for field in fields if field in SCENARIO_SUMMARY_FIELDS and field != 'uuid']
+        pageSummaries = [{field: summary[field] for field in fields} for summary in pageSummaries]
+    return {
+        'total': len(summaries),
+        'page': page,
+        'limit': limit,
+        'scenarios': pageSummaries,
+        'read_errors': readErrors,
+    }
+
+
+def syncSearchIndex():
+    # Only scenarios whose revision changed since they were indexed are indexed again
+    with searchIndexLock:
+        currentScenarioByUUID = scenarioByUUID
+        for scenario_uuid in [scenario_uuid for scenario_uuid in scenarioSearchIndex.tokensByScenario if scenario_uuid not in currentScenarioByUUID]:
+            scenarioSearchIndex.remove(scenario_uuid)
+        for scenario_uuid, scenario in list(currentScenarioByUUID.items()):
+            revision = scenarioRevisionByUUID.get(scenario_uuid, None)
+            if scenarioSearchIndex.isStale(scenario_uuid, revision):
+                with getScenarioLock(scenario_uuid):
+                    scenarioSearchIndex.upsert(scenario_uuid, scenario, revision)
+
+
+def searchScenarios(query: str, fields: Union[list, None], namespace: Union[str, None], level: Union[str, None], validated: Union[bool, None], limit: int) -> dict:
+    start = time.perf_counter()
+    syncSearchIndex()
+    candidates = None
+    if namespace is not None or level is not None or validated is not None:
+        candidates = set()
+        for scenario_uuid, scenario in list(scenarioByUUID.items()):
+            summary = summarizeScenario(scenario)
+            if namespace is not None and summary['namespace'] != namespace:
+                continue
+            if level is not None and summary['level'] != level:
+                continue
+            if validated is not None and summary['validated'] != validated:
+                continue
+            candidates.add(scenario_uuid)
+
+    with searchIndexLock:
+        result = scenarioSearchIndex.search(query, fields, candidates, limit)
+    for scenarioResult in result['results']:
+        exercise = scenarioByUUID[scenarioResult['uuid']]['exercise']
+        scenarioResult['name'] = exercise.get('name', '')
+        scenarioResult['namespace'] = exercise.get('namespace', '')
+    result['query'] = query
+    result['took_ms'] = round((time.perf_counter() - start) * 1000, 3)
+    return result
+
+
 def marshallInjectFlow(injectF: dict) -> dict:
     injectF['inject_uuid'] = injectF.get('inject_uuid', '')
     injectF['description'] = injectF.get('description', '')
@@ -190,16 +850,16 @@ def createScenario(newExercise) -> Union[dict, str]:
 
     filename = "".join( x for x in newExercise.name if (x.isalnum() or x in "._- "))
     filename = f"{filename}.json"
-    try:
-        with open(EXERCISE_DIR / filename, 'w') as f:
-            json.dump(scenario, f, indent=4)
-    except Exception as e:
-        print(e)
-        return e
+    result = scenarioWriter.writeNow(EXERCISE_DIR / filename, scenario)
+    if result is not True:
+        return result
     
-    scenarios.append(scenario)
-    scenarioByUUID[exercise['uuid']] = scenario
-    scenarioFilenameByUUID[exercise['uuid']] = filename
+    with reloadLock:
+        scenarios.append(scenario)
+        scenarioByUUID[exercise['uuid']] = scenario
+        scenarioFilenameByUUID[exercise['uuid']] = filename
+    if sharedState is None:  # Otherwise set from the written content
+        bumpScenarioRevision(exercise['uuid'])
     return scenario
 
 
@@ -217,16 +877,10 @@ def editScenario(updatedScenario) -> Union[dict, str]:
     scenario['exercise']['version'] = f"{today.year}{today.month}{today.day}"
     scenario['exercise']['meta'] = updatedScenario.meta
     scenario['inject_flow'] = [marshallInjectFlow(injectF) for injectF in scenario['inject_flow']]
-    filename = scenarioFilenameByUUID[theUUID]
-    try:
-        with open(EXERCISE_DIR / filename, 'w') as f:
-            json.dump(scenario, f, indent=4)
-    except Exception as e:
-        print(e)
-        return e
-    for i, sce in enumerate(scenarios):
-        if sce['exercise']['uuid'] == scenario['exercise']['uuid']:
-            scenarios[i] = scenario
+    result = saveScenario(theUUID, scenario)
+    if result is not True:
+        return result
+    # The scenario was updated in place, `scenarios` holds the same object
     scenarioByUUID[theUUID] = scenario
     return scenario
 
@@ -236,16 +890,54 @@ def deleteScenario(uuid: str) -> Union[bool, str]:
 
     if uuid in scenarioFilenameByUUID:
         try:
+            scenarioWriter.cancel(EXERCISE_DIR / scenarioFilenameByUUID[uuid])
             os.remove(EXERCISE_DIR / scenarioFilenameByUUID[uuid])
         except Exception as e:
             print(e)
             return e
-        del scenarioByUUID[uuid]
-        scenarios = [s for s in scenarios if s['exercise']['uuid'] != uuid]
+        with reloadLock:
+            filename = str(scenarioFilenameByUUID.pop(uuid))
+            exerciseFileCache.pop(filename, None)
+            del scenarioByUUID[uuid]
+            scenarioValidatedByUUID.pop(uuid, None)
+            scenarioValidationErrorsByUUID.pop(uuid, None)
+            scenarioIndexByUUID.pop(uuid, None)
+            scenarioRevisionByUUID.pop(uuid, None)
+            scenarioGraphByUUID.pop(uuid, None)
+            scenarios = [s for s in scenarios if s['exercise']['uuid'] != uuid]
+            bumpSummaryGeneration()
+            if scenarioCatalog is not None:
+                scenarioCatalog.retain(set(exerciseFileCache.keys()))
+        if sharedState is not None:
+            sharedState.forget(uuid)
+        # The watcher no longer sees the file in the cache, the other editors are notified here
+        publishScenarioEvents([{'type': 'scenario_removed', 'filename': filename, 'uuid': uuid}])
         return True
     return 'Scenario not found'
 
 
+def getScenarioIndex(scenario_uuid: str) -> ScenarioIndex:
+    # Built lazily and rebuilt when the scenario or its inject lists were replaced (reload, edit, reorder)
+    scenario = scenarioByUUID[scenario_uuid]
+    index = scenarioIndexByUUID.get(scenario_uuid, None)
+    if index is None or index.isStale(scenario):
+        index = ScenarioIndex(scenario)
+        scenarioIndexByUUID[scenario_uuid] = index
+    return index
+
+
+def getScenarioGraph(scenario_uuid: str) -> dict:
+    # Analysed once per scenario revision
+    with getScenarioLock(scenario_uuid):
+        revision = scenarioRevisionByUUID.get(scenario_uuid, None)
+        cached = scenarioGraphByUUID.get(scenario_uuid, None)
+        if cached is not None and cached[0] == revision:
+            return cached[1]
+        graph = ScenarioGraph(scenarioByUUID[scenario_uuid]).toDict()
+        scenarioGraphByUUID[scenario_uuid] = (revision, graph,)
+        return graph
+
+
 def saveInject(scenario_uuid: str, injectToSave, injectFlowToSave) -> Union[dict, str]:
     global scenarios, scenarioByUUID
 
@@ -253,23 +945,10 @@ def saveInject(scenario_uuid: str, injectToSave, injectFlowToSave) -> Union[dict
         return 'Invalid scenario'
     scenario = scenarioByUUID[scenario_uuid]
 
-    # Search inject in scenario and create/update it
-    injectToSave = injectToSave.dict()
-    found = False
-    for i, inject in enumerate(scenario['injects']):
-        if inject['uuid'] == injectToSave['uuid']:
-            scenario['injects'][i] = injectToSave
-            found = True
-    if not found:
-        scenario['injects'].append(injectToSave)
-
-    injectFlowToSave = injectFlowToSave.dict()
-    for i, injectF in enumerate(scenario['inject_flow']):
-        if injectF['inject_uuid'] == injectFlowToSave['inject_uuid']:
-            scenario['inject_flow'][i] = marshallInjectFlow(injectFlowToSave)
-            found = True
-    if not found:
-        scenario['inject_flow'].append(marshallInjectFlow(injectFlowToSave))
+    # Create or update the inject and its flow
+    index = getScenarioIndex(scenario_uuid)
+    index.upsertInject(injectToSave.dict())
+    index.upsertInjectFlow(marshallInjectFlow(injectFlowToSave.dict()))
 
     saveResult = saveScenario(scenario_uuid, scenario)
     return saveResult
@@ -278,22 +957,199 @@ def saveInject(scenario_uuid: str, injectToSave, injectFlowToSave) -> Union[dict
 def saveScenario(scenario_uuid: str, scenario: dict) -> Union[bool, str]:
     global scenarioFilenameByUUID
     filename = scenarioFilenameByUUID[scenario_uuid]
+    if sharedState is None:  # Otherwise set from the written content
+        bumpScenarioRevision(scenario_uuid)
+    # Written behind: successive saves of the same scenario are coalesced into one atomic write
+    return scenarioWriter.save(EXERCISE_DIR / filename, scenario)
+
+
+def copyPatchedContainers(document: dict, operations: list) -> dict:
+    # Shallow-copies only the containers on the paths touched by the patch, the rest is shared with the original
+    patched = dict(document)
+    copied = {id(patched)}
+    for operation in operations:
+        for pointer in (operation.get('path', None), operation.get('from', None),):
+            if type(pointer) is not str or operation.get('op', None) == 'test':
+                continue
+            try:
+                parts = jsonpointer.JsonPointer(pointer).parts
+            except jsonpointer.JsonPointerException:
+                continue  # Reported when the patch is applied
+            container = patched
+            for part in parts[:-1]:
+                try:
+                    key = int(part) if type(container) is list else part
+                    child = container[key]
+                except (KeyError, IndexError, ValueError, TypeError):
+                    break
+                if type(child) not in (dict, list):
+                    break
+                if id(child) not in copied:
+                    child = copy.copy(child)
+                    copied.add(id(child))
+                    container[key] = child
+                container = child
+    return patched
+
+
+def patchScenario(scenario_uuid: str, operations: list) -> Union[dict, str]:
+    if scenario_uuid not in scenarioByUUID:
+        return 'Invalid scenario'
+    scenario = scenarioByUUID[scenario_uuid]
+
+    # The patch is applied on a copy-on-write view so a failing operation leaves the scenario untouched
+    patched = copyPatchedContainers(scenario, operations)
     try:
-        with open(EXERCISE_DIR / filename, 'w') as f:
-            json.dump(scenario, f, indent=4)
-    except Exception as e:
-        print(e)
-        return e
-    return True
+        patched = jsonpatch.JsonPatch(operations).apply(patched, in_place=True)
+    except (jsonpatch.JsonPatchException, jsonpointer.JsonPointerException) as e:
+        return f'Invalid patch: {e}'
+    if type(patched) is not dict or type(patched.get('exercise', None)) is not dict:
+        return 'The scenario and its exercise must remain objects'
+    if patched['exercise'].get('uuid', None) != scenario_uuid:
+        return 'The patch cannot change the scenario UUID'
+    if type(patched.get('injects', None)) is not list or type(patched.get('inject_flow', None)) is not list:
+        return 'The patch cannot remove the injects or the inject flow'
+
+    # Updated in place, `scenarios` and the file cache hold the same object
+    scenario.clear()
+    scenario.update(patched)
+    scenarioIndexByUUID.pop(scenario_uuid, None)
+    errors = validation_errors(scenario)
+    validation = format_validation_errors(errors)
+    scenarioValidatedByUUID[scenario_uuid] = validation
+    scenarioValidationErrorsByUUID[scenario_uuid] = errors
 
+    saveResult = saveScenario(scenario_uuid, scenario)
+    if saveResult is not True:
+        return saveResult
+    return {
+        'validation': validation,
+        'validation_errors': errors,
+    }
 
-def saveJSON(filename: str, content: str) -> Union[bool, str]:
+
+def selectScenarios(scenario_uuids: Union[list, None], namespace: Union[str, None]) -> list:
+    selected = []
+    for scenario_uuid, scenario in list(scenarioByUUID.items()):
+        if scenario_uuids is not None and scenario_uuid not in scenario_uuids:
+            continue
+        if namespace is not None and scenario['exercise'].get('namespace', None) != namespace:
+            continue
+        selected.append(scenario_uuid)
+    return selected
+
+
+def lintScenarios(scenario_uuids: Union[list, None], namespace: Union[str, None]) -> dict:
+    # Lints the exercise files as written on disk, files whose content hash was already linted are answered from the cache
+    scenarioWriter.flush()  # Pending saves are linted too
+    selected = set(selectScenarios(scenario_uuids, namespace)) if scenario_uuids is not None or namespace is not None else None
+    files = []
+    for filename, entry in list(exerciseFileCache.items()):
+        if selected is not None and (entry['exercise'] is None or entry['exercise']['exercise']['uuid'] not in selected):
+            continue
+        files.append((filename, EXERCISE_DIR / filename, entry['hash'],))
+    with metricsRegistry.span('lint'):
+        report = scenarioLinter.lintLibrary(files)
+    report['rules'] = scenarioLinter.describeRules()
+    return report
+
+
+def exportItems(scenario_uuids: list, archive_format: str):
+    # Scenarios are serialised one at a time, while the response is being streamed
+    indent = None if archive_format == 'ndjson' else 4
+    for scenario_uuid in scenario_uuids:
+        scenario = scenarioByUUID.get(scenario_uuid, None)
+        if scenario is None:  # Deleted in the meantime
+            continue
+        with getScenarioLock(scenario_uuid):
+            content = encodeScenario(scenario, indent)
+        yield (str(scenarioFilenameByUUID.get(scenario_uuid, f'{scenario_uuid}.json')), content)
+
+
+def importScenarios(fileobj, archive_format: str, overwrite: bool, allow_invalid: bool, revision: Union[Callable, None] = None) -> Union[dict, str]:
+    # Every file is checked and staged first, nothing is written to the exercise directory unless all of them are accepted
+    results = []
+    seenUUIDs = set()
+    seenFilenames = set()
+    staging = ImportStaging(EXERCISE_DIR)
     try:
-        with open(EXERCISE_DIR / filename, 'w') as f:
-            f.write(content)
-    except Exception as e:
+        members = iterArchiveMembers(fileobj, archive_format, IMPORT_MAX_FILE_SIZE)
+        for name, content, check in scenarioValidationPool.checkAll(members):
+            fileResult = {
+                'name': name,
+                'uuid': check.get('uuid', None),
+                'filename': None,
+                'error': check['error'],
+                'validation_errors': check.get('validation_errors', []),
+            }
+            results.append(fileResult)
+            if fileResult['error'] is not None:
+                continue
+
+            scenario_uuid = check['uuid']
+            if archive_format == 'ndjson':
+                filename = sanitizeFilename(check['name'] or '', scenario_uuid)
+                content = encodeScenario(json.loads(content), scenarioWriter.indent)
+            else:
+                filename = memberFilename(name, scenario_uuid)
+            existingFilename = scenarioFilenameByUUID.get(scenario_uuid, None)
+            if existingFilename is not None:
+                filename = str(existingFilename)
+            if scenario_uuid in seenUUIDs or filename in seenFilenames:
+                fileResult['error'] = 'Present more than once in the archive'
+            elif existingFilename is not None and not overwrite:
+                fileResult['error'] = 'A scenario with this UUID already exists'
+            elif existingFilename is None and (EXERCISE_DIR / filename).exists():
+                fileResult['error'] = f'{filename} already exists for another scenario'
+            elif len(fileResult['validation_errors']) > 0 and not allow_invalid:
+                fileResult['error'] = 'Does not validate against the CEXF schema'
+            seenUUIDs.add(scenario_uuid)
+            seenFilenames.add(filename)
+            if fileResult['error'] is not None:
+                continue
+
+            fileResult['filename'] = filename
+            staging.stage(filename, content)
+            # The reload after the commit does not need to validate the file again
+            cacheValidationErrors(hashlib.sha256(content).hexdigest(), fileResult['validation_errors'])
+
+        failed = len([fileResult for fileResult in results if fileResult['error'] is not None])
+        if failed > 0 or len(results) == 0:
+            return {'committed': False, 'imported': 0, 'failed': failed, 'results': results}
+
+        replacedUUIDs = sorted([fileResult['uuid'] for fileResult in results if fileResult['uuid'] in scenarioByUUID])
+        with ExitStack() as stack:
+            for scenario_uuid in replacedUUIDs:
+                if revision is not None:  # Also checks the revision of each replaced scenario
+                    stack.enter_context(revision(scenario_uuid))
+                else:
+                    stack.enter_context(getScenarioLock(scenario_uuid))
+                    stack.enter_context(sharedScenarioLock(scenario_uuid))
+            for _, target_path in staging.staged:
+                scenarioWriter.cancel(target_path)
+            staging.commit()
+            reloadJsonFiles()
+    except ArchiveError as e:
+        return str(e)
+    except OSError as e:
         print(e)
         return e
+    finally:
+        staging.cleanup()
+    return {'committed': True, 'imported': len(results), 'failed': 0, 'results': results}
+
+
+def scenarioUUIDOfFile(filename: str) -> Union[str, None]:
+    for scenario_uuid, scenario_filename in list(scenarioFilenameByUUID.items()):
+        if scenario_filename == Path(filename):
+            return scenario_uuid
+    return None
+
+
+def saveJSON(filename: str, content: str) -> Union[bool, str]:
+    result = scenarioWriter.writeRaw(EXERCISE_DIR / filename, content.encode())
+    if result is not True:
+        return result
     reloadJsonFiles()
     return True
 
@@ -305,16 +1161,7 @@ def removeInject(scenario_uuid: str, inject_uuid: str) -> Union[bool, str]:
         return 'Invalid scenario'
     scenario = scenarioByUUID[scenario_uuid]
 
-    for i, inject in enumerate(scenario['injects']):
-        if inject['uuid'] == inject_uuid:
-            scenario['injects'].pop(i)
-    
-    for i, injectF in enumerate(scenario['inject_flow']):
-        if injectF['requirements'].get('inject_uuid', None) == inject_uuid:
-            scenario['inject_flow'][i]['requirements'] = {}
-
-        if injectF['inject_uuid'] == inject_uuid:
-            scenario['inject_flow'].pop(i)
+    getScenarioIndex(scenario_uuid).removeInject(inject_uuid)
 
     saveResult = saveScenario(scenario_uuid, scenario)
     return saveResult
@@ -327,22 +1174,17 @@ def orderInjects(scenario_uuid, inject_uuids) -> Union[bool, str]:
         return 'Invalid scenario'
     scenario = scenarioByUUID[scenario_uuid]
 
-    orderedInjects = []
-    orderedInjectFlows = []
-    for inject_uuid in inject_uuids:
-        inject = [i for i in scenario['injects'] if i['uuid'] == inject_uuid][0]
-        injectFlow = [i for i in scenario['inject_flow'] if i['inject_uuid'] == inject_uuid][0]
-        orderedInjects.append(inject)
-        orderedInjectFlows.append(injectFlow)
-    
-    scenario['injects'] = orderedInjects
-    scenario['inject_flow'] = orderedInjectFlows
+    try:
+        getScenarioIndex(scenario_uuid).reorder(inject_uuids)
+    except KeyError as e:
+        return f'Unknown inject {e}'
 
     saveResult = saveScenario(scenario_uuid, scenario)
     return saveResult
 
 
-def testInject(injectToTest) -> dict:
+async def testInjectSteps(injectToTest, shared_fetches: Union[dict, None] = None):
+    # Yields progress and debug events as the test runs, the last event holds the test result
     inject_evaluator = loadInjectEvaluator()
 
     user_id = 0
@@ -372,33 +1214,94 @@ def testInject(injectToTest) -> dict:
     debug = []
     if inject_evaluation['evaluation_strategy'] == 'data_filtering':
         data_to_validate = injectToTest.test_data
-        (success, inject_debug) = inject_evaluator.eval_data_filtering(authkey, inject_evaluation, data_to_validate, context, debug=True)
-        debug = debug + inject_debug
+        yield {'type': 'evaluation_started'}
+        with metricsRegistry.span('eval_data_filtering'):
+            (success, inject_debug) = await run_in_threadpool(inject_evaluator.eval_data_filtering, authkey, inject_evaluation, data_to_validate, context, debug=True)
+        for entry in inject_debug:
+            entry = truncateValue(entry, INJECT_DEBUG_MAX_BYTES)[0]
+            debug.append(entry)
+            yield {'type': 'debug', 'data': entry}
     elif inject_evaluation['evaluation_strategy'] == 'query_mirror':
         pass  # Not implemented
     elif inject_evaluation['evaluation_strategy'] == 'query_search':
-        data_to_validate, error = fetch_data_for_query_search(misp_url, authkey, inject_evaluation)
+        yield {'type': 'fetch_started', 'url': inject_evaluation['evaluation_context']['query_context']['url']}
+        async for event in fetchWithProgress(misp_url, authkey, inject_evaluation, injectToTest.use_cache, shared_fetches):
+            if type(event) is tuple:
+                data_to_validate, error = event
+            else:
+                yield event
         if data_to_validate is not False:
             data_length = len(data_to_validate['response']) if type(data_to_validate) is dict else len(data_to_validate)
             debug.append([{'message': f'Fetched entries', 'data': data_length}])
-            (success, inject_debug) = inject_evaluator.eval_query_search(user_id, inject_evaluation, data_to_validate, context, debug=True)
-            debug = debug + inject_debug
+            yield {'type': 'debug', 'data': debug[-1]}
+            yield {'type': 'evaluation_started'}
+            with metricsRegistry.span('eval_query_search'):
+                (success, inject_debug) = await run_in_threadpool(inject_evaluator.eval_query_search, user_id, inject_evaluation, data_to_validate, context, debug=True)
+            for entry in inject_debug:
+                entry = truncateValue(entry, INJECT_DEBUG_MAX_BYTES)[0]
+                debug.append(entry)
+                yield {'type': 'debug', 'data': entry}
         else:
             debug.append([{'message': f'Error while fetching data', 'data': error}])
+            yield {'type': 'debug', 'data': debug[-1]}
     elif inject_evaluation['evaluation_strategy'] == 'python':
         # Tries to fetch data based on provided auth. Fallback to test_data
         data_to_validate = injectToTest.test_data
         if misp_url and authkey:
-            print(injectToTest)
-            data_to_validate, error = fetch_data_for_query_search(misp_url, authkey, inject_evaluation)
+            yield {'type': 'fetch_started', 'url': inject_evaluation['evaluation_context']['query_context']['url']}
+            async for event in fetchWithProgress(misp_url, authkey, inject_evaluation, injectToTest.use_cache, shared_fetches):
+                if type(event) is tuple:
+                    data_to_validate, error = event
+                else:
+                    yield event
         if data_to_validate is False:
             data_to_validate = injectToTest.test_data
 
-        (success, inject_debug) = inject_evaluator.eval_python(authkey, inject_evaluation, data_to_validate, context, debug=True)
-        debug = debug + inject_debug
+        yield {'type': 'evaluation_started'}
+        with metricsRegistry.span('eval_python'):
+            if PYTHON_EVAL_SANDBOX:
+                try:
+                    (success, inject_debug) = await run_in_threadpool(pythonEvaluationPool.evalPython, authkey, inject_evaluation, data_to_validate, context)
+                except SandboxTimeout as e:
+                    (success, inject_debug) = (False, [[{'message': 'Evaluation aborted', 'data': str(e)}]])
+            else:
+                (success, inject_debug) = await run_in_threadpool(inject_evaluator.eval_python, authkey, inject_evaluation, data_to_validate, context, debug=True)
+        for entry in inject_debug:
+            entry = truncateValue(entry, INJECT_DEBUG_MAX_BYTES)[0]
+            debug.append(entry)
+            yield {'type': 'debug', 'data': entry}
     test_result['outcome'] = INJECT_EVAL_SUCCESS if success else INJECT_EVAL_FAIL
     test_result['debug'] = debug
-    return test_result
+    yield {'type': 'result', 'data': test_result}
+
+
+async def testInject(injectToTest, shared_fetches: Union[dict, None] = None) -> dict:
+    async for event in testInjectSteps(injectToTest, shared_fetches):
+        if event['type'] == 'result':
+            return event['data']
+
+
+async def fetchWithProgress(misp_url, authkey, inject_evaluation, use_cache: bool = False, shared_fetches: Union[dict, None] = None):
+    # Yields fetch_progress events while the query runs, then the (data, error) tuple of fetch_data_for_query_search
+    progress = asyncio.Queue()
+
+    def on_progress(received: int, total: Union[int, None]):
+        progress.put_nowait({'type': 'fetch_progress', 'received_bytes': received, 'total_bytes': total})
+
+    fetch = asyncio.ensure_future(fetch_data_for_query_search(misp_url, authkey, inject_evaluation, use_cache, shared_fetches, on_progress))
+    try:
+        while not fetch.done():
+            getter = asyncio.ensure_future(progress.get())
+            await asyncio.wait({fetch, getter}, return_when=asyncio.FIRST_COMPLETED)
+            if getter.done():
+                yield getter.result()
+            else:
+                getter.cancel()
+        while not progress.empty():
+            yield progress.get_nowait()
+        yield fetch.result()
+    finally:
+        fetch.cancel()
 
 
 def testJqPath(path: str, data: dict, extract_type: str) -> tuple:
@@ -406,41 +1309,151 @@ def testJqPath(path: str, data: dict, extract_type: str) -> tuple:
     success = True
     result = False
     try:
-        result = inject_evaluator.jq_extract(path, data, extract_type)
+        with metricsRegistry.span('jq'):
+            result = inject_evaluator.jq_extract(path, data, extract_type)
     except ValueError as e:
         success = False
         result = str(e)
     return (success, result,)
 
 
-def fetch_data_for_query_search(misp_url, authkey, inject_evaluation):
+def testJqPaths(paths: list, data: dict, extract_type: str) -> list:
+    results = []
+    for path in paths:
+        success, result = testJqPath(path, data, extract_type)
+        results.append({'path': path, 'success': success, 'result': result})
+    return results
+
+
+async def fetch_data_for_query_search(misp_url, authkey, inject_evaluation, use_cache: bool = False, shared_fetches: Union[dict, None] = None, on_progress=None):
     query_context = inject_evaluation['evaluation_context']['query_context']
     search_method = query_context['request_method']
     search_url = query_context['url']
     search_payload = query_context['payload']
-    search_data, success  = doRestQuery(misp_url ,authkey, search_method, search_url, search_payload)
+    search_data, success  = await doRestQuery(misp_url ,authkey, search_method, search_url, search_payload, use_cache, shared_fetches, on_progress)
     return (search_data, None,) if success else (False, search_data,)
 
 
-def doRestQuery(misp_url, authkey, method, url, payload) -> tuple:
-    headers = {
-        'User-Agent': 'SkillAegis',
-        "Authorization": authkey,
-        "Accept": "application/json",
-        "Content-Type": "application/json"
+async def fetchRawResponse(misp_url, authkey, method, url, payload, cache_key: tuple, use_cache: bool, on_progress=None) -> tuple:
+    with metricsRegistry.span('misp_fetch'):
+        content, content_type, is_success = await mispClientPool.fetch(misp_url, authkey, method, url, payload, on_progress)
+    fetched = (content, content_type,)
+    if use_cache and is_success:
+        mispResponseCache.set(cache_key, *fetched)
+    return fetched
+
+
+async def doRestQuery(misp_url, authkey, method, url, payload, use_cache: bool = False, shared_fetches: Union[dict, None] = None, on_progress=None) -> tuple:
+    cache_key = ResponseCache.key(misp_url, authkey, method, url, payload)
+    if not use_cache and shared_fetches is None:
+        # Nothing to cache or share: the response is parsed as it is received and its body is never held as a whole
+        try:
+            with metricsRegistry.span('misp_fetch'):
+                data, _, _ = await mispClientPool.fetchParsed(misp_url, authkey, method, url, payload, on_progress)
+        except Exception as e:
+            return (f'{type(e).__name__}: {e}', False)
+        return (data, True,)
+
+    cached = mispResponseCache.get(cache_key) if use_cache else None
+    if cached is None:
+        try:
+            if shared_fetches is None:
+                cached = await fetchRawResponse(misp_url, authkey, method, url, payload, cache_key, use_cache, on_progress)
+            else:
+                # Identical queries running concurrently in the same batch wait on a single fetch
+                if cache_key not in shared_fetches:
+                    shared_fetches[cache_key] = asyncio.ensure_future(fetchRawResponse(misp_url, authkey, method, url, payload, cache_key, use_cache, on_progress))
+                cached = await asyncio.shield(shared_fetches[cache_key])
+        except Exception as e:
+            return (f'{type(e).__name__}: {e}', False)
+
+    # The raw body is cached so each evaluation gets its own copy of the data
+    content, content_type = cached
+    return (parseContent(content, content_type), True,)
+
+
+def buildBatchInjectTests(scenario: dict, batchTest) -> list:
+    injectTests = []
+    for inject in scenario['injects']:
+        for index, evaluation in enumerate(inject.get('inject_evaluation', []) or []):
+            evaluation_context = evaluation.get('evaluation_context', {}) or {}
+            query_context = evaluation_context.get('query_context', {}) or {}
+            try:
+                injectToTest = InjectToTestPayload(
+                    target_tool=inject.get('target_tool', 'MISP') or 'MISP',
+                    evaluation_strategy=evaluation.get('evaluation_strategy', ''),
+                    eval_params=evaluation.get('parameters', []),
+                    test_data=batchTest.test_data,
+                    evaluation_context=evaluation_context,
+                    query_search_url=query_context.get('url', None),
+                    query_search_method=query_context.get('request_method', None),
+                    query_search_payload=query_context.get('payload', {}),
+                    query_search_misp_url=batchTest.query_search_misp_url,
+                    query_search_misp_apikey=batchTest.query_search_misp_apikey,
+                    use_cache=batchTest.use_cache,
+                )
+            except ValidationError as e:
+                injectToTest = f'Invalid inject evaluation: {e}'
+            injectTests.append((inject, index, injectToTest,))
+    return injectTests
+
+
+async def testInjectBatch(batchTest) -> Union[dict, str]:
+    if batchTest.scenario_uuid is not None:
+        if batchTest.scenario_uuid not in scenarioByUUID:
+            return 'Invalid scenario'
+        injectTests = buildBatchInjectTests(scenarioByUUID[batchTest.scenario_uuid], batchTest)
+    else:
+        injectTests = [({'uuid': None, 'name': None}, 0, injectToTest,) for injectToTest in batchTest.injects]
+
+    semaphore = asyncio.Semaphore(batchTest.max_concurrency or BATCH_TEST_CONCURRENCY)
+    shared_fetches = {}
+
+    async def runTest(injectToTest) -> dict:
+        async with semaphore:
+            start = time.perf_counter()
+            if type(injectToTest) is str:
+                test_result = {'outcome': INJECT_EVAL_FAIL, 'debug': [[{'message': injectToTest}]]}
+            else:
+                try:
+                    test_result = await testInject(injectToTest, shared_fetches)
+                except Exception as e:
+                    test_result = {'outcome': INJECT_EVAL_FAIL, 'debug': [[{'message': 'Error during evaluation', 'data': f'{type(e).__name__}: {e}'}]]}
+            test_result['duration_ms'] = (time.perf_counter() - start) * 1000
+            return test_result
+
+    start = time.perf_counter()
+    test_results = await asyncio.gather(*[runTest(injectToTest) for _, _, injectToTest in injectTests])
+
+    resultByInject = {}
+    for position, ((inject, index, _), test_result) in enumerate(zip(injectTests, test_results)):
+        key = inject['uuid'] if batchTest.scenario_uuid is not None else position
+        if key not in resultByInject:
+            resultByInject[key] = {
+                'inject_uuid': inject['uuid'],
+                'name': inject['name'],
+                'join_type': inject.get('inject_evaluation_join_type', None),
+                'evaluations': [],
+            }
+        test_result['evaluation_index'] = index
+        resultByInject[key]['evaluations'].append(test_result)
+
+    results = []
+    for result in resultByInject.values():
+        outcomes = [evaluation['outcome'] == INJECT_EVAL_SUCCESS for evaluation in result['evaluations']]
+        passed = any(outcomes) if str(result['join_type']).upper() == 'OR' else all(outcomes)
+        result['outcome'] = INJECT_EVAL_SUCCESS if passed else INJECT_EVAL_FAIL
+        result['duration_ms'] = sum([evaluation['duration_ms'] for evaluation in result['evaluations']])
+        results.append(result)
+
+    return {
+        'results': results,
+        'tested': len(results),
+        'succeeded': len([result for result in results if result['outcome'] == INJECT_EVAL_SUCCESS]),
+        'failed': len([result for result in results if result['outcome'] != INJECT_EVAL_SUCCESS]),
+        'fetches': len(shared_fetches),
+        'total_duration_ms': (time.perf_counter() - start) * 1000,
     }
-    full_url = urljoin(misp_url, url)
-    try:
-        if method == 'POST':
-            response = requests.post(full_url, data=json.dumps(payload), headers=headers, verify=False)
-        else:
-            response = requests.get(full_url, data=json.dumps(payload), headers=headers, verify=False)
-    except Exception as e:
-        return (e, False)
-    try:
-        return (response.json(), True,) if response.headers['content-type'].startswith('application/json') else (response.text, True,)
-    except requests.exceptions.JSONDecodeError:
-        return (response.text, True,)
 
 
 class Exercise(BaseModel):
@@ -491,6 +1504,21 @@ class InjectToTestPayload(BaseModel):
     query_search_payload: dict | None = {}
     query_search_misp_url: str | None = None
     query_search_misp_apikey: str | None = None
+    use_cache: bool = False
+
+
+class BatchInjectTestPayload(BaseModel):
+    scenario_uuid: str | None = None
+    injects: list[InjectToTestPayload] = []
+    test_data: dict | None = {}
+    query_search_misp_url: str | None = None
+    query_search_misp_apikey: str | None = None
+    use_cache: bool = False
+    max_concurrency: int | None = Field(None, ge=1)
+
+
+class CacheInvalidationPayload(BaseModel):
+    misp_url: str | None = None
 
 
 class JqPathToTestPayload(BaseModel):
@@ -499,6 +1527,12 @@ class JqPathToTestPayload(BaseModel):
     extract_type: str = 'all'
 
 
+class JqPathsToTestPayload(BaseModel):
+    paths: list[str]
+    data: dict | None = {}
+    extract_type: str = 'all'
+
+
 class SaveJSONPayload(BaseModel):
     filename: str
     content: str
@@ -506,100 +1540,317 @@ class SaveJSONPayload(BaseModel):
 
 @app.get("/scenarios/index")
 def scenarios_index():
-    global scenarios, scenarioByUUID, readErrors, scenarioFilenameByUUID, scenarioValidatedByUUID, CEXF_SCHEMA
+    global scenarios, scenarioByUUID, readErrors, scenarioFilenameByUUID, scenarioValidatedByUUID, scenarioValidationErrorsByUUID, CEXF_SCHEMA
     return {
         'scenarios': scenarios,
         'scenario_by_uuid': scenarioByUUID,
         'read_errors': readErrors,
         'scenario_filename_by_uuid': scenarioFilenameByUUID,
         'scenario_validated_by_uuid': scenarioValidatedByUUID,
+        'scenario_validation_errors_by_uuid': scenarioValidationErrorsByUUID,
+        'scenario_etag_by_uuid': {scenario_uuid: scenarioETag(scenario_uuid) for scenario_uuid in scenarioByUUID},
         'cexf_schema': CEXF_SCHEMA,
     }
 
 
+@app.get("/scenarios/summary")
+def scenarios_summary(
+    request: Request,
+    response: Response,
+    page: int = Query(1, ge=1),
+    limit: int = Query(50, ge=1, le=1000),
+    namespace: str | None = None,
+    level: str | None = None,
+    validated: bool | None = None,
+    fields: str | None = None,
+):
+    fieldList = [field.strip() for field in fields.split(',')] if fields else None
+    # Read before building the index, a change made meanwhile gives the next request a different ETag
+    query = hash_json([page, limit, namespace, level, validated, fieldList])[:16]
+    etag = f'"{SUMMARY_EPOCH}-{summaryGeneration}-{query}"'
+    if request.headers.get('if-none-match', None) == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+    summaryIndex = scenarioSummaryIndex(page, limit, namespace, level, validated, fieldList)
+    response.headers['ETag'] = etag
+    return summaryIndex
+
+
+@app.get("/scenarios/search")
+def scenarios_search(
+    q: str = '',
+    fields: str | None = None,
+    namespace: str | None = None,
+    level: str | None = None,
+    validated: bool | None = None,
+    limit: int = Query(20, ge=1, le=1000),
+):
+    fieldList = [field.strip() for field in fields.split(',') if field.strip()] if fields else None
+    unknownFields = [field for field in fieldList or [] if field not in SEARCH_FIELDS]
+    if len(unknownFields) > 0:
+        # Searching the remaining fields, or all of them when none remains, would silently widen the search
+        content = {'status_code': 10422, 'message': f'Unknown search field(s): {", ".join(unknownFields)}. Expected: {", ".join(SEARCH_FIELDS)}', 'data': {'unknown_fields': unknownFields}}
+        return JSONResponse(content=content, status_code=status.HTTP_422_UNPROCESSABLE_ENTITY)
+    return searchScenarios(q, fieldList, namespace, level, validated, limit)
+
+
+@app.get("/scenarios/cexf-schema")
+def scenarios_cexf_schema():
+    return CEXF_SCHEMA
+
+
 @app.post("/scenarios/reload")
 def scenarios_reload():
-    global scenarios, scenarioByUUID, readErrors, scenarioFilenameByUUID, scenarioValidatedByUUID
-    reloadJsonFiles()
+    global scenarios, scenarioByUUID, readErrors, scenarioFilenameByUUID, scenarioValidatedByUUID, scenarioValidationErrorsByUUID
+    changes = reloadJsonFiles()
     return {
+        'changes': changes,
         'scenarios': scenarios,
         'scenario_by_uuid': scenarioByUUID,
         'read_errors': readErrors,
         'scenario_filename_by_uuid': scenarioFilenameByUUID,
         'scenario_validated_by_uuid': scenarioValidatedByUUID,
+        'scenario_validation_errors_by_uuid': scenarioValidationErrorsByUUID,
+        'scenario_etag_by_uuid': {scenario_uuid: scenarioETag(scenario_uuid) for scenario_uuid in scenarioByUUID},
     }
 
 
+@app.get("/scenarios/events")
+async def scenarios_events(request: Request):
+    subscriber = (asyncio.get_running_loop(), asyncio.Queue(),)
+    eventSubscribers.add(subscriber)
+
+    async def event_stream():
+        _, queue = subscriber
+        try:
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            eventSubscribers.discard(subscriber)
+
+    return StreamingResponse(event_stream(), media_type='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+
 @app.get("/scenarios/view/{uuid}")
-def scenarios_view(uuid: str):
+def scenarios_view(uuid: str, request: Request, response: Response):
     scenario = scenarioByUUID.get(uuid, None)
     if scenario is not None:
+        etag = scenarioETag(uuid)
+        if etag is not None and request.headers.get('if-none-match', None) == etag:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        if etag is not None:
+            response.headers['ETag'] = etag
         return scenario
     return error('Scenario not found', uuid)
 
 
+@app.get("/scenarios/graph/{uuid}")
+def scenarios_graph(uuid: str, request: Request, response: Response):
+    if uuid not in scenarioByUUID:
+        return error('Scenario not found', uuid)
+    etag = scenarioETag(uuid)
+    if etag is not None and request.headers.get('if-none-match', None) == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+    graph = getScenarioGraph(uuid)
+    if etag is not None:
+        response.headers['ETag'] = etag
+    return graph
+
+
+@app.get("/scenarios/lint")
+def scenarios_lint(uuids: str | None = None, namespace: str | None = None):
+    return lintScenarios([scenario_uuid.strip() for scenario_uuid in uuids.split(',')] if uuids else None, namespace)
+
+
 @app.post("/scenarios/add")
-def scenarios_add(exercise: Exercise):
+def scenarios_add(exercise: Exercise, response: Response):
     scenario = createScenario(exercise)
     if type(scenario) is dict:
+        response.headers['ETag'] = scenarioETag(scenario['exercise']['uuid'])
         return success('New scenario created', payload=scenario)
     return error('Could not create scenario', scenario)
 
 
 @app.post("/scenarios/edit")
-def scenarios_edit(exercise: Exercise):
-    scenario = editScenario(exercise)
+def scenarios_edit(exercise: Exercise, request: Request, response: Response):
+    with scenarioRevision(exercise.uuid, request, response):
+        scenario = editScenario(exercise)
     if type(scenario) is dict:
         return success('Scenario Updated', payload=scenario)
     return error('Could not update scenario', scenario)
 
 
 @app.post("/scenarios/delete/{uuid}")
-def scenarios_delete(uuid: str):
-    result = deleteScenario(uuid)
+def scenarios_delete(uuid: str, request: Request, response: Response):
+    with scenarioRevision(uuid, request, response):
+        result = deleteScenario(uuid)
     if result is True:
         return success(f"Scenario deleted")
     return error('Could not delete scenario', result)
 
 
+@app.post("/scenarios/patch/{scenario_uuid}")
+def scenarios_patch(scenario_uuid: str, operations: list[dict], request: Request, response: Response):
+    with scenarioRevision(scenario_uuid, request, response):
+        result = patchScenario(scenario_uuid, operations)
+    if type(result) is dict:
+        return success('Scenario patched', payload=result)
+    if scenario_uuid in scenarioByUUID:  # The patch itself was rejected
+        response.status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    return error('Could not patch scenario', result)
+
+
+@app.get("/scenarios/export")
+def scenarios_export(format: str = 'zip', uuids: str | None = None, namespace: str | None = None):
+    if format not in ARCHIVE_FORMATS:
+        return error('Could not export scenarios', f'Unknown format {format}, expected one of {", ".join(ARCHIVE_FORMATS)}')
+    selected = selectScenarios([scenario_uuid.strip() for scenario_uuid in uuids.split(',')] if uuids else None, namespace)
+    filename = f'scenarios.{format}'
+    return StreamingResponse(
+        iterExport(exportItems(selected, format), format),
+        media_type=ARCHIVE_FORMATS[format],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+    )
+
+
+@app.post("/scenarios/import")
+async def scenarios_import(request: Request, response: Response, format: str = 'zip', overwrite: bool = False, allow_invalid: bool = False):
+    # The request body is the archive itself, it is spooled to disk while being received
+    if format not in ARCHIVE_FORMATS:
+        return error('Could not import scenarios', f'Unknown format {format}, expected one of {", ".join(ARCHIVE_FORMATS)}')
+    upload = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    try:
+        async for chunk in request.stream():
+            await run_in_threadpool(upload.write, chunk)
+        upload.seek(0)
+        # If-Match holds the ETag of every scenario the archive is expected to replace
+        result = await run_in_threadpool(importScenarios, upload, format, overwrite, allow_invalid, lambda scenario_uuid: scenarioRevision(scenario_uuid, request, response))
+    finally:
+        upload.close()
+    if type(result) is not dict:
+        return error('Could not import scenarios', str(result))
+    if result['committed']:
+        return success(f"{result['imported']} scenarios imported", payload=result)
+    return error('Could not import scenarios', f"{result['failed']} files were rejected, nothing was imported", result)
+
+
 @app.post("/scenarios/save-json")
-def save_json(saveJSONPayload: SaveJSONPayload):
-    result = saveJSON(saveJSONPayload.filename, saveJSONPayload.content)
+def save_json(saveJSONPayload: SaveJSONPayload, request: Request, response: Response):
+    scenario_uuid = scenarioUUIDOfFile(saveJSONPayload.filename)
+    # Files that could not be read have no scenario, and so no revision
+    with scenarioRevision(scenario_uuid, request, response) if scenario_uuid is not None else nullcontext():
+        result = saveJSON(saveJSONPayload.filename, saveJSONPayload.content)
     if result is True:
         return success(f"JSON saved")
     return error('Could not save JSON', result)
 
 
 @app.post("/scenarios/save-inject/{scenario_uuid}")
-def save_inject(scenario_uuid: str, inject: Inject, injectFlow: InjectFlow):
-    result = saveInject(scenario_uuid, inject, injectFlow)
+def save_inject(scenario_uuid: str, inject: Inject, injectFlow: InjectFlow, request: Request, response: Response):
+    with scenarioRevision(scenario_uuid, request, response):
+        result = saveInject(scenario_uuid, inject, injectFlow)
     if result is True:
         return success(f"Inject saved")
     return error('Could not save inject', result)
 
 
 @app.post("/scenarios/delete-inject/{scenario_uuid}/{inject_uuid}")
-def save_inject(scenario_uuid: str, inject_uuid: str):
-    result = removeInject(scenario_uuid, inject_uuid)
+def save_inject(scenario_uuid: str, inject_uuid: str, request: Request, response: Response):
+    with scenarioRevision(scenario_uuid, request, response):
+        result = removeInject(scenario_uuid, inject_uuid)
     if result is True:
         return success(f"Inject removed")
     return error('Could not remove inject', result)
 
 
 @app.post("/scenarios/order-inject/{scenario_uuid}")
-def save_inject(scenario_uuid: str, injectOrder: InjectOrder):
-    result = orderInjects(scenario_uuid, injectOrder.inject_uuids)
+def save_inject(scenario_uuid: str, injectOrder: InjectOrder, request: Request, response: Response):
+    with scenarioRevision(scenario_uuid, request, response):
+        result = orderInjects(scenario_uuid, injectOrder.inject_uuids)
     if result is True:
         return success(f"Injects reordered")
     return error('Could not reorder injects', result)
 
 
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(metricsRegistry.render(), media_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@app.get("/diagnostics/jq-cache")
+def diagnostics_jq_cache():
+    return jqCacheDiagnostics()
+
+
+@app.get("/diagnostics/modules")
+def diagnostics_modules():
+    return moduleDiagnostics()
+
+
+@app.get("/diagnostics/persistence")
+def diagnostics_persistence():
+    return scenarioWriter.stats()
+
+
+@app.get("/diagnostics/catalog")
+def diagnostics_catalog():
+    if scenarioCatalog is None:
+        return {'enabled': False}
+    return {'enabled': True, **scenarioCatalog.stats()}
+
+
+@app.get("/diagnostics/shared-state")
+def diagnostics_shared_state():
+    if sharedState is None:
+        return {'enabled': False, 'pid': os.getpid()}
+    return {'enabled': True, 'pid': os.getpid(), 'local_generation': sharedGeneration, **sharedState.stats()}
+
+
 @app.post("/injects/test")
-def save_inject(injectToTest: InjectToTestPayload):
-    result = testInject(injectToTest)
+async def save_inject(injectToTest: InjectToTestPayload):
+    result = await testInject(injectToTest)
     return success(f"Injects tested", "Result is attached", result)
 
 
+@app.post("/injects/test/stream")
+async def test_inject_stream(injectToTest: InjectToTestPayload):
+    async def event_stream():
+        async for event in testInjectSteps(injectToTest):
+            yield json.dumps(event, default=str) + '\n'
+
+    return StreamingResponse(event_stream(), media_type='application/x-ndjson')
+
+
+@app.post("/injects/test-batch")
+async def test_inject_batch(batchTest: BatchInjectTestPayload):
+    result = await testInjectBatch(batchTest)
+    if type(result) is dict:
+        return success(f"Injects tested", f"{result['succeeded']}/{result['tested']} injects passed", result)
+    return error('Could not test injects', result)
+
+
+@app.get("/injects/cache")
+def injects_cache():
+    return mispResponseCache.stats()
+
+
+@app.get("/injects/fixtures")
+def injects_fixtures():
+    if not isinstance(mispClientPool, FixtureClientPool):
+        return {'mode': None}
+    return mispClientPool.stats()
+
+
+@app.post("/injects/cache/clear")
+def injects_cache_clear(cacheInvalidation: CacheInvalidationPayload):
+    removed = mispResponseCache.invalidate(cacheInvalidation.misp_url)
+    return success(f"Cache cleared", f"{removed} cached responses removed", {'removed': removed})
+
+
 @app.post("/injects/jq-path-test")
 def test_jq_path(jqPathToTest: JqPathToTestPayload):
     testSuccess, result = testJqPath(jqPathToTest.path, jqPathToTest.data, jqPathToTest.extract_type)
@@ -609,4 +1860,10 @@ def test_jq_path(jqPathToTest: JqPathToTestPayload):
         return error(f"Error during testing", result)
 
 
-app.mount('/', StaticFiles(directory='dist', html=True))
+@app.post("/injects/jq-paths-test")
+def test_jq_paths(jqPathsToTest: JqPathsToTestPayload):
+    results = testJqPaths(jqPathsToTest.paths, jqPathsToTest.data, jqPathsToTest.extract_type)
+    return success(f"JQ paths tested", "Results are attached", results)
+
+
+app.mount('/', StaticFiles(directory='dist', html=True))
\ No newline at end of file
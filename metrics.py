@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+import bisect
+import re
+import threading
+import time
+from typing import Callable, Union
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SERVER_TIMING_NAME_RE = re.compile(r'[^A-Za-z0-9_.-]')
+
+# Stage durations of the request being handled, shared with the threadpool through the copied context
+requestTimings: ContextVar[Union[list, None]] = ContextVar('requestTimings', default=None)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    # Minimal Prometheus text exposition: counters and histograms with labels, gauges read from callbacks at scrape time
+    def __init__(self, prefix: str = 'skillaegis'):
+        self.prefix = prefix
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, labels: dict | None = None, value: float = 1.0, help: str = ''):
+        key = (name, tuple(sorted((labels or {}).items())),)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+            self._help.setdefault(name, help)
+
+    def counterValues(self, name: str) -> dict:
+        with self._lock:
+            return {labels: value for (counterName, labels), value in self._counters.items() if counterName == name}
+
+    def observe(self, name: str, value: float, labels: dict | None = None, help: str = ''):
+        key = (name, tuple(sorted((labels or {}).items())),)
+        with self._lock:
+            histogram = self._histograms.get(key, None)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+            self._help.setdefault(name, help)
+
+    def gauge(self, name: str, callback: Callable[[], Union[float, dict]], help: str = '', metric_type: str = 'gauge'):
+        # callback returns a value, or a {labels tuple: value} dict for labelled values.
+        # Totals kept by other components (e.g. cache hits) are exposed with metric_type='counter'
+        self._gauges[name] = (callback, metric_type,)
+        self._help[name] = help
+
+    @contextmanager
+    def span(self, stage: str):
+        # Times a stage of the current request: kept in the stage histogram and reported in Server-Timing
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            self.observe('stage_duration_seconds', duration, {'stage': stage}, 'Duration of the instrumented stages')
+            timings = requestTimings.get()
+            if timings is not None:
+                timings.append((stage, duration,))
+
+    def _formatLabels(self, labels: tuple) -> str:
+        if len(labels) == 0:
+            return ''
+        escaped = [(key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'),) for key, value in labels]
+        return '{' + ','.join([f'{key}="{value}"' for key, value in escaped]) + '}'
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: (histogram.buckets, list(histogram.counts), histogram.sum, histogram.count,) for key, histogram in self._histograms.items()}
+        declared = set()
+
+        def declare(name: str, metric_type: str):
+            if name not in declared:
+                declared.add(name)
+                lines.append(f'# HELP {self.prefix}_{name} {self._help.get(name, "")}')
+                lines.append(f'# TYPE {self.prefix}_{name} {metric_type}')
+
+        for (name, labels), value in sorted(counters.items()):
+            declare(name, 'counter')
+            lines.append(f'{self.prefix}_{name}{self._formatLabels(labels)} {value}')
+        for (name, labels), (buckets, counts, total, count) in sorted(histograms.items()):
+            declare(name, 'histogram')
+            cumulative = 0
+            for bound, bucketCount in zip(buckets + (float('inf'),), counts):
+                cumulative += bucketCount
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{self.prefix}_{name}_bucket{self._formatLabels(labels + (("le", le),))} {cumulative}')
+            lines.append(f'{self.prefix}_{name}_sum{self._formatLabels(labels)} {total}')
+            lines.append(f'{self.prefix}_{name}_count{self._formatLabels(labels)} {count}')
+        for name, (callback, metric_type) in sorted(self._gauges.items()):
+            try:
+                value = callback()
+            except Exception as e:
+                print(f'Metric {name} failed: {e}')
+                continue
+            declare(name, metric_type)
+            values = value if isinstance(value, dict) else {(): value}
+            for labels, labelValue in values.items():
+                lines.append(f'{self.prefix}_{name}{self._formatLabels(labels)} {float(labelValue)}')
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware:
+    # ASGI middleware timing every HTTP request by route template, streamed bodies included
+    def __init__(self, app, registry: MetricsRegistry, server_timing: bool = True):
+        self.app = app
+        self.registry = registry
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        timings = []
+        token = requestTimings.set(timings)
+        statusCode = 500
+
+        async def sendWithTiming(message):
+            nonlocal statusCode
+            if message['type'] == 'http.response.start':
+                statusCode = message['status']
+                if self.server_timing:
+                    # Only the stages completed before the headers are sent can be reported
+                    headers = list(message.get('headers', []))
+                    headers.append((b'server-timing', serverTimingHeader(timings, time.perf_counter() - start).encode('latin-1'),))
+                    headers.append((b'timing-allow-origin', b'*',))
+                    message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, sendWithTiming)
+        finally:
+            requestTimings.reset(token)
+            route = scope.get('route', None)
+            labels = {
+                'method': scope['method'],
+                'route': (getattr(route, 'path', None) or '/') if route is not None else 'unmatched',
+            }
+            self.registry.observe('http_request_duration_seconds', time.perf_counter() - start, labels, 'Duration of the HTTP requests, streamed bodies included')
+            self.registry.inc('http_requests_total', dict(labels, status=str(statusCode)), help='Number of HTTP requests')
+
+
+def serverTimingHeader(timings: list, total: float) -> str:
+    # Repeated stages (e.g. one fetch per evaluation) are summed
+    durations = {}
+    for stage, duration in timings:
+        durations[stage] = durations.get(stage, 0.0) + duration
+    entries = [f'{SERVER_TIMING_NAME_RE.sub("_", stage)};dur={duration * 1000:.2f}' for stage, duration in durations.items()]
+    entries.append(f'total;dur={total * 1000:.2f}')
+    return ', '.join(entries)
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+
+import asyncio
+from collections import OrderedDict
+import hashlib
+import json
+import threading
+import time
+from typing import Callable
+from urllib.parse import urljoin, urlsplit
+
+import httpx
+
+from payloads import InvalidJSON, PayloadTooLarge, parseContent, streamingParser
+
+RETRY_STATUS_CODES = (502, 503, 504,)
+PROGRESS_STEP = 256 * 1024
+
+
+class ResponseCache:
+    # TTL + LRU cache of raw MISP response bodies, bounded by the total number of cached bytes
+    def __init__(self, ttl: float = 300.0, max_bytes: int = 256 * 1024 * 1024, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(misp_url: str, authkey: str, method: str, url: str, payload) -> tuple:
+        authkey_hash = hashlib.sha256((authkey or '').encode()).hexdigest()
+        return (misp_url, authkey_hash, method, url, json.dumps(payload, sort_keys=True),)
+
+    def get(self, key: tuple):
+        with self._lock:
+            entry = self._entries.get(key, None)
+            if entry is not None and entry['expires_at'] < time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return (entry['content'], entry['content_type'],)
+
+    def set(self, key: tuple, content: bytes, content_type: str):
+        size = len(content)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            while self._entries and (self._size + size > self.max_bytes or len(self._entries) >= self.max_entries):
+                self._remove(next(iter(self._entries)))
+            self._entries[key] = {
+                'content': content,
+                'content_type': content_type,
+                'expires_at': time.monotonic() + self.ttl,
+            }
+            self._size += size
+
+    def invalidate(self, misp_url: str | None = None) -> int:
+        with self._lock:
+            keys = [key for key in self._entries if misp_url is None or key[0] == misp_url]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def _remove(self, key: tuple):
+        entry = self._entries.pop(key)
+        self._size -= len(entry['content'])
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+class MISPClientPool:
+    # One pooled AsyncClient per MISP base URL so keep-alive connections are reused between inject tests
+    def __init__(self, timeout: float = 30.0, connect_timeout: float = 10.0, max_connections: int = 20,
+                 max_keepalive_connections: int = 10, retries: int = 2, retry_backoff: float = 0.5, verify: bool = False,
+                 max_response_bytes: int | None = None, transport: httpx.AsyncBaseTransport | None = None):
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive_connections)
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.verify = verify
+        self.max_response_bytes = max_response_bytes
+        self.transport = transport
+        self._clients = {}
+
+    def getClient(self, misp_url: str) -> httpx.AsyncClient:
+        parsed = urlsplit(misp_url)
+        base_url = f'{parsed.scheme}://{parsed.netloc}'
+        client = self._clients.get(base_url, None)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits, verify=self.verify, transport=self.transport)
+            self._clients[base_url] = client
+        return client
+
+    async def fetch(self, misp_url: str, authkey: str, method: str, url: str, payload, on_progress: Callable[[int, int | None], None] | None = None) -> tuple:
+        # Returns the (content, content_type, is_success) of the response, reporting the received bytes to `on_progress`
+        return await self._request(misp_url, authkey, method, url, payload, lambda response: self._read(response, on_progress))
+
+    async def fetchParsed(self, misp_url: str, authkey: str, method: str, url: str, payload, on_progress: Callable[[int, int | None], None] | None = None) -> tuple:
+        # Same as fetch() but returns the parsed body, JSON is parsed while it is received when ijson is installed
+        return await self._request(misp_url, authkey, method, url, payload, lambda response: self._parse(response, on_progress))
+
+    async def _request(self, misp_url: str, authkey: str, method: str, url: str, payload, consume: Callable) -> tuple:
+        headers = {
+            'User-Agent': 'SkillAegis',
+            "Authorization": authkey,
+            "Accept": "application/json",
+            "Content-Type": "application/json"
+        }
+        full_url = urljoin(misp_url, url)
+        client = self.getClient(misp_url)
+        attempt = 0
+        while True:
+            try:
+                async with client.stream('POST' if method == 'POST' else 'GET', full_url, content=json.dumps(payload), headers=headers) as response:
+                    if response.status_code not in RETRY_STATUS_CODES or attempt >= self.retries:
+                        content = await consume(response)
+                        return (content, response.headers.get('content-type', ''), response.is_success,)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout):  # The request was not sent, any method can be retried
+                if attempt >= self.retries:
+                    raise
+            except (httpx.TimeoutException, httpx.NetworkError):  # MISP may already have processed a POST, only GET is retried
+                if method == 'POST' or attempt >= self.retries:
+                    raise
+            attempt += 1
+            await asyncio.sleep(self.retry_backoff * 2 ** (attempt - 1))
+
+    async def _parse(self, response: httpx.Response, on_progress: Callable[[int, int | None], None] | None):
+        if not response.headers.get('content-type', '').startswith('application/json'):
+            content = await self._read(response, on_progress)
+            return content.decode('utf-8', errors='replace')
+        parser = streamingParser()
+        if parser is None:
+            content = await self._read(response, on_progress)
+            return parseContent(content, response.headers.get('content-type', ''))
+        try:
+            await self._read(response, on_progress, parser.feed)
+            return parser.close()
+        except InvalidJSON as e:  # The body is not kept, unlike fetch() it cannot be returned as text
+            return f'Invalid JSON response: {e}'
+
+    async def _read(self, response: httpx.Response, on_progress: Callable[[int, int | None], None] | None, sink: Callable[[bytes], None] | None = None) -> bytes:
+        # Chunks are handed to `sink` as they arrive when given, otherwise the whole body is returned
+        total = int(response.headers['content-length']) if 'content-length' in response.headers else None
+        if self.max_response_bytes is not None and total is not None and total > self.max_response_bytes:
+            raise PayloadTooLarge(f'Response of {total} bytes is larger than the {self.max_response_bytes} bytes limit')
+        chunks = []
+        received = 0
+        reported = 0
+        async for chunk in response.aiter_bytes():
+            received += len(chunk)
+            if self.max_response_bytes is not None and received > self.max_response_bytes:
+                raise PayloadTooLarge(f'Response is larger than the {self.max_response_bytes} bytes limit')
+            if sink is not None:
+                sink(chunk)
+            else:
+                chunks.append(chunk)
+            if on_progress is not None and received - reported >= PROGRESS_STEP:
+                reported = received
+                on_progress(received, total)
+        if on_progress is not None and received != reported:
+            on_progress(received, total)
+        return b''.join(chunks)
+
+    async def close(self):
+        clients = list(self._clients.values())
+        self._clients = {}
+        for client in clients:
+            await client.aclose()
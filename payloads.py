@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+
+import json
+from typing import Union
+
+try:
+    import orjson
+except ImportError:  # Optional, faster and parses bytes without decoding them to a str first
+    orjson = None
+
+try:
+    import ijson
+except ImportError:  # Optional, parses MISP responses while they are received
+    ijson = None
+
+
+class PayloadTooLarge(Exception):
+    pass
+
+
+def parseContent(content: bytes, content_type: str):
+    # JSON bodies are parsed, anything else (or invalid JSON) is returned as text
+    if content_type.startswith('application/json'):
+        if orjson is not None:
+            try:
+                return orjson.loads(content)
+            except orjson.JSONDecodeError:  # Also raised for what json accepts and orjson does not (NaN, integers above 64 bits)
+                pass
+        try:
+            return json.loads(content)
+        except json.JSONDecodeError:
+            pass
+    return content.decode('utf-8', errors='replace')
+
+
+class InvalidJSON(ValueError):
+    pass
+
+
+class StreamingJSONParser:
+    # Parses a JSON document fed chunk by chunk with ijson, the raw body is never held as a whole next to the parsed value
+    def __init__(self):
+        self._values = ijson.sendable_list()
+        self._coroutine = ijson.items_coro(self._values, '', use_float=True)
+
+    def feed(self, chunk: bytes):
+        if not chunk:  # ijson takes an empty chunk as the end of the document
+            return
+        try:
+            self._coroutine.send(chunk)
+        except ijson.JSONError as e:
+            raise InvalidJSON(str(e).splitlines()[0]) from e
+
+    def close(self):
+        try:
+            self._coroutine.close()
+        except ijson.JSONError as e:
+            raise InvalidJSON(str(e).splitlines()[0]) from e
+        return self._values[0]
+
+
+def streamingParser() -> Union[StreamingJSONParser, None]:
+    # None when ijson is not installed, the body then has to be buffered and parsed with parseContent()
+    return StreamingJSONParser() if ijson is not None else None
+
+
+def truncateValue(value, max_bytes: int) -> tuple:
+    # Copies at most about max_bytes of (JSON-encoded) content of value, cut strings and containers say what was left out.
+    # Only the kept part is visited so summarising a huge value is as cheap as summarising a small one.
+    budget = [max_bytes]
+    truncated = [False]
+
+    def walk(item):
+        if isinstance(item, str):
+            if len(item) + 2 > budget[0]:
+                truncated[0] = True
+                kept = max(budget[0] - 2, 0)
+                budget[0] = 0
+                return f'{item[:kept]}... ({len(item)} characters)'
+            budget[0] -= len(item) + 2
+            return item
+        if isinstance(item, list):
+            copied = []
+            for i, child in enumerate(item):
+                if budget[0] <= 0:
+                    truncated[0] = True
+                    copied.append(f'... {len(item) - i} more items')
+                    break
+                copied.append(walk(child))
+                budget[0] -= 1
+            budget[0] -= 2
+            return copied
+        if isinstance(item, dict):
+            copied = {}
+            for i, (key, child) in enumerate(item.items()):
+                if budget[0] <= 0:
+                    truncated[0] = True
+                    copied['...'] = f'{len(item) - i} more keys'
+                    break
+                budget[0] -= len(str(key)) + 4
+                copied[key] = walk(child)
+            budget[0] -= 2
+            return copied
+        if isinstance(item, tuple):
+            return walk(list(item))
+        budget[0] -= len(str(item))
+        return item
+
+    return (walk(value), truncated[0],)
+
+
+class BodySizeLimitMiddleware:
+    # ASGI middleware answering 413 to request bodies of the given paths larger than their limit, declared or streamed
+    def __init__(self, app, limits: dict):
+        self.app = app
+        self.limits = limits  # {path prefix: max bytes}
+
+    async def __call__(self, scope, receive, send):
+        max_bytes = None
+        if scope['type'] == 'http':
+            max_bytes = next((limit for path, limit in self.limits.items() if scope['path'].startswith(path)), None)
+        if max_bytes is None:
+            await self.app(scope, receive, send)
+            return
+        message = f'The request body is larger than {max_bytes} bytes'
+        content_length = dict(scope['headers']).get(b'content-length', None)
+        if content_length is not None and content_length.isdigit() and int(content_length) > max_bytes:
+            await self._reject(send, message)
+            return
+        received = 0
+        exceeded = False
+        started = False
+
+        async def limitedReceive():
+            # Chunked bodies have no Content-Length, the application sees a disconnect once the limit is reached
+            nonlocal received, exceeded
+            if exceeded:
+                return {'type': 'http.disconnect'}
+            event = await receive()
+            if event['type'] == 'http.request':
+                received += len(event.get('body', b''))
+                if received > max_bytes:
+                    exceeded = True
+                    return {'type': 'http.disconnect'}
+            return event
+
+        async def guardedSend(event):
+            nonlocal started
+            if exceeded:  # The 413 is sent instead
+                return
+            if event['type'] == 'http.response.start':
+                started = True
+            await send(event)
+
+        try:
+            await self.app(scope, limitedReceive, guardedSend)
+        except Exception:
+            if not exceeded:
+                raise
+        if exceeded and not started:
+            await self._reject(send, message)
+
+    @staticmethod
+    async def _reject(send, message: str):
+        body = json.dumps({'detail': message}).encode()
+        await send({'type': 'http.response.start', 'status': 413, 'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]})
+        await send({'type': 'http.response.body', 'body': body})
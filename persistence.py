@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import tempfile
+from contextlib import nullcontext
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Union
+
+try:
+    import orjson
+except ImportError:  # Optional, only used for compact or 2-space indented files
+    orjson = None
+
+
+def encodeScenario(scenario: dict, indent: Union[int, None] = 4) -> bytes:
+    if orjson is not None and indent in (None, 2):
+        return orjson.dumps(scenario, option=orjson.OPT_INDENT_2 if indent == 2 else 0)
+    return json.dumps(scenario, indent=indent).encode()
+
+
+def atomicWrite(path: Path, content: bytes):
+    # Write to a temporary file in the same directory, fsync it, then rename it over the target
+    path = Path(path)
+    try:
+        mode = path.stat().st_mode & 0o777
+    except FileNotFoundError:
+        mode = 0o644
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    try:
+        dir_fd = os.open(path.parent, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    except OSError:  # Directories cannot be opened/fsynced on every platform
+        pass
+
+
+class ScenarioWriter:
+    # Write-behind persistence: saves of the same file within `delay` seconds are coalesced into a single write
+    def __init__(self, delay: float = 0.5, indent: Union[int, None] = 4, on_written: Union[Callable[[Path, Union[dict, None], bytes], None], None] = None,
+                 lock_for: Union[Callable[[Path, dict], Any], None] = None, span: Union[Callable[[str], Any], None] = None):
+        self.delay = delay
+        self.indent = indent
+        self.on_written = on_written
+        self.lock_for = lock_for
+        self.span = span if span is not None else (lambda stage: nullcontext())
+        self._pending = {}
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = None
+        self._metrics = {
+            'writes': 0,
+            'coalesced': 0,
+            'errors': 0,
+            'bytes_written': 0,
+            'write_latency_ms_total': 0.0,
+            'write_latency_ms_max': 0.0,
+            'last_error': None,
+        }
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None or self.delay <= 0:
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name='scenario-writer', daemon=True)
+            self._thread.start()
+
+    def save(self, path: Path, scenario: dict) -> Union[bool, Exception]:
+        if self.delay <= 0 or self._thread is None:
+            return self.writeNow(path, scenario)
+        with self._cond:
+            if path in self._pending:
+                self._metrics['coalesced'] += 1
+                self._pending[path] = (scenario, self._pending[path][1],)
+            else:
+                self._pending[path] = (scenario, time.monotonic() + self.delay,)
+            self._cond.notify()
+        return True
+
+    def writeNow(self, path: Path, scenario: dict) -> Union[bool, Exception]:
+        self.cancel(path)
+        return self._write(path, scenario)
+
+    def writeRaw(self, path: Path, content: bytes) -> Union[bool, Exception]:
+        self.cancel(path)
+        return self._write(path, None, content)
+
+    def cancel(self, path: Path) -> bool:
+        # Returns whether a save of `path` was pending
+        with self._cond:
+            return self._pending.pop(path, None) is not None
+
+    def flush(self):
+        with self._cond:
+            batch = [(path, scenario) for path, (scenario, _) in self._pending.items()]
+            self._pending = {}
+        for path, scenario in batch:
+            self._write(path, scenario)
+
+    def close(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    now = time.monotonic()
+                    due = [path for path, (_, deadline) in self._pending.items() if deadline <= now]
+                    if len(due) > 0:
+                        break
+                    timeout = min([deadline for _, deadline in self._pending.values()], default=now + 60) - now
+                    self._cond.wait(timeout=timeout)
+                if self._stopped:
+                    return
+                batch = [(path, self._pending.pop(path)[0]) for path in due]
+            for path, scenario in batch:
+                self._write(path, scenario)
+
+    def _write(self, path: Path, scenario: Union[dict, None], content: Union[bytes, None] = None) -> Union[bool, Exception]:
+        start = time.perf_counter()
+        try:
+            if content is None:
+                # The scenario is serialised while holding its lock so a half-applied edit is never written
+                with self.lock_for(path, scenario) if self.lock_for is not None else nullcontext(), self.span('scenario_encode'):
+                    content = encodeScenario(scenario, self.indent)
+            with self.span('scenario_write'):
+                atomicWrite(path, content)
+        except RuntimeError as e:  # The scenario was modified while being serialised, try again later
+            if scenario is not None and self._thread is not None:
+                with self._cond:
+                    self._pending.setdefault(path, (scenario, time.monotonic() + self.delay,))
+                    self._cond.notify()
+                return True
+            return self._recordError(e)
+        except Exception as e:
+            return self._recordError(e)
+
+        duration = (time.perf_counter() - start) * 1000
+        with self._cond:
+            self._metrics['writes'] += 1
+            self._metrics['bytes_written'] += len(content)
+            self._metrics['write_latency_ms_total'] += duration
+            self._metrics['write_latency_ms_max'] = max(self._metrics['write_latency_ms_max'], duration)
+        if self.on_written is not None:
+            try:
+                self.on_written(path, scenario, content)
+            except Exception as e:
+                print(f'Scenario write callback failed: {e}')
+        return True
+
+    def _recordError(self, e: Exception) -> Exception:
+        print(e)
+        with self._cond:
+            self._metrics['errors'] += 1
+            self._metrics['last_error'] = f'{type(e).__name__}: {e}'
+        return e
+
+    def stats(self) -> dict:
+        with self._cond:
+            metrics = dict(self._metrics)
+            metrics['pending'] = len(self._pending)
+        metrics['write_latency_ms_avg'] = metrics['write_latency_ms_total'] / metrics['writes'] if metrics['writes'] > 0 else 0.0
+        metrics['delay'] = self.delay
+        metrics['encoder'] = 'orjson' if orjson is not None and self.indent in (None, 2) else 'json'
+        return metrics
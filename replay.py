@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+
+# Runs every inject evaluation of every scenario of the exercise directory against recorded MISP responses,
+# reporting the outcome and duration of each inject. Record the responses once from a live MISP with --record.
+# Usage: python3 replay.py [--record --misp-url <url> --authkey <key>] [--scenario <uuid>] [--concurrency 8] [--repeat 1] [--json]
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+
+def percentile(values: list, ratio: float) -> float:
+    if len(values) == 0:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(ratio * (len(ordered) - 1))))]
+
+
+async def runAll(editor, scenario_uuids: list, misp_url: str, authkey: str, test_data: dict, concurrency: int) -> dict:
+    # Scenarios run in parallel, each one with `concurrency` evaluations in flight
+    start = time.perf_counter()
+    batches = [
+        editor.BatchInjectTestPayload(
+            scenario_uuid=scenario_uuid,
+            test_data=test_data,
+            query_search_misp_url=misp_url,
+            query_search_misp_apikey=authkey,
+            max_concurrency=concurrency,
+        ) for scenario_uuid in scenario_uuids
+    ]
+    reports = await asyncio.gather(*[editor.testInjectBatch(batch) for batch in batches])
+    return {
+        'reports': dict(zip(scenario_uuids, reports)),
+        'wall_ms': (time.perf_counter() - start) * 1000,
+    }
+
+
+def failureMessage(result: dict) -> str:
+    # Last debug message of the first failed evaluation
+    message = ''
+    for evaluation in result['evaluations']:
+        if evaluation['outcome'] == 1:
+            continue
+        for entries in evaluation['debug']:
+            for entry in entries if type(entries) is list else [entries]:
+                if type(entry) is dict and 'message' in entry:
+                    message = f"{entry['message']}: {entry['data']}" if entry.get('data', None) is not None else entry['message']
+        return message[:120]
+    return message
+
+
+def printReport(editor, run: dict, runs_wall_ms: list):
+    durations = []
+    for scenario_uuid, report in run['reports'].items():
+        name = editor.scenarioByUUID[scenario_uuid]['exercise'].get('name', scenario_uuid)
+        print(f'{name} ({scenario_uuid}): {report["succeeded"]}/{report["tested"]} succeeded')
+        for result in report['results']:
+            durations.append(result['duration_ms'])
+            outcome = 'PASS' if result['outcome'] == 1 else 'FAIL'
+            print(f'  {outcome}  {result["duration_ms"]:10.2f} ms  {result["name"]}  {failureMessage(result) if outcome == "FAIL" else ""}')
+    tested = sum([report['tested'] for report in run['reports'].values()])
+    succeeded = sum([report['succeeded'] for report in run['reports'].values()])
+    print(f'{succeeded}/{tested} injects succeeded in {len(run["reports"])} scenarios')
+    print(f'  inject duration  p50 {percentile(durations, 0.5):.2f} ms  p95 {percentile(durations, 0.95):.2f} ms  max {max(durations, default=0.0):.2f} ms')
+    print(f'  wall time        {" / ".join([f"{wall_ms:.2f}" for wall_ms in runs_wall_ms])} ms (median {statistics.median(runs_wall_ms):.2f} ms)')
+
+
+async def replay(args) -> int:
+    import main as editor
+    scenario_uuids = args.scenario or [scenario['exercise']['uuid'] for scenario in editor.scenarios]
+    unknown = [scenario_uuid for scenario_uuid in scenario_uuids if scenario_uuid not in editor.scenarioByUUID]
+    if len(unknown) > 0:
+        print(f'Unknown scenario(s): {", ".join(unknown)}', file=sys.stderr)
+        return 2
+    test_data = {}
+    if args.test_data:
+        with open(args.test_data, 'r') as f:
+            test_data = json.load(f)
+
+    runs = []
+    try:
+        # Same warm-up as the server start, the spawn of the sandbox workers is not part of the measured runs
+        if editor.PYTHON_EVAL_SANDBOX and editor.INJECT_EVALUATOR_PATH.exists():
+            editor.pythonEvaluationPool.start()
+        for _ in range(args.repeat):
+            runs.append(await runAll(editor, scenario_uuids, args.misp_url, args.authkey, test_data, args.concurrency))
+    finally:
+        await editor.mispClientPool.close()
+        editor.pythonEvaluationPool.shutdown()
+
+    last = runs[-1]
+    if args.json:
+        print(json.dumps({
+            'reports': last['reports'],
+            'wall_ms': [run['wall_ms'] for run in runs],
+            'fixtures': editor.mispClientPool.stats(),
+        }, indent=2))
+    else:
+        printReport(editor, last, [run['wall_ms'] for run in runs])
+        fixtures = editor.mispClientPool.stats()
+        print(f'  fixtures         {fixtures["recorded"]} recorded, {fixtures["replayed"]} replayed, {fixtures["missing"]} missing ({fixtures["directory"]})')
+    failed = sum([report['failed'] for report in last['reports'].values()])
+    return 1 if failed > 0 else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay the inject evaluations of the exercise directory against recorded MISP responses')
+    parser.add_argument('--record', action='store_true', help='Query MISP and record its responses instead of replaying them')
+    parser.add_argument('--misp-url', default='http://misp.replay', help='MISP base URL, only contacted with --record')
+    parser.add_argument('--authkey', default='replay', help='MISP authkey, only used with --record')
+    parser.add_argument('--fixtures', default=None, help='Fixture directory (misp_fixture_directory by default)')
+    parser.add_argument('--scenario', action='append', help='UUID of a scenario to test, all scenarios by default')
+    parser.add_argument('--test-data', default=None, help='JSON file used as data of the data_filtering evaluations')
+    parser.add_argument('--concurrency', type=int, default=8, help='Evaluations running at the same time per scenario')
+    parser.add_argument('--repeat', type=int, default=1, help='Number of runs, timings of each run are reported')
+    parser.add_argument('--json', action='store_true', help='Print the full reports as JSON')
+    args = parser.parse_args()
+    if args.record and args.misp_url == parser.get_default('misp_url'):
+        parser.error('--record needs the --misp-url and --authkey of a MISP instance')
+
+    # Read by main.py when it is imported
+    os.environ['MISP_FIXTURE_MODE'] = 'record' if args.record else 'replay'
+    if args.fixtures:
+        os.environ['MISP_FIXTURE_DIR'] = os.path.abspath(args.fixtures)
+    sys.exit(asyncio.run(replay(args)))
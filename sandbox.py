@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+
+import importlib.util
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+
+from payloads import truncateValue
+
+try:
+    import resource
+except ImportError:  # Not available on Windows, limits are then not enforced
+    resource = None
+
+
+_evaluator = None
+_memory_limit = None
+
+
+def _initWorker(evaluator_path: str, memory_limit: int | None):
+    # Runs once per worker: the evaluator is imported up-front so tasks only pay for the evaluation itself
+    global _evaluator, _memory_limit
+    _memory_limit = memory_limit
+    if resource is not None and memory_limit is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    spec = importlib.util.spec_from_file_location('inject_eval', evaluator_path)
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules['inject_eval'] = mod
+    backend_path = os.path.abspath(os.path.join(os.path.dirname(evaluator_path), '../../..'))
+    if backend_path not in sys.path:
+        sys.path.insert(0, backend_path)
+    spec.loader.exec_module(mod)
+    _evaluator = mod
+
+
+def _runEvalPython(cpu_time_limit: int | None, debug_max_bytes: int | None, args: tuple) -> tuple:
+    if resource is not None and cpu_time_limit is not None:
+        # RLIMIT_CPU is cumulative for the process, the limit is set relative to the CPU time already used
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        used = int(usage.ru_utime + usage.ru_stime)
+        _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        resource.setrlimit(resource.RLIMIT_CPU, (used + cpu_time_limit, hard))
+    try:
+        success, debug = _evaluator.eval_python(*args, debug=True)
+    except MemoryError:
+        return (False, [[{'message': 'Evaluation exceeded the memory limit', 'data': _memory_limit}]])
+    if debug_max_bytes is not None:
+        # Truncated before being pickled back to the editor
+        debug = [truncateValue(entry, debug_max_bytes)[0] for entry in debug]
+    return (success, debug)
+
+
+def _workerMain(connection, evaluator_path: str, memory_limit: int | None):
+    # Runs tasks received on the connection one at a time until it is closed
+    _initWorker(evaluator_path, memory_limit)
+    connection.send(('ready', os.getpid(),))
+    while True:
+        try:
+            task = connection.recv()
+        except EOFError:
+            return
+        cpu_time_limit, debug_max_bytes, args = task
+        try:
+            result = ('result', _runEvalPython(cpu_time_limit, debug_max_bytes, args),)
+        except Exception as e:
+            result = ('error', e,)
+        try:
+            connection.send(result)
+        except Exception as e:  # Result or exception that cannot be pickled
+            connection.send(('error', RuntimeError(f'Could not send the evaluation result: {e!r}'),))
+
+
+class SandboxTimeout(Exception):
+    pass
+
+
+class _Worker:
+    # One worker process and the pipe its tasks go through, it can be killed without affecting the other workers
+    def __init__(self, context, evaluator_path: str, memory_limit: int | None, evaluator_mtime: int, generation: int):
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(target=_workerMain, args=(child_connection, evaluator_path, memory_limit,), daemon=True)
+        self.process.start()
+        child_connection.close()
+        self.evaluator_mtime = evaluator_mtime
+        self.generation = generation
+
+    def waitReady(self, timeout: float):
+        if not self.connection.poll(timeout):
+            self.kill()
+            raise SandboxTimeout(f'Evaluation worker did not start within {timeout}s')
+        try:
+            self.connection.recv()
+        except EOFError:
+            self.kill()
+            raise RuntimeError(f'Evaluation worker exited while starting (exit code {self.process.exitcode})')
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(1)
+        self.connection.close()
+
+
+class PythonEvaluationPool:
+    # Pre-forked workers running the `python` evaluation strategy with CPU time and memory limits. A runaway
+    # evaluation only takes down the worker running it, the worker is then replaced in the background.
+    def __init__(self, evaluator_path: str, workers: int = 2, timeout: float = 10.0,
+                 cpu_time_limit: int | None = 10, memory_limit: int | None = 512 * 1024 * 1024, debug_max_bytes: int | None = None,
+                 start_timeout: float = 60.0):
+        self.evaluator_path = str(evaluator_path)
+        self.workers = workers
+        self.timeout = timeout
+        self.cpu_time_limit = cpu_time_limit
+        self.memory_limit = memory_limit
+        self.debug_max_bytes = debug_max_bytes
+        self.start_timeout = start_timeout
+        self._context = multiprocessing.get_context('spawn')
+        self._condition = threading.Condition()
+        self._idle = []
+        self._alive = set()  # Idle and busy workers of the current generation
+        self._starting = 0
+        self._generation = 0  # Bumped by shutdown, workers of older generations are not returned to the pool
+        self.replaced = 0
+
+    def _evaluatorMtime(self) -> int:
+        return os.stat(self.evaluator_path).st_mtime_ns
+
+    def _spawn(self, generation: int) -> _Worker:
+        worker = _Worker(self._context, self.evaluator_path, self.memory_limit, self._evaluatorMtime(), generation)
+        worker.waitReady(self.start_timeout)
+        return worker
+
+    def start(self):
+        # Warm up every worker so the first evaluations do not pay for the interpreter start and the evaluator import
+        with self._condition:
+            missing = self.workers - len(self._alive) - self._starting
+            self._starting += max(missing, 0)
+            generation = self._generation
+        for _ in range(max(missing, 0)):
+            self._addWorker(generation)
+
+    def _addWorker(self, generation: int):
+        # Called with one `_starting` slot reserved
+        try:
+            worker = self._spawn(generation)
+        except Exception:
+            with self._condition:
+                self._starting -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._starting -= 1
+            if generation != self._generation:
+                worker.kill()
+                return
+            self._alive.add(worker)
+            self._idle.append(worker)
+            self._condition.notify()
+
+    def _replaceInBackground(self, replaced: _Worker):
+        with self._condition:
+            if replaced.generation != self._generation or len(self._alive) + self._starting >= self.workers:
+                return
+            self._starting += 1
+            generation = self._generation
+        self.replaced += 1
+        threading.Thread(target=self._replaceWorker, args=(generation,), daemon=True).start()
+
+    def _replaceWorker(self, generation: int):
+        try:
+            self._addWorker(generation)
+        except Exception as e:  # The next evaluation starts a worker itself
+            if generation == self._generation:
+                print(f'Could not replace the evaluation worker: {e}')
+
+    def _checkout(self) -> _Worker:
+        with self._condition:
+            while len(self._idle) == 0:
+                if len(self._alive) + self._starting < self.workers:
+                    self._starting += 1
+                    generation = self._generation
+                    break
+                self._condition.wait()
+            else:
+                worker = self._idle.pop()
+                generation = None
+        if generation is not None:
+            self._addWorker(generation)
+            return self._checkout()
+        if worker.evaluator_mtime != self._evaluatorMtime():
+            # Workers hold the evaluator imported at start, they are replaced when its source changes
+            self._discard(worker)
+            self._replaceInBackground(worker)
+            return self._checkout()
+        return worker
+
+    def _checkin(self, worker: _Worker):
+        with self._condition:
+            if worker.generation == self._generation:
+                self._idle.append(worker)
+                self._condition.notify()
+                return
+        worker.kill()
+
+    def _discard(self, worker: _Worker):
+        worker.kill()
+        with self._condition:
+            self._alive.discard(worker)
+            self._condition.notify()
+
+    def evalPython(self, *args) -> tuple:
+        worker = self._checkout()
+        try:
+            worker.connection.send((self.cpu_time_limit, self.debug_max_bytes, args,))
+            if not worker.connection.poll(self.timeout):
+                # A runaway task cannot be interrupted, only its own worker is killed
+                self._discard(worker)
+                self._replaceInBackground(worker)
+                raise SandboxTimeout(f'Evaluation did not finish within {self.timeout}s')
+            kind, value = worker.connection.recv()
+        except (EOFError, OSError):
+            worker.process.join(1)
+            exitcode = worker.process.exitcode
+            self._discard(worker)
+            self._replaceInBackground(worker)
+            if exitcode is not None and exitcode == -getattr(signal, 'SIGXCPU', 0):
+                raise SandboxTimeout(f'Evaluation worker was terminated, it reached the CPU time limit of {self.cpu_time_limit}s')
+            raise SandboxTimeout(f'Evaluation worker was terminated (exit code {exitcode}), most likely by the memory limit')
+        self._checkin(worker)
+        if kind == 'error':
+            raise value
+        return value
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                'workers': len(self._alive),
+                'idle': len(self._idle),
+                'starting': self._starting,
+                'replaced': self.replaced,
+            }
+
+    def shutdown(self):
+        with self._condition:
+            self._generation += 1
+            workers = list(self._alive)
+            self._alive = set()
+            self._idle = []
+            self._condition.notify_all()
+        for worker in workers:
+            worker.kill()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+
+from collections import deque
+
+
+class ScenarioGraph:
+    # Directed graph of the injects of one scenario: an edge A -> B means B can only run after A
+    # (B requires the completion of A, or A is followed by B). Every analysis is linear in nodes + edges.
+    def __init__(self, scenario: dict):
+        self.nodes = []
+        self.successors = {}
+        self.predecessors = {}
+        self.edges = []
+        self.danglingReferences = []
+        self.injectsWithoutFlow = []
+        self.injectsWithoutUUID = []
+        self._build(scenario)
+
+    def _addNode(self, inject_uuid: str):
+        if inject_uuid not in self.successors:
+            self.nodes.append(inject_uuid)
+            self.successors[inject_uuid] = []
+            self.predecessors[inject_uuid] = []
+
+    def _addEdge(self, source: str, target: str, kind: str):
+        self.successors[source].append(target)
+        self.predecessors[target].append(source)
+        self.edges.append({'from': source, 'to': target, 'type': kind})
+
+    def _build(self, scenario: dict):
+        for position, inject in enumerate(scenario.get('injects', [])):
+            inject_uuid = inject.get('uuid', None) if type(inject) is dict else None
+            if type(inject_uuid) is not str:  # Left to the schema validation, the inject cannot be referenced anyway
+                self.injectsWithoutUUID.append(position)
+                continue
+            self._addNode(inject_uuid)
+        injectUUIDs = set(self.nodes)
+
+        flowUUIDs = set()
+        for injectF in scenario.get('inject_flow', []):
+            inject_uuid = injectF.get('inject_uuid', None)
+            if inject_uuid not in injectUUIDs:
+                self.danglingReferences.append({'inject_uuid': inject_uuid, 'field': 'inject_uuid', 'reference': inject_uuid})
+                continue
+            flowUUIDs.add(inject_uuid)
+
+            required_uuid = (injectF.get('requirements', None) or {}).get('inject_uuid', None)
+            if required_uuid:
+                if required_uuid in injectUUIDs:
+                    self._addEdge(required_uuid, inject_uuid, 'requirement')
+                else:
+                    self.danglingReferences.append({'inject_uuid': inject_uuid, 'field': 'requirements.inject_uuid', 'reference': required_uuid})
+
+            for next_uuid in (injectF.get('sequence', None) or {}).get('followed_by', None) or []:
+                if next_uuid in injectUUIDs:
+                    self._addEdge(inject_uuid, next_uuid, 'followed_by')
+                else:
+                    self.danglingReferences.append({'inject_uuid': inject_uuid, 'field': 'sequence.followed_by', 'reference': next_uuid})
+
+        self.injectsWithoutFlow = [inject_uuid for inject_uuid in self.nodes if inject_uuid not in flowUUIDs]
+
+    def cycles(self) -> list:
+        # Strongly connected components with more than one inject (or a self-loop), iterative Tarjan
+        index = {}
+        lowlink = {}
+        onStack = set()
+        stack = []
+        components = []
+        counter = 0
+        for root in self.nodes:
+            if root in index:
+                continue
+            work = [(root, 0)]
+            while work:
+                node, position = work[-1]
+                if position == 0:
+                    index[node] = lowlink[node] = counter
+                    counter += 1
+                    stack.append(node)
+                    onStack.add(node)
+                successors = self.successors[node]
+                if position < len(successors):
+                    work[-1] = (node, position + 1)
+                    successor = successors[position]
+                    if successor not in index:
+                        work.append((successor, 0))
+                    elif successor in onStack:
+                        lowlink[node] = min(lowlink[node], index[successor])
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        onStack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1 or node in self.successors[node]:
+                        components.append(component[::-1])
+        return components
+
+    def topologicalOrder(self) -> list:
+        # Kahn's algorithm, injects part of (or depending on) a cycle are left out
+        inDegree = {node: len(self.predecessors[node]) for node in self.nodes}
+        queue = deque([node for node in self.nodes if inDegree[node] == 0])
+        order = []
+        while queue:
+            node = queue.popleft()
+            order.append(node)
+            for successor in self.successors[node]:
+                inDegree[successor] -= 1
+                if inDegree[successor] == 0:
+                    queue.append(successor)
+        return order
+
+    def entryPoints(self) -> list:
+        blocked = {reference['inject_uuid'] for reference in self.danglingReferences if reference['field'] == 'requirements.inject_uuid'}
+        return [node for node in self.nodes if len(self.predecessors[node]) == 0 and node not in blocked]
+
+    def unreachable(self) -> list:
+        # Injects that cannot be reached from any entry point, e.g. part of a cycle or requiring a missing inject
+        seen = set()
+        queue = deque(self.entryPoints())
+        seen.update(queue)
+        while queue:
+            for successor in self.successors[queue.popleft()]:
+                if successor not in seen:
+                    seen.add(successor)
+                    queue.append(successor)
+        return [node for node in self.nodes if node not in seen]
+
+    def toDict(self) -> dict:
+        cycles = self.cycles()
+        return {
+            'nodes': self.nodes,
+            'edges': self.edges,
+            'dependents': {node: list(self.successors[node]) for node in self.nodes},
+            'entry_points': self.entryPoints(),
+            'topological_order': self.topologicalOrder(),
+            'cycles': cycles,
+            'unreachable': self.unreachable(),
+            'dangling_references': self.danglingReferences,
+            'injects_without_flow': self.injectsWithoutFlow,
+            'injects_without_uuid': self.injectsWithoutUUID,
+            'is_valid': len(cycles) == 0 and len(self.danglingReferences) == 0 and len(self.injectsWithoutUUID) == 0,
+        }
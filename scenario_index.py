@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+
+from collections import defaultdict
+
+
+class ScenarioIndex:
+    # Positions of injects and inject flows by inject UUID, plus the reverse requirement edges, for one scenario.
+    # Every mutation of the scenario's injects/inject_flow lists must go through the index to keep it in sync.
+    def __init__(self, scenario: dict):
+        self.scenario = scenario
+        self.rebuild()
+
+    def rebuild(self):
+        self.injects = self.scenario['injects']
+        self.injectFlows = self.scenario['inject_flow']
+        self.injectPositionByUUID = {inject['uuid']: i for i, inject in enumerate(self.injects)}
+        self.injectFlowPositionByUUID = {injectF['inject_uuid']: i for i, injectF in enumerate(self.injectFlows)}
+        self.requiredBy = defaultdict(set)
+        for injectF in self.injectFlows:
+            self._addRequirementEdge(injectF)
+
+    def isStale(self, scenario: dict) -> bool:
+        return scenario is not self.scenario or scenario['injects'] is not self.injects or scenario['inject_flow'] is not self.injectFlows
+
+    def _requiredUUID(self, injectF: dict):
+        return (injectF.get('requirements', None) or {}).get('inject_uuid', None)
+
+    def _addRequirementEdge(self, injectF: dict):
+        required_uuid = self._requiredUUID(injectF)
+        if required_uuid:
+            self.requiredBy[required_uuid].add(injectF['inject_uuid'])
+
+    def _removeRequirementEdge(self, injectF: dict):
+        required_uuid = self._requiredUUID(injectF)
+        if required_uuid and required_uuid in self.requiredBy:
+            self.requiredBy[required_uuid].discard(injectF['inject_uuid'])
+            if len(self.requiredBy[required_uuid]) == 0:
+                del self.requiredBy[required_uuid]
+
+    def getInject(self, inject_uuid: str) -> dict | None:
+        position = self.injectPositionByUUID.get(inject_uuid, None)
+        return self.injects[position] if position is not None else None
+
+    def getInjectFlow(self, inject_uuid: str) -> dict | None:
+        position = self.injectFlowPositionByUUID.get(inject_uuid, None)
+        return self.injectFlows[position] if position is not None else None
+
+    def getDependents(self, inject_uuid: str) -> set:
+        return set(self.requiredBy.get(inject_uuid, set()))
+
+    def upsertInject(self, inject: dict):
+        position = self.injectPositionByUUID.get(inject['uuid'], None)
+        if position is None:
+            self.injectPositionByUUID[inject['uuid']] = len(self.injects)
+            self.injects.append(inject)
+        else:
+            self.injects[position] = inject
+
+    def upsertInjectFlow(self, injectF: dict):
+        position = self.injectFlowPositionByUUID.get(injectF['inject_uuid'], None)
+        if position is None:
+            self.injectFlowPositionByUUID[injectF['inject_uuid']] = len(self.injectFlows)
+            self.injectFlows.append(injectF)
+        else:
+            self._removeRequirementEdge(self.injectFlows[position])
+            self.injectFlows[position] = injectF
+        self._addRequirementEdge(injectF)
+
+    def removeInject(self, inject_uuid: str):
+        position = self.injectPositionByUUID.pop(inject_uuid, None)
+        if position is not None:
+            self.injects.pop(position)
+            self._shiftPositions(self.injects, self.injectPositionByUUID, position, 'uuid')
+
+        position = self.injectFlowPositionByUUID.pop(inject_uuid, None)
+        if position is not None:
+            self._removeRequirementEdge(self.injectFlows.pop(position))
+            self._shiftPositions(self.injectFlows, self.injectFlowPositionByUUID, position, 'inject_uuid')
+
+        # Remove any inject requirements that existed for that inject
+        for dependent_uuid in self.requiredBy.pop(inject_uuid, set()):
+            injectF = self.getInjectFlow(dependent_uuid)
+            if injectF is not None:
+                injectF['requirements'] = {}
+
+    def _shiftPositions(self, items: list, positionByUUID: dict, start: int, key: str):
+        for i in range(start, len(items)):
+            positionByUUID[items[i][key]] = i
+
+    def reorder(self, inject_uuids: list):
+        # Raises KeyError if one of the UUIDs has no inject or no inject flow
+        orderedInjects = [self.injects[self.injectPositionByUUID[inject_uuid]] for inject_uuid in inject_uuids]
+        orderedInjectFlows = [self.injectFlows[self.injectFlowPositionByUUID[inject_uuid]] for inject_uuid in inject_uuids]
+        self.scenario['injects'] = orderedInjects
+        self.scenario['inject_flow'] = orderedInjectFlows
+        self.rebuild()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+
+from collections import defaultdict
+import heapq
+import json
+import math
+import re
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+FIELD_WEIGHTS = {
+    'name': 5.0,
+    'namespace': 3.0,
+    'description': 1.0,
+    'inject_name': 3.0,
+    'inject_action': 2.0,
+    'inject_description': 1.0,
+    'target_tool': 1.0,
+    'evaluation_strategy': 1.0,
+    'evaluation_parameter': 1.5,
+    'query_url': 2.0,
+}
+
+
+def tokenize(text) -> list:
+    if text is None:
+        return []
+    if not isinstance(text, str):
+        text = json.dumps(text)
+    return TOKEN_RE.findall(text.lower())
+
+
+def extractFields(scenario: dict) -> list:
+    # (inject_uuid or None, field, text) of every searchable value of a scenario
+    exercise = scenario.get('exercise', {}) or {}
+    values = [
+        (None, 'name', exercise.get('name', None)),
+        (None, 'namespace', exercise.get('namespace', None)),
+        (None, 'description', exercise.get('description', None)),
+    ]
+    for inject in scenario.get('injects', []) or []:
+        inject_uuid = inject.get('uuid', None)
+        values.append((inject_uuid, 'inject_name', inject.get('name', None)))
+        values.append((inject_uuid, 'inject_action', inject.get('action', None)))
+        values.append((inject_uuid, 'inject_description', inject.get('description', None)))
+        values.append((inject_uuid, 'target_tool', inject.get('target_tool', None)))
+        for evaluation in inject.get('inject_evaluation', []) or []:
+            values.append((inject_uuid, 'evaluation_strategy', evaluation.get('evaluation_strategy', None)))
+            values.append((inject_uuid, 'evaluation_parameter', evaluation.get('parameters', None)))
+            query_context = (evaluation.get('evaluation_context', None) or {}).get('query_context', None) or {}
+            values.append((inject_uuid, 'query_url', query_context.get('url', None)))
+    return values
+
+
+class ScenarioSearchIndex:
+    # Inverted index token -> scenario -> (per-field weighted term frequencies, (inject, field) pairs), updated one scenario at a time
+    def __init__(self):
+        self.postings = defaultdict(dict)
+        self.tokensByScenario = {}
+        self.revisionByScenario = {}
+
+    def __len__(self):
+        return len(self.tokensByScenario)
+
+    def upsert(self, scenario_uuid: str, scenario: dict, revision=None):
+        self.remove(scenario_uuid)
+        frequencies = defaultdict(lambda: defaultdict(int))
+        for inject_uuid, field, text in extractFields(scenario):
+            for token in tokenize(text):
+                frequencies[token][(inject_uuid, field,)] += 1
+        for token, entries in frequencies.items():
+            fieldScores = defaultdict(float)
+            for (_, field), frequency in entries.items():
+                fieldScores[field] += FIELD_WEIGHTS[field] * (1 + math.log(frequency))
+            self.postings[token][scenario_uuid] = (dict(fieldScores), list(entries.keys()),)
+        self.tokensByScenario[scenario_uuid] = list(frequencies.keys())
+        self.revisionByScenario[scenario_uuid] = revision
+
+    def remove(self, scenario_uuid: str):
+        for token in self.tokensByScenario.pop(scenario_uuid, []):
+            scenarioPostings = self.postings.get(token, None)
+            if scenarioPostings is None:
+                continue
+            scenarioPostings.pop(scenario_uuid, None)
+            if len(scenarioPostings) == 0:
+                del self.postings[token]
+        self.revisionByScenario.pop(scenario_uuid, None)
+
+    def isStale(self, scenario_uuid: str, revision) -> bool:
+        return scenario_uuid not in self.tokensByScenario or self.revisionByScenario.get(scenario_uuid, None) != revision
+
+    def parseQuery(self, query: str, fields: list | None = None) -> list:
+        # `field:value` restricts the tokens of value to that field, other tokens are searched in `fields` (all by default)
+        terms = []
+        for part in query.split():
+            field, _, value = part.partition(':')
+            if value and field in FIELD_WEIGHTS:
+                terms.extend([(token, {field},) for token in tokenize(value)])
+            else:
+                terms.extend([(token, set(fields) if fields else None,) for token in tokenize(part)])
+        return terms
+
+    def search(self, query: str, fields: list | None = None, candidates: set | None = None, limit: int = 20) -> dict:
+        # Scenarios must match every term, ranked by the field-weighted tf-idf of the matches
+        terms = self.parseQuery(query, fields)
+        if len(terms) == 0:
+            return {'total': 0, 'results': []}
+        scenarioCount = max(len(self.tokensByScenario), 1)
+        scores = None
+        # Rarest terms first so the candidate set shrinks as fast as possible
+        for token, termFields in sorted(terms, key=lambda term: len(self.postings.get(term[0], {}))):
+            termScores = {}
+            scenarioPostings = self.postings.get(token, {})
+            idf = math.log(1 + scenarioCount / max(len(scenarioPostings), 1))
+            keys = scenarioPostings.keys() if scores is None else [key for key in scores if key in scenarioPostings]
+            for scenario_uuid in keys:
+                if candidates is not None and scenario_uuid not in candidates:
+                    continue
+                fieldScores = scenarioPostings[scenario_uuid][0]
+                if termFields is None:
+                    score = sum(fieldScores.values())
+                else:
+                    score = sum([fieldScore for field, fieldScore in fieldScores.items() if field in termFields])
+                if score > 0:
+                    termScores[scenario_uuid] = score * idf
+            scores = termScores if scores is None else {key: scores[key] + termScores[key] for key in termScores}
+            if len(scores) == 0:
+                break
+
+        ranked = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return {
+            'total': len(scores),
+            'results': [self._describeMatch(scenario_uuid, score, terms) for scenario_uuid, score in ranked],
+        }
+
+    def _describeMatch(self, scenario_uuid: str, score: float, terms: list) -> dict:
+        # Matched fields and injects are only collected for the returned results
+        matchedFields = set()
+        matchedInjects = set()
+        for token, termFields in terms:
+            for inject_uuid, field in self.postings[token][scenario_uuid][1]:
+                if termFields is not None and field not in termFields:
+                    continue
+                matchedFields.add(field)
+                if inject_uuid is not None:
+                    matchedInjects.add(inject_uuid)
+        return {
+            'uuid': scenario_uuid,
+            'score': round(score, 4),
+            'matched_fields': sorted(matchedFields),
+            'matched_injects': sorted(matchedInjects),
+        }
+
+    def stats(self) -> dict:
+        return {
+            'scenarios': len(self.tokensByScenario),
+            'tokens': len(self.postings),
+        }
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+from contextlib import contextmanager
+import hashlib
+import os
+import sqlite3
+import threading
+import uuid
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, mutations are then only serialised within a worker
+    fcntl = None
+
+SHARED_STATE_VERSION = 1
+
+
+class SharedState:
+    # State shared by the workers serving the same exercise directory. The files stay the source of truth:
+    # the database only holds the revision of each scenario (bumped by the first worker seeing a new content hash)
+    # and a generation counter bumped on every change, telling the other workers to reload before serving.
+    def __init__(self, path: Path, exercise_dir: Path):
+        self.path = Path(path)
+        self.lock_dir = self.path.parent / f'{self.path.name}.locks'
+        self.lock_dir.mkdir(exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False, isolation_level=None)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute('CREATE TABLE IF NOT EXISTS revisions (uuid TEXT PRIMARY KEY, revision INTEGER NOT NULL, hash TEXT)')
+        self._connection.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        expected = {
+            'version': str(SHARED_STATE_VERSION),
+            'exercise_dir': str(Path(exercise_dir).resolve()),
+        }
+        with self._transaction() as cursor:
+            meta = dict(cursor.execute('SELECT key, value FROM meta').fetchall())
+            if {key: meta.get(key, None) for key in expected} != expected:
+                cursor.execute('DELETE FROM revisions')
+                cursor.execute('DELETE FROM meta')
+                meta = dict(expected, epoch=uuid.uuid4().hex[:8], generation='0')
+                cursor.executemany('INSERT INTO meta (key, value) VALUES (?, ?)', list(meta.items()))
+        self.epoch = meta['epoch']
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the database write lock up front, concurrent workers wait for each other
+        with self._lock:
+            cursor = self._connection.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                yield cursor
+            except BaseException:
+                cursor.execute('ROLLBACK')
+                raise
+            cursor.execute('COMMIT')
+
+    def _bumpGeneration(self, cursor):
+        cursor.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'generation'")
+
+    def generation(self) -> int:
+        with self._lock:
+            return int(self._connection.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0])
+
+    def observe(self, contents: list) -> dict:
+        # contents: (scenario_uuid, content_hash) pairs, returns the revision of each scenario
+        revisions = {}
+        if len(contents) == 0:
+            return revisions
+        with self._transaction() as cursor:
+            changed = False
+            for scenario_uuid, content_hash in contents:
+                row = cursor.execute('SELECT revision, hash FROM revisions WHERE uuid = ?', (scenario_uuid,)).fetchone()
+                if row is None:
+                    revision = 1
+                    cursor.execute('INSERT INTO revisions (uuid, revision, hash) VALUES (?, ?, ?)', (scenario_uuid, revision, content_hash,))
+                    changed = True
+                elif row[1] != content_hash:
+                    revision = row[0] + 1
+                    cursor.execute('UPDATE revisions SET revision = ?, hash = ? WHERE uuid = ?', (revision, content_hash, scenario_uuid,))
+                    changed = True
+                else:
+                    revision = row[0]
+                revisions[scenario_uuid] = revision
+            if changed:
+                self._bumpGeneration(cursor)
+        return revisions
+
+    def forget(self, scenario_uuid: str):
+        # The revision is kept so ETags handed out before the deletion never match a re-created scenario
+        with self._transaction() as cursor:
+            cursor.execute('UPDATE revisions SET hash = NULL WHERE uuid = ?', (scenario_uuid,))
+            self._bumpGeneration(cursor)
+
+    def touch(self):
+        with self._transaction() as cursor:
+            self._bumpGeneration(cursor)
+
+    @contextmanager
+    def lock(self, name: str):
+        # Exclusive across workers, not re-entrant: only take it once per thread
+        if fcntl is None:
+            yield
+            return
+        lock_path = self.lock_dir / f'{hashlib.sha1(name.encode()).hexdigest()}.lock'
+        fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)  # Releases the lock
+
+    def stats(self) -> dict:
+        with self._lock:
+            count = self._connection.execute('SELECT COUNT(*) FROM revisions').fetchone()[0]
+        return {
+            'path': str(self.path),
+            'epoch': self.epoch,
+            'generation': self.generation(),
+            'scenarios': count,
+            'file_locks': fcntl is not None,
+        }
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
@@ -1,21 +1,48 @@
 import { reactive, computed } from "vue";
-import { store } from '@/store.js'
+import { store, applyScenarioEvent } from '@/store.js'
 
 const URL = process.env.NODE_ENV === "production" ? '' : "http://localhost:4002";
 
 const endpoints = {
     'scenarios-reload': '/scenarios/reload',
     'scenarios-index': '/scenarios/index',
+    'scenarios-summary': '/scenarios/summary',
+    'scenarios-search': '/scenarios/search',
+    'scenarios-cexf-schema': '/scenarios/cexf-schema',
     'scenarios-view': '/scenarios/view',
+    'scenarios-graph': '/scenarios/graph',
+    'scenarios-events': '/scenarios/events',
     'scenarios-add': '/scenarios/add',
     'scenarios-edit': '/scenarios/edit',
     'scenarios-delete': '/scenarios/delete',
     'scenarios-save-json': '/scenarios/save-json',
+    'scenarios-patch': '/scenarios/patch',
+    'scenarios-export': '/scenarios/export',
+    'scenarios-import': '/scenarios/import',
     'inject-save': '/scenarios/save-inject',
     'inject-delete': '/scenarios/delete-inject',
     'inject-order': '/scenarios/order-inject',
     'inject-test': '/injects/test',
+    'inject-test-stream': '/injects/test/stream',
+    'inject-test-batch': '/injects/test-batch',
+    'inject-cache-clear': '/injects/cache/clear',
     'inject-jq-path-test': '/injects/jq-path-test',
+    'inject-jq-paths-test': '/injects/jq-paths-test',
+}
+
+function recordServerTiming(url, response) {
+    // Server-Timing of the last response of each endpoint, in ms: {total: 12.3, validation: 4.5, ...}
+    const header = response.headers.get('Server-Timing')
+    if (!header) {
+        return
+    }
+    const timings = {}
+    header.split(',').forEach((entry) => {
+        const [name, ...params] = entry.trim().split(';')
+        const duration = params.find((param) => param.trim().startsWith('dur='))
+        timings[name] = duration ? parseFloat(duration.trim().substring(4)) : null
+    })
+    store.server_timing[url.replace(URL, '').split('?')[0]] = timings
 }
 
 async function get(url) {
@@ -29,6 +56,7 @@ async function get(url) {
     }
 
     const response = await fetch(url, options);
+    recordServerTiming(url, response)
     if (!response.ok) {
         throw new Error(`Response status: ${response.status}`);
     }
@@ -37,6 +65,38 @@ async function get(url) {
     return json
 }
 
+// Last response of each conditional GET: {url: {etag, data}}
+const responseCache = {}
+
+async function getCached(url) {
+    // Sends the ETag of the previous response, a 304 reuses its data instead of downloading it again
+    const cached = responseCache[url]
+    const headers = {
+        Accept: "application/json",
+        "Content-Type": "application/json;charset=UTF-8",
+    }
+    if (cached) {
+        headers['If-None-Match'] = cached.etag
+    }
+    const response = await fetch(URL + url, { method: "GET", headers: headers });
+    recordServerTiming(URL + url, response)
+    if (response.status == 304 && cached) {
+        return cached
+    }
+    if (!response.ok) {
+        throw new Error(`Response status: ${response.status}`);
+    }
+
+    const json = await response.json();
+    const etag = response.headers.get('ETag')
+    if (etag) {
+        responseCache[url] = { etag: etag, data: json }
+    } else {
+        delete responseCache[url]
+    }
+    return { etag: etag, data: json }
+}
+
 async function post(url, payload) {
     url = URL + url
     const options = {
@@ -48,6 +108,7 @@ async function post(url, payload) {
         body: JSON.stringify(payload),
     }
     const response = await fetch(url, options);
+    recordServerTiming(url, response)
     if (!response.ok) {
         throw new Error(`Response status: ${response.status}`);
     }
@@ -56,25 +117,128 @@ async function post(url, payload) {
     return json
 }
 
+async function postScenario(url, scenario_uuid, payload) {
+    // Mutations carry the revision the editor last saw, a 412 means someone else changed the scenario in the meantime
+    url = URL + url
+    const headers = {
+        Accept: "application/json",
+        "Content-Type": "application/json;charset=UTF-8",
+    }
+    if (store.scenario_etag_by_uuid[scenario_uuid]) {
+        headers['If-Match'] = store.scenario_etag_by_uuid[scenario_uuid]
+    }
+    const options = {
+        method: "POST",
+        headers: headers,
+        body: JSON.stringify(payload),
+    }
+    const response = await fetch(url, options);
+    recordServerTiming(url, response)
+    // 412 (outdated revision) and 422 (rejected change) carry an error message
+    if (!response.ok && response.status != 412 && response.status != 422) {
+        throw new Error(`Response status: ${response.status}`);
+    }
+    if (response.headers.get('ETag')) {
+        store.scenario_etag_by_uuid[scenario_uuid] = response.headers.get('ETag')
+    }
+
+    const json = await response.json();
+    return json
+}
+
 export async function fetchScenarios() {
-    const data = await get(endpoints['scenarios-index'])
-    store.scenarios = data.scenarios
-    store.read_errors = data.read_errors
-    store.scenario_validated_by_uuid = data.scenario_validated_by_uuid
-    store.scenario_filename_by_uuid = data.scenario_filename_by_uuid
-    store.cexf_schema = data.cexf_schema
+    // Only the summaries are listed, full scenarios are fetched by loadScenario() when they are opened
+    const summaries = []
+    let readErrors = {}
+    let page = 1
+    while (true) {
+        const data = await fetchScenarioSummaries({ page: page, limit: 1000 })
+        summaries.push(...data.scenarios)
+        readErrors = data.read_errors
+        if (data.scenarios.length == 0 || summaries.length >= data.total) {
+            break
+        }
+        page += 1
+    }
+    store.scenario_summaries = summaries
+    store.read_errors = readErrors
+    const scenarioValidatedByUUID = {}
+    const scenarioFilenameByUUID = {}
+    summaries.forEach((summary) => {
+        const validation = store.scenario_validated_by_uuid[summary.uuid]
+        if (summary.validated) {
+            scenarioValidatedByUUID[summary.uuid] = true
+        } else {
+            scenarioValidatedByUUID[summary.uuid] = typeof validation === 'string' ? validation : `${summary.validation_error_count} validation error(s)`
+        }
+        scenarioFilenameByUUID[summary.uuid] = summary.filename
+    })
+    store.scenario_validated_by_uuid = scenarioValidatedByUUID
+    store.scenario_filename_by_uuid = scenarioFilenameByUUID
+    if (Object.keys(store.cexf_schema).length == 0) {
+        await fetchCEXFSchema()
+    }
 }
 
-export async function fetchScenario() {
-    return await get(endpoints['scenarios-view'])
+export async function loadScenario(uuid) {
+    // Conditional GET, an unchanged scenario is not downloaded again
+    const { etag, data } = await getCached(endpoints['scenarios-view'] + `/${uuid}`)
+    if (data.success === false) {
+        return null
+    }
+    const index = store.scenarios.findIndex((s) => s.exercise.uuid == uuid)
+    if (index < 0) {
+        store.scenarios.push(data)
+    } else if (store.scenario_etag_by_uuid[uuid] != etag) {
+        store.scenarios[index] = data
+    }
+    store.scenario_etag_by_uuid[uuid] = etag
+    return data
+}
+
+export function subscribeScenarioEvents() {
+    const eventSource = new EventSource(URL + endpoints['scenarios-events'])
+    for (const eventType of ['scenario_updated', 'scenario_removed', 'read_error']) {
+        // Events carry the changed scenario and its summary, the store is patched without fetching the index again
+        eventSource.addEventListener(eventType, (e) => applyScenarioEvent(JSON.parse(e.data)))
+    }
+    return eventSource
+}
+
+export async function fetchScenarioSummaries(params = {}) {
+    const query = new URLSearchParams(params).toString()
+    const { data } = await getCached(endpoints['scenarios-summary'] + (query ? `?${query}` : ''))
+    return data
+}
+
+export async function searchScenarios(q, params = {}) {
+    const query = new URLSearchParams({ q: q, ...params }).toString()
+    return await get(endpoints['scenarios-search'] + `?${query}`)
+}
+
+export async function fetchCEXFSchema() {
+    store.cexf_schema = await get(endpoints['scenarios-cexf-schema'])
+}
+
+export async function fetchScenario(uuid) {
+    const { data } = await getCached(endpoints['scenarios-view'] + `/${uuid}`)
+    return data
+}
+
+export async function fetchScenarioGraph(uuid) {
+    const { data } = await getCached(endpoints['scenarios-graph'] + `/${uuid}`)
+    return data
 }
 
 export async function forceReload() {
     const data = await post(endpoints['scenarios-reload'])
-    store.scenarios = data.scenarios
     store.read_errors = data.read_errors
-    store.scenario_filename_by_uuid = data.scenario_filename_by_uuid
     store.scenario_validated_by_uuid = data.scenario_validated_by_uuid
+    store.scenario_validation_errors_by_uuid = data.scenario_validation_errors_by_uuid
+    // Opened scenarios are fetched again the next time they are opened
+    store.scenarios = []
+    store.scenario_etag_by_uuid = {}
+    await fetchScenarios()
 }
 
 export async function addScenario(payload) {
@@ -83,41 +247,78 @@ export async function addScenario(payload) {
 
 export async function editScenario(payload) {
     const url = endpoints['scenarios-edit']
-    return await post(url, payload)
+    return await postScenario(url, payload.uuid, payload)
 }
 
 export async function deleteScenario(uuid) {
     const url = endpoints['scenarios-delete'] + `/${uuid}`
-    const data = await post(url)
+    const data = await postScenario(url, uuid)
     if (data.success) {
         store.scenarios = store.scenarios.filter((s) => s.exercise.uuid != uuid)
+        store.scenario_summaries = store.scenario_summaries.filter((s) => s.uuid != uuid)
     }
     return data
 }
 
-export async function saveJSON(filename, content) {
+export async function saveJSON(filename, content, scenario_uuid = null) {
+    // Files that could not be read have no scenario and so no revision to check
     const url = endpoints['scenarios-save-json']
     const payload = {
         filename: filename,
         content: typeof content === 'object' ? JSON.stringify(content, undefined, 4) : content,
     }
+    if (scenario_uuid) {
+        return await postScenario(url, scenario_uuid, payload)
+    }
     return await post(url, payload)
 }
 
+export function exportScenariosURL(params = {}) {
+    // Used as a download link so the archive is streamed by the browser
+    const query = new URLSearchParams(params).toString()
+    return URL + endpoints['scenarios-export'] + (query ? `?${query}` : '')
+}
+
+export async function importScenarios(file, params = {}) {
+    const query = new URLSearchParams(params).toString()
+    const url = URL + endpoints['scenarios-import'] + (query ? `?${query}` : '')
+    const options = {
+        method: "POST",
+        headers: {
+            Accept: "application/json",
+            "Content-Type": "application/octet-stream",
+        },
+        body: file,
+    }
+    const response = await fetch(url, options);
+    recordServerTiming(url, response)
+    if (!response.ok) {
+        throw new Error(`Response status: ${response.status}`);
+    }
+
+    const json = await response.json();
+    return json
+}
+
+export async function patchScenario(scenario_uuid, operations) {
+    const url = endpoints['scenarios-patch'] + `/${scenario_uuid}`
+    return await postScenario(url, scenario_uuid, operations)
+}
+
 export async function saveInject(scenario_uuid, inject, injectFlow) {
     const url = endpoints['inject-save'] + `/${scenario_uuid}`
     const payload = {
         inject: inject,
         injectFlow: injectFlow,
     }
-    return await post(url, payload)
+    return await postScenario(url, scenario_uuid, payload)
 }
 
 export async function removeInject(scenario_uuid, inject_uuid) {
     const url = endpoints['inject-delete'] + `/${scenario_uuid}/${inject_uuid}`
     const payload = {
     }
-    return await post(url, payload)
+    return await postScenario(url, scenario_uuid, payload)
 }
 
 export async function saveInjectOrder(scenario_uuid, injectOrder) {
@@ -125,7 +326,7 @@ export async function saveInjectOrder(scenario_uuid, injectOrder) {
     const payload = {
         inject_uuids: injectOrder
     }
-    return await post(url, payload)
+    return await postScenario(url, scenario_uuid, payload)
 }
 
 export async function testInject(payload) {
@@ -133,7 +334,61 @@ export async function testInject(payload) {
     return await post(url, payload)
 }
 
+export async function testInjectStream(payload, onEvent, signal = undefined) {
+    const url = URL + endpoints['inject-test-stream']
+    const options = {
+        method: "POST",
+        headers: {
+            Accept: "application/x-ndjson",
+            "Content-Type": "application/json;charset=UTF-8",
+        },
+        body: JSON.stringify(payload),
+        signal: signal,
+    }
+    const response = await fetch(url, options);
+    recordServerTiming(url, response)
+    if (!response.ok) {
+        throw new Error(`Response status: ${response.status}`);
+    }
+
+    const reader = response.body.pipeThrough(new TextDecoderStream()).getReader()
+    let buffer = ''
+    let result = null
+    while (true) {
+        const { value, done } = await reader.read()
+        if (done) {
+            break
+        }
+        buffer += value
+        const lines = buffer.split('\n')
+        buffer = lines.pop()
+        for (const line of lines.filter((line) => line.trim().length > 0)) {
+            const event = JSON.parse(line)
+            if (event.type == 'result') {
+                result = event.data
+            }
+            onEvent(event)
+        }
+    }
+    return result
+}
+
+export async function testInjectBatch(payload) {
+    const url = endpoints['inject-test-batch']
+    return await post(url, payload)
+}
+
+export async function clearInjectCache(misp_url = null) {
+    const url = endpoints['inject-cache-clear']
+    return await post(url, { misp_url: misp_url })
+}
+
 export async function testJqPath(payload) {
     const url = endpoints['inject-jq-path-test']
     return await post(url, payload)
 }
+
+export async function testJqPaths(payload) {
+    const url = endpoints['inject-jq-paths-test']
+    return await post(url, payload)
+}
@@ -18,7 +18,7 @@ import { FontAwesomeIcon } from '@fortawesome/vue-fontawesome'
 import Alert from '@/components/Alert.vue'
 import Modal from '@/components/Modal.vue'
 import Dropdown from '@/components/Dropdown.vue'
-import { fetchScenarios } from './api'
+import { fetchScenarios, loadScenario, subscribeScenarioEvents } from './api'
 
 import { basicSetup } from 'codemirror'
 import VueCodemirror from 'vue-codemirror'
@@ -51,6 +51,13 @@ router.beforeEach(async (to, from) => {
     if (to?.meta?.requiresScenarioSelection === true && store.selected_scenario === null) {
         return { path: '/scenarios/index' }
     }
+    if (to?.meta?.requiresScenarioSelection === true) {
+        try {
+            await loadScenario(to?.params?.uuid || store.selected_scenario)
+        } catch (error) {
+            return { path: '/scenarios/index' }
+        }
+    }
     if (to.matched.length == 0) {
         return { path: '/scenarios/index' }
     }
@@ -94,4 +101,6 @@ app.use(VueCodemirror, {
     // ...
 })
 app.use(router)
-app.mount('#app')
\ No newline at end of file
+app.mount('#app')
+
+subscribeScenarioEvents()
\ No newline at end of file
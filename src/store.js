@@ -3,8 +3,12 @@ import { computed, reactive } from 'vue'
 
 export const store = reactive({
     selected_scenario: null,
+    scenario_summaries: [],
     scenarios: [],
     scenario_validated_by_uuid: [],
+    scenario_validation_errors_by_uuid: {},
+    scenario_etag_by_uuid: {},
+    server_timing: {},
     scenario_filename_by_uuid: [],
     read_errors: [],
     cexf_schema: {},
@@ -29,7 +33,7 @@ export function hasScenario() {
     return scenarioByUUID.value[store.selected_scenario] !== undefined
 }
 export function hasScenarios() {
-    return store.scenarios.length > 0
+    return store.scenario_summaries.length > 0
 }
 
 export function addNewInjectToSelectedScenario(inject, injectFlow) {
@@ -57,4 +61,35 @@ export function removeInjectFromSelectedScenario(inject_uuid) {
             injectF.requirements = {}
         }
     }
-}
\ No newline at end of file
+}
+
+export function applyScenarioEvent(event) {
+    if (event.type == 'scenario_updated') {
+        // Scenarios that were not opened yet are fetched when they are
+        const index = store.scenarios.findIndex((s) => s.exercise.uuid == event.uuid)
+        if (index >= 0) {
+            store.scenarios[index] = event.scenario
+        }
+        store.scenario_validated_by_uuid[event.uuid] = event.validation
+        store.scenario_validation_errors_by_uuid[event.uuid] = event.validation_errors
+        store.scenario_filename_by_uuid[event.uuid] = event.filename
+        store.scenario_etag_by_uuid[event.uuid] = event.etag
+        const summaryIndex = store.scenario_summaries.findIndex((s) => s.uuid == event.uuid)
+        if (summaryIndex >= 0) {
+            store.scenario_summaries[summaryIndex] = event.summary
+        } else {
+            store.scenario_summaries.push(event.summary)
+        }
+        delete store.read_errors[event.filename]
+    } else if (event.type == 'scenario_removed') {
+        store.scenarios = store.scenarios.filter((s) => s.exercise.uuid != event.uuid)
+        store.scenario_summaries = store.scenario_summaries.filter((s) => s.uuid != event.uuid)
+        delete store.scenario_validated_by_uuid[event.uuid]
+        delete store.scenario_validation_errors_by_uuid[event.uuid]
+        delete store.scenario_filename_by_uuid[event.uuid]
+        delete store.scenario_etag_by_uuid[event.uuid]
+        delete store.read_errors[event.filename]
+    } else if (event.type == 'read_error') {
+        store.read_errors[event.filename] = event.error
+    }
+}
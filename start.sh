@@ -2,14 +2,16 @@
 
 DEFAULT_HOST="127.0.0.1"
 DEFAULT_PORT="4002"
+DEFAULT_WORKERS="1"
 
 usage() {
-    echo "Usage: $0 --exercise_folder <folder> [--host <host>] [--port <port>]"
+    echo "Usage: $0 --exercise_folder <folder> [--host <host>] [--port <port>] [--workers <workers>]"
     exit 1
 }
 
 HOST="${SKILLAEGIS_HOST:-""}"
 PORT="${SKILLAEGIS_PORT:-""}"
+WORKERS="${SKILLAEGIS_WORKERS:-""}"
 EXERCISE_FOLDER="${SKILLAEGIS_EXERCISE_FOLDER:-""}"
 
 while [ "$#" -gt 0 ]; do
@@ -22,6 +24,10 @@ while [ "$#" -gt 0 ]; do
             PORT="$2"
             shift 2
             ;;
+        --workers)
+            WORKERS="$2"
+            shift 2
+            ;;
         --exercise_folder)
             EXERCISE_FOLDER="$2"
             shift 2
@@ -40,10 +46,17 @@ fi
 
 HOST=${HOST:-$DEFAULT_HOST}
 PORT=${PORT:-$DEFAULT_PORT}
+WORKERS=${WORKERS:-$DEFAULT_WORKERS}
+
+# Workers share the scenario revisions and change notifications through this database
+if [ "$WORKERS" -gt 1 ]; then
+    export SHARED_STATE="${SHARED_STATE:-shared_state.sqlite}"
+fi
 
 echo "EXERCISE_FOLDER: $EXERCISE_FOLDER"
 echo "HOST: $HOST"
 echo "PORT: $PORT"
+echo "WORKERS: $WORKERS"
 
 source venv/bin/activate
-EXERCISE_FOLDER="$EXERCISE_FOLDER" fastapi run main.py --host "$HOST" --port "$PORT"
+EXERCISE_FOLDER="$EXERCISE_FOLDER" fastapi run main.py --host "$HOST" --port "$PORT" --workers "$WORKERS"
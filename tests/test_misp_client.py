@@ -0,0 +1,282 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from misp_client import MISPClientPool
+from payloads import PayloadTooLarge
+
+MISP_URL = 'https://misp.local'
+
+
+def make_pool(handler, **kwargs):
+    kwargs.setdefault('retry_backoff', 0)
+    return MISPClientPool(transport=httpx.MockTransport(handler), **kwargs)
+
+
+def run(pool, coroutine):
+    async def wrapper():
+        try:
+            return await coroutine
+        finally:
+            await pool.close()
+    return asyncio.run(wrapper())
+
+
+def test_clients_are_pooled_per_misp_instance():
+    pool = make_pool(lambda request: httpx.Response(200, json={}))
+    client = pool.getClient(MISP_URL)
+    assert pool.getClient(MISP_URL + '/events/index') is client
+    assert pool.getClient(MISP_URL + ':8443') is not client
+    assert pool.getClient('https://other.local') is not client
+    assert len(pool._clients) == 3
+    asyncio.run(pool.close())
+    assert pool._clients == {}
+    assert pool.getClient(MISP_URL) is not client
+
+
+def test_requests_reuse_the_pooled_client():
+    seen = []
+
+    def handler(request):
+        seen.append((request.method, str(request.url), request.headers['Authorization'], json.loads(request.content),))
+        return httpx.Response(200, json={'response': []})
+
+    pool = make_pool(handler)
+
+    async def fetchTwice():
+        first = await pool.fetch(MISP_URL, 'key', 'POST', '/events/restSearch', {'limit': 1})
+        client = pool.getClient(MISP_URL)
+        second = await pool.fetch(MISP_URL, 'key', 'GET', '/events/index', {})
+        assert pool.getClient(MISP_URL) is client
+        return first, second
+
+    first, second = run(pool, fetchTwice())
+    assert first == (b'{"response":[]}', 'application/json', True,)
+    assert second[2]
+    assert seen == [
+        ('POST', MISP_URL + '/events/restSearch', 'key', {'limit': 1},),
+        ('GET', MISP_URL + '/events/index', 'key', {},),
+    ]
+
+
+@pytest.mark.parametrize('status_code', [502, 503, 504])
+def test_retry_on_gateway_errors(status_code):
+    attempts = []
+
+    def handler(request):
+        attempts.append(request)
+        if len(attempts) < 3:
+            return httpx.Response(status_code, text='unavailable')
+        return httpx.Response(200, json={'ok': True})
+
+    pool = make_pool(handler, retries=2)
+    content, content_type, is_success = run(pool, pool.fetch(MISP_URL, 'key', 'GET', '/servers/getVersion', {}))
+    assert len(attempts) == 3
+    assert is_success
+    assert json.loads(content) == {'ok': True}
+
+
+def test_last_gateway_error_is_returned_once_retries_are_exhausted():
+    attempts = []
+
+    def handler(request):
+        attempts.append(request)
+        return httpx.Response(503, text='unavailable')
+
+    pool = make_pool(handler, retries=1)
+    content, content_type, is_success = run(pool, pool.fetch(MISP_URL, 'key', 'GET', '/servers/getVersion', {}))
+    assert len(attempts) == 2
+    assert not is_success
+    assert content == b'unavailable'
+
+
+@pytest.mark.parametrize('status_code', [400, 403, 404, 500])
+def test_other_errors_are_not_retried(status_code):
+    attempts = []
+
+    def handler(request):
+        attempts.append(request)
+        return httpx.Response(status_code, json={'message': 'error'})
+
+    pool = make_pool(handler, retries=3)
+    content, content_type, is_success = run(pool, pool.fetch(MISP_URL, 'key', 'GET', '/events/view/1', {}))
+    assert len(attempts) == 1
+    assert not is_success
+
+
+def test_timeouts_are_retried():
+    attempts = []
+
+    def handler(request):
+        attempts.append(request)
+        if len(attempts) == 1:
+            raise httpx.ReadTimeout('timed out', request=request)
+        return httpx.Response(200, json={'ok': True})
+
+    pool = make_pool(handler, retries=1)
+    content, content_type, is_success = run(pool, pool.fetchParsed(MISP_URL, 'key', 'GET', '/servers/getVersion', {}))
+    assert len(attempts) == 2
+    assert content == {'ok': True}
+
+
+def test_timeout_is_raised_once_retries_are_exhausted():
+    attempts = []
+
+    def handler(request):
+        attempts.append(request)
+        raise httpx.ConnectTimeout('timed out', request=request)
+
+    pool = make_pool(handler, retries=2)
+    with pytest.raises(httpx.TimeoutException):
+        run(pool, pool.fetch(MISP_URL, 'key', 'GET', '/servers/getVersion', {}))
+    assert len(attempts) == 3
+
+
+def test_post_is_not_retried_on_read_timeouts():
+    attempts = []
+
+    def handler(request):
+        attempts.append(request)
+        raise httpx.ReadTimeout('timed out', request=request)
+
+    pool = make_pool(handler, retries=2)
+    with pytest.raises(httpx.ReadTimeout):
+        run(pool, pool.fetch(MISP_URL, 'key', 'POST', '/events/restSearch', {}))
+    assert len(attempts) == 1
+
+
+def test_post_is_retried_on_connect_errors():
+    attempts = []
+
+    def handler(request):
+        attempts.append(request)
+        if len(attempts) == 1:
+            raise httpx.ConnectError('refused', request=request)
+        return httpx.Response(200, json={'response': []})
+
+    pool = make_pool(handler, retries=1)
+    content, content_type, is_success = run(pool, pool.fetchParsed(MISP_URL, 'key', 'POST', '/events/restSearch', {}))
+    assert len(attempts) == 2
+    assert content == {'response': []}
+
+
+def test_timeouts_are_configured_on_the_client():
+    pool = make_pool(lambda request: httpx.Response(200), timeout=12.0, connect_timeout=3.0)
+    client = pool.getClient(MISP_URL)
+    assert client.timeout.read == 12.0
+    assert client.timeout.connect == 3.0
+    asyncio.run(pool.close())
+
+
+@pytest.mark.parametrize('method', ['fetch', 'fetchParsed'])
+def test_max_response_bytes_from_content_length(method):
+    body = json.dumps({'response': ['x' * 100]}).encode()
+    pool = make_pool(lambda request: httpx.Response(200, content=body, headers={'Content-Type': 'application/json'}), max_response_bytes=64)
+    with pytest.raises(PayloadTooLarge):
+        run(pool, getattr(pool, method)(MISP_URL, 'key', 'GET', '/events/index', {}))
+
+
+@pytest.mark.parametrize('method', ['fetch', 'fetchParsed'])
+def test_max_response_bytes_while_streaming(method):
+    async def chunks():
+        for i in range(10):
+            yield b'[' if i == 0 else b'"' + b'x' * 30 + b'",'
+
+    # No Content-Length, the limit is enforced on the received bytes
+    pool = make_pool(lambda request: httpx.Response(200, content=chunks(), headers={'Content-Type': 'application/json'}), max_response_bytes=100)
+    with pytest.raises(PayloadTooLarge):
+        run(pool, getattr(pool, method)(MISP_URL, 'key', 'GET', '/events/index', {}))
+
+
+def test_response_within_max_response_bytes():
+    body = json.dumps({'response': list(range(20))}).encode()
+    pool = make_pool(lambda request: httpx.Response(200, content=body, headers={'Content-Type': 'application/json'}), max_response_bytes=len(body))
+    progress = []
+    on_progress = lambda received, total: progress.append((received, total,))
+    content, content_type, is_success = run(pool, pool.fetchParsed(MISP_URL, 'key', 'GET', '/events/index', {}, on_progress))
+    assert content == {'response': list(range(20))}
+    assert progress == [(len(body), len(body),)]
+
+
+def test_response_parsed_without_ijson(monkeypatch):
+    import payloads
+    monkeypatch.setattr(payloads, 'ijson', None)
+    pool = make_pool(lambda request: httpx.Response(200, json={'response': [1, 2]}))
+    content, content_type, is_success = run(pool, pool.fetchParsed(MISP_URL, 'key', 'GET', '/events/index', {}))
+    assert content == {'response': [1, 2]}
+    pool = make_pool(lambda request: httpx.Response(200, content=b'{"response": [1', headers={'Content-Type': 'application/json'}))
+    content, content_type, is_success = run(pool, pool.fetchParsed(MISP_URL, 'key', 'GET', '/events/index', {}))
+    assert content == '{"response": [1'
+
+
+class StubMISPServer:
+    # Minimal HTTP/1.1 server on an ephemeral port, answers every request after `delay` seconds
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.requests = 0
+        self.active = 0
+        self.peak = 0
+        self.connections = 0
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self.handle, '127.0.0.1', 0)
+        self.url = 'http://127.0.0.1:%d' % self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *args):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b'\r\n\r\n')
+                length = next((int(line.split(b':')[1]) for line in head.split(b'\r\n') if line.lower().startswith(b'content-length:')), 0)
+                await reader.readexactly(length)
+                self.requests += 1
+                self.active += 1
+                self.peak = max(self.peak, self.active)
+                await asyncio.sleep(self.delay)
+                self.active -= 1
+                body = json.dumps({'response': [self.requests]}).encode()
+                writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n' % len(body) + body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def test_concurrent_fetches_are_bounded_by_max_connections():
+    async def fetchMany():
+        async with StubMISPServer(delay=0.05) as server:
+            pool = MISPClientPool(max_connections=3, max_keepalive_connections=3, retry_backoff=0)
+            try:
+                results = await asyncio.gather(*[pool.fetchParsed(server.url, 'key', 'POST', '/events/restSearch', {'page': i}) for i in range(12)])
+            finally:
+                await pool.close()
+            return server, results
+
+    server, results = asyncio.run(fetchMany())
+    assert all(is_success for _, _, is_success in results)
+    assert server.requests == 12
+    assert server.peak == 3
+    assert server.connections == 3
+
+
+@pytest.mark.parametrize('method, attempts', [('GET', 2), ('POST', 1)])
+def test_read_timeout_against_a_slow_server(method, attempts):
+    async def fetchSlow():
+        async with StubMISPServer(delay=1.0) as server:
+            pool = MISPClientPool(timeout=0.1, connect_timeout=1.0, retries=1, retry_backoff=0)
+            try:
+                with pytest.raises(httpx.ReadTimeout):
+                    await pool.fetch(server.url, 'key', method, '/servers/getVersion', {})
+            finally:
+                await pool.close()
+            return server.requests
+
+    assert asyncio.run(fetchSlow()) == attempts
@@ -0,0 +1,100 @@
+import json
+
+import pytest
+
+import payloads
+from payloads import InvalidJSON, StreamingJSONParser, parseContent, streamingParser, truncateValue
+
+pytest.importorskip('ijson')
+
+DOCUMENTS = [
+    '[1.5, -2e3, 3E+2, 0.25e-1, 10, true, null, "x"]',
+    '{"response": [{"Event": {"id": "1", "Attribute": [{"value": "10.0.0.1"}]}}, {"Event": {"id": "2"}}]}',
+    '{"response": {"Attribute": [{"id": "1", "value": "é\\u00e9 ✓", "to_ids": false}, {"id": "2", "value": 1.25e2}]}}',
+    '{"Event": {"info": "x", "Attribute": [1, 2.0, -3.5e-1], "Tag": []}, "count": 12.75}',
+    '{"a": {"b": {"c": [[1, 2], [3.5]]}}, "d": -0.5}',
+    '12.5e3',
+    '"plain string"',
+    '[]',
+    '{}',
+]
+
+
+def parse_in_chunks(document: bytes, split_points: list):
+    parser = StreamingJSONParser()
+    start = 0
+    for point in split_points:
+        parser.feed(document[start:point])
+        start = point
+    parser.feed(document[start:])
+    return parser.close()
+
+
+@pytest.mark.parametrize('document', DOCUMENTS)
+def test_every_split_point(document):
+    encoded = document.encode()
+    expected = json.loads(document)
+    for point in range(len(encoded) + 1):
+        assert parse_in_chunks(encoded, [point]) == expected, f'split at {point}: {encoded[:point]!r}'
+
+
+@pytest.mark.parametrize('document', DOCUMENTS)
+def test_byte_by_byte(document):
+    encoded = document.encode()
+    assert parse_in_chunks(encoded, list(range(1, len(encoded)))) == json.loads(document)
+
+
+@pytest.mark.parametrize('document', ['[1.', '[1,', '{"a": 1', '{"a" 1}', '[1, 2] 3', '', '[1.]'])
+def test_invalid_documents(document):
+    parser = StreamingJSONParser()
+    with pytest.raises(InvalidJSON):  # Raised as soon as the error is seen, or when closing
+        parser.feed(document.encode())
+        parser.close()
+
+
+def test_streaming_parser_is_optional(monkeypatch):
+    assert isinstance(streamingParser(), StreamingJSONParser)
+    monkeypatch.setattr(payloads, 'ijson', None)
+    assert streamingParser() is None
+
+
+def test_parse_content():
+    assert parseContent(b'{"a": 1}', 'application/json; charset=utf-8') == {'a': 1}
+    assert parseContent(b'{"a": NaN}', 'application/json')['a'] != 0
+    assert parseContent(b'not json', 'application/json') == 'not json'
+    assert parseContent(b'<html>', 'text/html') == '<html>'
+
+
+def test_truncate_value():
+    value = {'data': ['x' * 1000 for _ in range(100)]}
+    copied, truncated = truncateValue(value, 2048)
+    assert truncated
+    assert len(json.dumps(copied)) < 4096
+    assert truncateValue({'a': [1, 2]}, 2048) == ({'a': [1, 2]}, False)
+
+
+def make_limited_client():
+    from fastapi import FastAPI, Request
+    from fastapi.testclient import TestClient
+
+    app = FastAPI()
+
+    @app.post('/upload')
+    @app.post('/other')
+    async def echo(request: Request):
+        return {'size': len(await request.body())}
+
+    app.add_middleware(payloads.BodySizeLimitMiddleware, limits={'/upload': 100})
+    return TestClient(app)
+
+
+def test_body_size_limit():
+    client = make_limited_client()
+    assert client.post('/upload', content=b'x' * 100).json() == {'size': 100}
+    response = client.post('/upload', content=b'x' * 101)
+    assert response.status_code == 413
+    assert 'larger than 100 bytes' in response.json()['detail']
+    # Bodies without a Content-Length are counted while they are received
+    response = client.post('/upload', content=(b'x' * 60 for _ in range(3)))
+    assert response.status_code == 413
+    assert client.post('/other', content=b'x' * 1000).json() == {'size': 1000}
@@ -0,0 +1,93 @@
+import threading
+import time
+
+import pytest
+
+from sandbox import PythonEvaluationPool, SandboxTimeout
+
+EVALUATOR = '''
+import time
+
+
+def eval_python(authkey, inject_evaluation, data, context, debug=False):
+    if inject_evaluation == 'spin':
+        while True:
+            pass
+    if inject_evaluation == 'sleep':
+        time.sleep(data)
+    if inject_evaluation == 'raise':
+        raise ValueError('boom')
+    return (True, [[{'message': 'Evaluated', 'data': data}]])
+'''
+
+
+@pytest.fixture
+def evaluator_path(tmp_path):
+    path = tmp_path / 'inject_eval.py'
+    path.write_text(EVALUATOR)
+    return path
+
+
+def run_concurrently(pool, runaway: tuple, other: tuple, other_delay: float) -> dict:
+    # `other` starts while `runaway` is running and is still running when `runaway` is stopped
+    outcomes = {}
+
+    def run(name, args):
+        if name == 'other':
+            time.sleep(other_delay)
+        try:
+            outcomes[name] = pool.evalPython('authkey', *args)
+        except Exception as e:
+            outcomes[name] = e
+
+    threads = [threading.Thread(target=run, args=('runaway', runaway)), threading.Thread(target=run, args=('other', other))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return outcomes
+
+
+def wait_for_workers(pool, count: int):
+    deadline = time.monotonic() + 30
+    while pool.stats()['idle'] < count and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert pool.stats()['idle'] == count
+
+
+def test_timeout_only_kills_the_runaway_worker(evaluator_path):
+    pool = PythonEvaluationPool(evaluator_path, workers=2, timeout=1.0, cpu_time_limit=None, memory_limit=None)
+    pool.start()
+    try:
+        outcomes = run_concurrently(pool, ('spin', None, {}), ('sleep', 0.6, {}), 0.7)
+        assert isinstance(outcomes['runaway'], SandboxTimeout)
+        assert 'did not finish' in str(outcomes['runaway'])
+        assert outcomes['other'] == (True, [[{'message': 'Evaluated', 'data': 0.6}]])
+        wait_for_workers(pool, 2)
+        assert pool.evalPython('authkey', 'ok', 1, {})[0] is True
+    finally:
+        pool.shutdown()
+
+
+def test_cpu_time_limit_only_kills_the_runaway_worker(evaluator_path):
+    pool = PythonEvaluationPool(evaluator_path, workers=2, timeout=30.0, cpu_time_limit=1, memory_limit=None)
+    pool.start()
+    try:
+        outcomes = run_concurrently(pool, ('spin', None, {}), ('sleep', 1.0, {}), 0.5)
+        assert isinstance(outcomes['runaway'], SandboxTimeout)
+        assert 'CPU time limit' in str(outcomes['runaway'])
+        assert outcomes['other'][0] is True
+        wait_for_workers(pool, 2)
+    finally:
+        pool.shutdown()
+
+
+def test_evaluator_errors_are_raised_and_keep_the_worker(evaluator_path):
+    pool = PythonEvaluationPool(evaluator_path, workers=1, timeout=10.0, cpu_time_limit=None, memory_limit=None)
+    try:
+        with pytest.raises(ValueError, match='boom'):
+            pool.evalPython('authkey', 'raise', None, {})
+        assert pool.evalPython('authkey', 'ok', 2, {}) == (True, [[{'message': 'Evaluated', 'data': 2}]])
+        assert pool.stats()['replaced'] == 0
+    finally:
+        pool.shutdown()
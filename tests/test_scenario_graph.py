@@ -0,0 +1,42 @@
+from scenario_graph import ScenarioGraph
+
+
+def flow(inject_uuid, requires=None, followed_by=()):
+    return {
+        'inject_uuid': inject_uuid,
+        'requirements': {'inject_uuid': requires} if requires else {},
+        'sequence': {'followed_by': list(followed_by)},
+    }
+
+
+def test_dependencies():
+    graph = ScenarioGraph({
+        'injects': [{'uuid': 'a'}, {'uuid': 'b'}, {'uuid': 'c'}, {'uuid': 'd'}],
+        'inject_flow': [flow('a', followed_by=['b']), flow('b'), flow('c', requires='b'), flow('x')],
+    }).toDict()
+    assert graph['entry_points'] == ['a', 'd']
+    assert graph['topological_order'] == ['a', 'd', 'b', 'c']
+    assert graph['dependents'] == {'a': ['b'], 'b': ['c'], 'c': [], 'd': []}
+    assert graph['dangling_references'] == [{'inject_uuid': 'x', 'field': 'inject_uuid', 'reference': 'x'}]
+    assert graph['injects_without_flow'] == ['d']
+    assert not graph['is_valid']
+
+
+def test_cycles_are_unreachable():
+    graph = ScenarioGraph({
+        'injects': [{'uuid': 'a'}, {'uuid': 'b'}, {'uuid': 'c'}],
+        'inject_flow': [flow('a'), flow('b', requires='c'), flow('c', requires='b')],
+    }).toDict()
+    assert graph['cycles'] == [['b', 'c']]
+    assert graph['unreachable'] == ['b', 'c']
+    assert graph['topological_order'] == ['a']
+
+
+def test_injects_without_uuid_are_reported():
+    graph = ScenarioGraph({
+        'injects': [{'name': 'no uuid'}, {'uuid': 'a'}, {'uuid': None}, 'not an inject'],
+        'inject_flow': [flow('a')],
+    }).toDict()
+    assert graph['nodes'] == ['a']
+    assert graph['injects_without_uuid'] == [0, 2, 3]
+    assert not graph['is_valid']
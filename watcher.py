@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+import threading
+from pathlib import Path
+from typing import Callable
+
+try:
+    import watchfiles
+except ImportError:  # Fallback on polling
+    watchfiles = None
+
+
+class ExerciseDirWatcher:
+    def __init__(self, directory: Path, on_change: Callable[[], None], polling_interval: float = 2.0, force_polling: bool = False):
+        self.directory = Path(directory)
+        self.on_change = on_change
+        self.polling_interval = polling_interval
+        self.force_polling = force_polling or watchfiles is None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        target = self._poll if self.force_polling else self._watch
+        self._thread = threading.Thread(target=target, name='exercise-dir-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _notify(self):
+        try:
+            self.on_change()
+        except Exception as e:
+            print(f'Exercise watcher callback failed: {e}')
+
+    def _watch(self):
+        # inotify (or the platform equivalent) through watchfiles, changes are debounced into batches
+        watch_filter = lambda change, path: path.endswith('.json')
+        try:
+            for _ in watchfiles.watch(self.directory, watch_filter=watch_filter, stop_event=self._stop_event, recursive=False):
+                self._notify()
+        except Exception as e:
+            print(f'Exercise watcher failed, falling back on polling: {e}')
+            self._poll()
+
+    def _snapshot(self) -> dict:
+        snapshot = {}
+        for json_file in self.directory.glob('*.json'):
+            try:
+                stat = json_file.stat()
+            except FileNotFoundError:
+                continue
+            snapshot[json_file.name] = (stat.st_mtime_ns, stat.st_size,)
+        return snapshot
+
+    def _poll(self):
+        previous = self._snapshot()
+        while not self._stop_event.wait(self.polling_interval):
+            current = self._snapshot()
+            if current != previous:
+                previous = current
+                self._notify()